@@ -0,0 +1,157 @@
+"""
+Сравнение бэкендов на одних и тех же документах и запросах: CustomRAGManager (Qdrant)
+и AnythingLLMBackend (AnythingLLM). Оба вызываются напрямую через общий интерфейс
+create_collection / batch_add_documents / search, без HTTP-слоя сервиса.
+
+Для Qdrant по умолчанию используются заглушка эмбеддингов и встроенный Qdrant;
+AnythingLLM — настоящий сервер (ANYTHINGLLM_URL или --anythingllm-url):
+    python -m benchmarks.backends --anythingllm-url http://localhost:3001 --api-key KEY \\
+        --collection-size 1000 --requests 300 --output backends.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_services import embedding_server
+from benchmarks.run import Corpus, _git_revision, summarize
+
+BACKENDS = ("qdrant", "anythingllm")
+
+
+def run_threads(total: int, concurrency: int, call) -> Dict[str, Any]:
+    """выполнить total синхронных вызовов call(i) в concurrency потоках"""
+    def one(index: int) -> Optional[float]:
+        started = time.perf_counter()
+        try:
+            call(index)
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    latencies = [latency for latency in results if latency is not None]
+    return summarize(latencies, len(results) - len(latencies), time.perf_counter() - started)
+
+
+def bench_backend(name: str, backend, args: argparse.Namespace, documents: List[str],
+                  queries: List[str]) -> Dict[str, Any]:
+    created = backend.create_collection(args.collection)
+    # менеджер возвращает физическое имя (обращаться нужно по исходному), AnythingLLM — slug пространства
+    collection = created if name == "anythingllm" else args.collection
+    metadatas = [{"source": f"doc_{i % 100}"} for i in range(len(documents))]
+    batches = range(0, len(documents), args.batch_size)
+
+    started = time.perf_counter()
+    ingest = run_threads(
+        len(batches), args.ingest_concurrency,
+        lambda i: backend.batch_add_documents(
+            documents[batches[i]:batches[i] + args.batch_size],
+            metadatas[batches[i]:batches[i] + args.batch_size],
+            collection_name=collection,
+        )
+    )
+    ingest["documents_per_s"] = round(len(documents) / (time.perf_counter() - started), 2)
+
+    search = run_threads(
+        len(queries), args.concurrency,
+        lambda i: backend.search(queries[i], collection, threshold=args.threshold)
+    )
+    return {"ingest": ingest, "search": search}
+
+
+def make_backend(name: str, args: argparse.Namespace):
+    if name == "qdrant":
+        from src.app.services.custom_rag.manager import CustomRAGManager
+        return CustomRAGManager()
+
+    from src.app.core.config import settings
+    from src.app.services.anything_llm import AnythingLLMBackend
+    url = args.anythingllm_url or settings.ANYTHINGLLM_URL
+    if not url:
+        raise SystemExit("AnythingLLM URL is not set: use --anythingllm-url or ANYTHINGLLM_URL")
+    return AnythingLLMBackend(
+        url,
+        api_key=args.api_key or settings.ANYTHINGLLM_API_KEY,
+        verify_ssl=settings.ANYTHINGLLM_VERIFY_SSL,
+        timeout=settings.ANYTHINGLLM_TIMEOUT,
+        concurrency=args.upload_concurrency or settings.ANYTHINGLLM_CONCURRENCY,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--collection", default="bench_backends")
+    parser.add_argument("--collection-size", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200, help="число поисковых запросов")
+    parser.add_argument("--batch-size", type=int, default=32, help="документов в batch_add_documents")
+    parser.add_argument("--ingest-concurrency", type=int, default=2, help="одновременных пакетов загрузки")
+    parser.add_argument("--concurrency", type=int, default=8, help="одновременных поисковых запросов")
+    parser.add_argument("--threshold", type=float, default=0.0)
+    parser.add_argument("--embed-dim", type=int, default=1024)
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0)
+    parser.add_argument("--qdrant-url", default="", help="настоящий Qdrant вместо встроенного :memory:")
+    parser.add_argument("--anythingllm-url", default="")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--upload-concurrency", type=int, default=0,
+                        help="одновременных загрузок документов в AnythingLLM (0 — ANYTHINGLLM_CONCURRENCY)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="файл для сохранения результатов (JSON)")
+    args = parser.parse_args(argv)
+
+    embedder = None
+    if "qdrant" in args.backends:
+        # настройки читаются при импорте приложения, поэтому окружение задаётся до make_backend
+        embedder = embedding_server(args.embed_dim, args.embed_latency_ms).start()
+        os.environ["EMBEDDING_URL"] = embedder.url
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        if args.qdrant_url:
+            host, _, port = args.qdrant_url.rpartition(":")
+            os.environ["QDRANT_HOST"] = host
+            os.environ["QDRANT_PORT"] = port
+            os.environ["QDRANT_LOCATION"] = ""
+        else:
+            os.environ["QDRANT_LOCATION"] = ":memory:"
+
+    corpus = Corpus(args.seed)
+    documents = [corpus.document() for _ in range(args.collection_size)]
+    queries = [corpus.query() for _ in range(args.requests)]
+
+    results: Dict[str, Any] = {}
+    try:
+        for name in args.backends:
+            backend = make_backend(name, args)
+            try:
+                results[name] = bench_backend(name, backend, args, documents, queries)
+            finally:
+                if hasattr(backend, "close"):
+                    backend.close()
+            print(f"{name}: ingest {results[name]['ingest']['documents_per_s']} docs/s, "
+                  f"search p50={results[name]['search']['p50_ms']}ms "
+                  f"p99={results[name]['search']['p99_ms']}ms "
+                  f"{results[name]['search']['throughput_rps']} rps", file=sys.stderr)
+    finally:
+        if embedder is not None:
+            embedder.stop()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": _git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "api_key")},
+        "backends": results,
+    }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+if __name__ == "__main__":
+    main()
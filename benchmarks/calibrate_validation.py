@@ -0,0 +1,63 @@
+"""
+Подбор порогов быстрой проверки validate_query по размеченным примерам.
+
+Файл — JSON Lines: {"query": "...", "question": "...", "label": true}
+    python -m benchmarks.calibrate_validation labelled.jsonl [--precision 0.98]
+
+Считает близость запросов к темам тем же EmbeddingClient (EMBEDDING_URL, EMBEDDING_MODEL,
+VALIDATION_EXAMPLES) и печатает VALIDATION_ACCEPT_THRESHOLD / VALIDATION_REJECT_THRESHOLD
+и долю запросов, которые решатся без LLM.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("labelled", help="JSONL с полями query, question, label")
+    parser.add_argument("--precision", type=float, default=0.98,
+                        help="требуемая точность решений без LLM")
+    args = parser.parse_args(argv)
+
+    from src.app.core.config import settings
+    from src.app.services.custom_rag.embedding_client import EmbeddingClient
+    from src.app.services.custom_rag.validation_client import ValidationClient, calibrate_thresholds
+
+    validator = ValidationClient(
+        embedder=EmbeddingClient(
+            base_url=settings.EMBEDDING_URL,
+            encoding_format=settings.EMBEDDING_ENCODING_FORMAT,
+            model=settings.EMBEDDING_MODEL
+        ),
+        examples=settings.VALIDATION_EXAMPLES
+    )
+
+    similarities, labels = [], []
+    with open(args.labelled, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            similarity = validator.similarity(item["query"], item["question"])
+            if similarity is None:
+                print("Embedding service is unavailable", file=sys.stderr)
+                return 1
+            similarities.append(similarity)
+            labels.append(bool(item["label"]))
+
+    if not similarities:
+        print("No labelled examples", file=sys.stderr)
+        return 1
+
+    accept, reject = calibrate_thresholds(similarities, labels, args.precision)
+    decided = sum(1 for s in similarities if s >= accept or s <= reject)
+    print(f"VALIDATION_ACCEPT_THRESHOLD={accept:.4f}")
+    print(f"VALIDATION_REJECT_THRESHOLD={reject:.4f}")
+    print(f"decided without LLM: {decided}/{len(similarities)} ({decided / len(similarities):.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Сравнение двух прогонов бенчмарка:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Печатает изменения пропускной способности и перцентилей по сценариям;
+код возврата 1, если какой-то сценарий деградировал сильнее порога (в процентах).
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+METRICS = (
+    ("throughput_rps", True),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+)
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> bool:
+    """вывести таблицу сравнения; False, если есть деградация сверх порога"""
+    ok = True
+    print(f"{'scenario':<18}{'metric':<16}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name, old in baseline["scenarios"].items():
+        new = candidate["scenarios"].get(name)
+        if new is None:
+            continue
+        for metric, higher_is_better in METRICS:
+            change = _change(old[metric], new[metric])
+            regression = -change if higher_is_better else change
+            marker = ""
+            if regression > threshold:
+                marker = "  REGRESSION"
+                ok = False
+            print(f"{name:<18}{metric:<16}{old[metric]:>12.2f}{new[metric]:>12.2f}{change:>9.1f}%{marker}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="допустимая деградация в процентах")
+    args = parser.parse_args(argv)
+    return 0 if compare(_load(args.baseline), _load(args.candidate), args.threshold) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
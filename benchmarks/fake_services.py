@@ -0,0 +1,160 @@
+"""
+Локальные заглушки внешних сервисов для бенчмарков:
+эмбеддинг-сервис (OpenAI-совместимый /v1/embeddings) и LLM (Ollama /api/generate,
+OpenAI /v1/completions и /v1/chat/completions)
+"""
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class FakeEmbedder:
+    """
+    Детерминированные эмбеддинги: сумма псевдослучайных векторов слов,
+    так что тексты с общими словами оказываются близки по косинусу
+    """
+
+    def __init__(self, dimension: int = 1024):
+        self.dimension = dimension
+        self._word_vectors: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            with self._lock:
+                self._word_vectors[word] = vector
+        return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        words = TOKEN_RE.findall(text.lower()) or [""]
+        vector = np.sum([self._word_vector(word) for word in words], axis=0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_FakeHTTPServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, data: Any, status: int = 200) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        handler = self.server.routes.get(self.path)
+        if handler is None:
+            self._send_json({"error": f"unknown path {self.path}"}, status=404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self._send_json(handler(self._read_json()))
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, routes: Dict[str, Any], latency: float, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.routes = routes
+        self.latency = latency
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "_FakeHTTPServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def embedding_server(dimension: int = 1024, latency_ms: float = 0.0,
+                     host: str = "127.0.0.1", port: int = 0,
+                     supports_base64: bool = True) -> _FakeHTTPServer:
+    """
+    OpenAI-совместимый /v1/embeddings с детерминированными векторами;
+    encoding_format="base64" отдаёт float32 little-endian в base64
+    """
+    embedder = FakeEmbedder(dimension)
+
+    def embeddings(request: Dict[str, Any]) -> Dict[str, Any]:
+        texts = request.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        as_base64 = supports_base64 and request.get("encoding_format") == "base64"
+        data: List[Dict[str, Any]] = []
+        for index, text in enumerate(texts):
+            vector = embedder.embed(text)
+            if as_base64:
+                encoded: Any = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                encoded = vector.tolist()
+            data.append({
+                "object": "embedding",
+                "index": index,
+                "embedding": encoded,
+            })
+        return {"object": "list", "data": data, "model": "fake-embedder"}
+
+    return _FakeHTTPServer({"/v1/embeddings": embeddings}, latency_ms / 1000, host, port)
+
+
+def llm_server(latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+               topic_words: Optional[List[str]] = None) -> _FakeHTTPServer:
+    """
+    Ollama/OpenAI-совместимая LLM: отвечает "да", если в запросе
+    встречается одно из topic_words, иначе "нет"
+    """
+    topic_words = [word.lower() for word in (topic_words or ["документ", "поиск", "данные"])]
+
+    def answer(prompt: str) -> str:
+        # промпт валидации заканчивается блоком с конкретным запросом
+        tail = prompt.rsplit("Запрос:", 1)[-1].lower()
+        return "да" if any(word in tail for word in topic_words) else "нет"
+
+    def ollama_generate(request: Dict[str, Any]) -> Dict[str, Any]:
+        return {"model": request.get("model"), "response": answer(request.get("prompt", "")), "done": True}
+
+    def completions(request: Dict[str, Any]) -> Dict[str, Any]:
+        return {"choices": [{"index": 0, "text": answer(request.get("prompt", ""))}]}
+
+    def chat_completions(request: Dict[str, Any]) -> Dict[str, Any]:
+        messages = request.get("messages", [])
+        prompt = messages[-1].get("content", "") if messages else ""
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": answer(prompt)}}]}
+
+    routes = {
+        "/api/generate": ollama_generate,
+        "/v1/completions": completions,
+        "/v1/chat/completions": chat_completions,
+    }
+    return _FakeHTTPServer(routes, latency_ms / 1000, host, port)
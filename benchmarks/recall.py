@@ -0,0 +1,231 @@
+"""
+Полнота поиска против задержки для параметров поиска Qdrant.
+
+Эталон — точный top-k перебором в NumPy (косинусная близость); затем те же запросы
+прогоняются через VectorClient.search_points с разными hnsw_ef, exact и
+rescore/oversampling, и для каждого варианта печатаются recall@k, p50/p99 и пропускная способность.
+Запросы — векторы коллекции с небольшим шумом, сервис эмбеддингов не нужен.
+
+Синтетический набор во встроенном Qdrant (или на сервере с --qdrant-url):
+    python -m benchmarks.recall --synthetic 20000 --dim 256 --hnsw-ef 16,32,64,128 --exact
+
+Существующая коллекция (Qdrant из настроек сервиса) с закреплением самого быстрого
+варианта с полнотой не ниже 0.95 — его затем использует search_documents:
+    python -m benchmarks.recall --collection docs --target-recall 0.95 --save
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.run import percentile
+
+
+def parse_list(value: Optional[str], kind) -> List[Any]:
+    return [kind(item) for item in value.split(",") if item.strip()] if value else []
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def exact_top_k(points: np.ndarray, queries: np.ndarray, k: int, block: int = 256) -> np.ndarray:
+    """индексы точного top-k по косинусной близости, блоками запросов"""
+    points = normalize(points)
+    queries = normalize(queries)
+    k = min(k, len(points))
+    result = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), block):
+        scores = queries[start:start + block] @ points.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        result[start:start + block] = np.take_along_axis(top, order, axis=1)
+    return result
+
+
+def synthetic_points(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """кластеризованные векторы: на равномерном шуме HNSW почти всегда точен и сравнение бесполезно"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return (centers[labels] + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def make_queries(points: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    sample = points[rng.integers(0, len(points), size=count)]
+    scale = noise * np.linalg.norm(sample, axis=1, keepdims=True) / np.sqrt(points.shape[1])
+    return (sample + scale * rng.normal(size=sample.shape)).astype(np.float32)
+
+
+def load_collection(client, physical: str, tenant: Optional[str]) -> Tuple[List[Any], np.ndarray]:
+    ids: List[Any] = []
+    vectors: List[List[float]] = []
+    for points in client.scroll_points(physical, with_payload=False, with_vectors=True,
+                                       batch_size=1024, tenant=tenant):
+        for point in points:
+            ids.append(point.id)
+            vectors.append(point.vector)
+    return ids, np.asarray(vectors, dtype=np.float32)
+
+
+def parameter_grid(hnsw_ef: List[int], oversampling: List[float], exact: bool) -> List[Dict[str, Any]]:
+    """варианты параметров; {} — настройки коллекции по умолчанию"""
+    grid: List[Dict[str, Any]] = [{}]
+    grid.extend({"hnsw_ef": ef} for ef in hnsw_ef)
+    for factor in oversampling:
+        for ef in hnsw_ef or [None]:
+            params = {"rescore": True, "oversampling": factor}
+            if ef is not None:
+                params["hnsw_ef"] = ef
+            grid.append(params)
+    if exact:
+        grid.append({"exact": True})
+    return grid
+
+
+def evaluate(client, physical: str, tenant: Optional[str], queries: np.ndarray,
+             truth: List[set], k: int, params: Dict[str, Any], concurrency: int) -> Dict[str, Any]:
+    def one(index: int) -> Tuple[float, float]:
+        started = time.perf_counter()
+        hits = client.search_points(physical, queries[index].tolist(), limit=k,
+                                    tenant=tenant, search_params=params)
+        latency = time.perf_counter() - started
+        found = {hit["id"] for hit in hits}
+        return latency, len(found & truth[index]) / len(truth[index])
+
+    # прогрев: кеши Qdrant и соединения
+    for index in range(min(10, len(queries))):
+        one(index)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(len(queries))))
+    duration = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "params": params,
+        "recall": round(float(np.mean([recall for _, recall in results])), 4),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "throughput_qps": round(len(results) / duration, 2) if duration else 0.0,
+    }
+
+
+def choose(results: List[Dict[str, Any]], target_recall: float) -> Optional[Dict[str, Any]]:
+    """самый быстрый по p50 вариант с полнотой не ниже целевой"""
+    passing = [result for result in results if result["recall"] >= target_recall]
+    if not passing:
+        return None
+    return min(passing, key=lambda result: (result["p50_ms"], result["p99_ms"]))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--collection", help="существующая коллекция (алиас или арендатор)")
+    source.add_argument("--synthetic", type=int, metavar="N", help="сгенерировать N точек")
+    parser.add_argument("--dim", type=int, default=256, help="размерность синтетических векторов")
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--qdrant-url", help="Qdrant для синтетического набора (по умолчанию встроенный)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.1, help="шум запросов относительно нормы вектора")
+    parser.add_argument("-k", "--limit", type=int, default=10)
+    parser.add_argument("--hnsw-ef", default="16,32,64,128,256", help="значения hnsw_ef через запятую")
+    parser.add_argument("--oversampling", default="", help="rescore с oversampling (для квантизованных коллекций)")
+    parser.add_argument("--exact", action="store_true", help="добавить точный поиск exact=true")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--save", action="store_true",
+                        help="закрепить выбранные параметры за коллекцией (SEARCH_PARAMS_PATH)")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    from src.app.core.config import settings
+    from src.app.services.custom_rag.vector_client import VectorClient
+
+    temporary = None
+    tenant = None
+    if args.collection:
+        client = VectorClient(
+            url=f"{settings.QDRANT_HOST}:{settings.QDRANT_PORT}",
+            location=settings.QDRANT_LOCATION or None,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            grpc_port=settings.QDRANT_GRPC_PORT
+        )
+        physical = client.resolve_collection(args.collection)
+        if settings.MULTITENANT_ENABLED:
+            from src.app.services.custom_rag.tenants import TenantRegistry
+            shard = TenantRegistry(client, settings.MULTITENANT_REGISTRY, settings.MULTITENANT_PREFIX,
+                                   settings.MULTITENANT_SHARDS).get(args.collection)
+            if shard is not None:
+                physical, tenant = shard, args.collection
+        ids, points = load_collection(client, physical, tenant)
+        if not ids:
+            print(f"Collection '{args.collection}' is empty", file=sys.stderr)
+            return 1
+    else:
+        client = VectorClient(url=args.qdrant_url or "", location=None if args.qdrant_url else ":memory:")
+        points = synthetic_points(args.synthetic, args.dim, args.clusters, args.seed)
+        ids = list(range(len(points)))
+        physical = temporary = f"recall_eval_{os.getpid()}"
+        client.create_collection(physical, vector_size=args.dim)
+        for start in range(0, len(points), 1024):
+            client.upsert_batch(physical, points[start:start + 1024],
+                                payloads=[{}] * len(points[start:start + 1024]),
+                                ids=ids[start:start + 1024])
+
+    try:
+        queries = make_queries(points, args.queries, args.noise, args.seed)
+        started = time.perf_counter()
+        truth = [{ids[index] for index in row} for row in exact_top_k(points, queries, args.limit)]
+        print(f"{len(ids)} points, dim {points.shape[1]}, {len(queries)} queries, "
+              f"ground truth in {time.perf_counter() - started:.2f}s")
+
+        results = []
+        for params in parameter_grid(parse_list(args.hnsw_ef, int),
+                                     parse_list(args.oversampling, float), args.exact):
+            result = evaluate(client, physical, tenant, queries, truth, args.limit,
+                              params, args.concurrency)
+            results.append(result)
+            print(f"{json.dumps(params):<55} recall@{args.limit}={result['recall']:.4f} "
+                  f"p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms "
+                  f"{result['throughput_qps']:.0f} qps")
+    finally:
+        if temporary:
+            client.delete_collection(temporary)
+
+    best = choose(results, args.target_recall)
+    if best is None:
+        print(f"No parameters reach recall {args.target_recall}", file=sys.stderr)
+    else:
+        print(f"fastest with recall >= {args.target_recall}: {json.dumps(best['params'])}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"points": len(ids), "queries": len(queries), "k": args.limit,
+                       "results": results, "best": best}, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        if not args.collection or best is None:
+            print("Nothing to save: --save needs --collection and parameters meeting --target-recall",
+                  file=sys.stderr)
+            return 1
+        from src.app.services.custom_rag.search_params import SearchParamsStore
+        SearchParamsStore(settings.SEARCH_PARAMS_PATH).set(args.collection, best["params"])
+        print(f"saved to {settings.SEARCH_PARAMS_PATH}; on another node apply with the "
+              f"search_params function: {json.dumps({'collection_name': args.collection, 'params': best['params']})}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Бенчмарк RAG-сервиса на локальных заглушках.
+
+Поднимает заглушки эмбеддинг-сервиса и LLM, Qdrant во встроенном режиме (":memory:")
+и само FastAPI-приложение, после чего гоняет сценарии с заданной конкурентностью
+и сохраняет пропускную способность и перцентили задержек в JSON.
+
+Запуск из корня репозитория:
+    python -m benchmarks.run --concurrency 16 --collection-size 2000 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.fake_services import embedding_server, llm_server
+
+SCENARIOS = ("ingest", "search", "metadata_search", "validation")
+TOPIC_WORDS = ["документ", "поиск", "данные", "договор", "отчёт"]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """перцентиль по ближайшему рангу"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> Dict[str, Any]:
+    values = sorted(latencies)
+    total = len(values) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(values) / duration, 2) if duration else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+    }
+
+
+class Corpus:
+    """синтетические документы и запросы с воспроизводимым seed"""
+
+    def __init__(self, seed: int, vocabulary_size: int = 2000):
+        self.random = random.Random(seed)
+        self.vocabulary = [f"слово{i}" for i in range(vocabulary_size)] + TOPIC_WORDS
+
+    def document(self, min_words: int = 50, max_words: int = 200) -> str:
+        length = self.random.randint(min_words, max_words)
+        return " ".join(self.random.choices(self.vocabulary, k=length))
+
+    def query(self, min_words: int = 3, max_words: int = 8) -> str:
+        length = self.random.randint(min_words, max_words)
+        return " ".join(self.random.choices(self.vocabulary, k=length))
+
+
+async def run_load(total: int, concurrency: int,
+                   make_call: Callable[[int], Awaitable[Any]]) -> Dict[str, Any]:
+    """выполнить total вызовов с ограничением конкурентности"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                await make_call(index)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def start_app(port: int):
+    """запустить приложение в фоновом потоке (в том же процессе, что и встроенный Qdrant)"""
+    import uvicorn
+    from src.app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_scenarios(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    import httpx
+
+    corpus = Corpus(args.seed)
+    collection = args.collection
+    results: Dict[str, Any] = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+
+        async def call(function_id: str, parameters: Dict[str, Any]) -> Any:
+            response = await client.post(f"/functions/{function_id}", json={"parameters": parameters})
+            response.raise_for_status()
+            return response
+
+        await call("create_collection", {"collection_name": collection})
+
+        documents = [corpus.document() for _ in range(args.collection_size)]
+        if "ingest" in args.scenarios:
+            results["ingest"] = await run_load(
+                len(documents), args.concurrency,
+                lambda i: call("add_to_database", {
+                    "text": documents[i],
+                    "collection_name": collection,
+                    "metadata": {"source": f"doc_{i % 100}"},
+                })
+            )
+        else:
+            for i, text in enumerate(documents):
+                await call("add_to_database", {
+                    "text": text, "collection_name": collection,
+                    "metadata": {"source": f"doc_{i % 100}"},
+                })
+
+        if "search" in args.scenarios:
+            queries = [corpus.query() for _ in range(args.requests)]
+            results["search"] = await run_load(
+                args.requests, args.concurrency,
+                lambda i: call("search_documents", {
+                    "query": queries[i], "collection_name": collection, "threshold": 0.0,
+                })
+            )
+
+        if "metadata_search" in args.scenarios:
+            results["metadata_search"] = await run_load(
+                args.requests, args.concurrency,
+                lambda i: call("search_by_payload", {
+                    "collection_name": collection,
+                    "metadata_filters": {"source": f"doc_{i % 100}"},
+                })
+            )
+
+        if "validation" in args.scenarios:
+            queries = [corpus.query() for _ in range(args.requests)]
+            results["validation"] = await run_load(
+                args.requests, args.concurrency,
+                lambda i: call("validate_query", {
+                    "query": queries[i], "question": "Запрос относится к документам?",
+                })
+            )
+
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--collection-size", type=int, default=1000,
+                        help="сколько документов загрузить (сценарий ingest)")
+    parser.add_argument("--requests", type=int, default=500,
+                        help="число запросов в сценариях search/metadata_search/validation")
+    parser.add_argument("--collection", default="bench")
+    parser.add_argument("--embed-dim", type=int, default=1024)
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--qdrant-url", default="",
+                        help="настоящий Qdrant (http://host:port) вместо встроенного :memory:")
+    parser.add_argument("--qdrant-grpc", action="store_true",
+                        help="подключаться к --qdrant-url по gRPC")
+    parser.add_argument("--qdrant-grpc-port", type=int, default=6334)
+    parser.add_argument("--qdrant-connections", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="", help="метка прогона в результатах")
+    parser.add_argument("--output", default="", help="файл для сохранения результатов (JSON)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+
+    embedder = embedding_server(args.embed_dim, args.embed_latency_ms).start()
+    llm = llm_server(args.llm_latency_ms, topic_words=TOPIC_WORDS).start()
+
+    # настройки читаются при импорте приложения, поэтому окружение задаётся до start_app
+    os.environ["EMBEDDING_URL"] = embedder.url
+    os.environ["VALIDATION_URL"] = llm.url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.qdrant_url:
+        host, _, port = args.qdrant_url.rpartition(":")
+        os.environ["QDRANT_HOST"] = host
+        os.environ["QDRANT_PORT"] = port
+        os.environ["QDRANT_LOCATION"] = ""
+        os.environ["QDRANT_PREFER_GRPC"] = "true" if args.qdrant_grpc else "false"
+        os.environ["QDRANT_GRPC_PORT"] = str(args.qdrant_grpc_port)
+        os.environ["QDRANT_CONNECTIONS"] = str(args.qdrant_connections)
+    else:
+        os.environ["QDRANT_LOCATION"] = ":memory:"
+
+    port = _free_port()
+    server = start_app(port)
+    try:
+        scenarios = asyncio.run(run_scenarios(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.should_exit = True
+        embedder.stop()
+        llm.stop()
+
+    report = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": _git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": scenarios,
+    }
+
+    print(json.dumps(report["scenarios"], indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"results saved to {args.output}", file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
-from .endpoints import api_functions
+from .endpoints import api_debug, api_functions, api_ingest, api_metrics
 
-__all__ = ["api_functions"]
+__all__ = ["api_debug", "api_functions", "api_ingest", "api_metrics"]
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+
+from src.app.api.responses import ORJSONResponse
+from src.app.core.tracing import slow_traces
+
+router = APIRouter(prefix="/debug", default_response_class=ORJSONResponse)
+
+
+@router.get("/traces/slow")
+async def get_slow_traces():
+    """самые медленные запросы с разбивкой по стадиям"""
+    return ORJSONResponse(slow_traces.snapshot())
+
+
+@router.delete("/traces/slow")
+async def clear_slow_traces():
+    """очистить выборку медленных запросов"""
+    slow_traces.clear()
+    return ORJSONResponse({"status": "cleared"})
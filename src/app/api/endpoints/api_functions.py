@@ -1,31 +1,97 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
-import json
+import logging
+from fastapi import APIRouter, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, Optional, Tuple
 
+from src.app.api.responses import ORJSONResponse, compress, encode_response, negotiate_encoding
+from src.app.core.admission import AdmissionRejected
+from src.app.core.config import settings
 from src.app.core.function_executor import function_executor
-router = APIRouter()
+from src.app.core.logging_config import truncated
+from src.app.core.metrics import measure
+from src.app.core.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# сжатый каталог: (etag, кодировка) -> тело
+_catalog_encoded: Dict[Tuple[str, str], bytes] = {}
+
+
+def _accepted_encoding(request: Request) -> Optional[str]:
+    if not settings.COMPRESSION_ENABLED:
+        return None
+    return negotiate_encoding(request.headers.get("accept-encoding"))
+
+
+def _encode(response: Response, encoding: Optional[str]) -> Response:
+    with measure("compress"):
+        return encode_response(
+            response, encoding, settings.COMPRESSION_MIN_SIZE,
+            settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_BROTLI_QUALITY
+        )
 
 
 @router.get("/functions")
-async def get_available_functions():
-    """возвращает каталог из FunctionExecutor"""
-    catalog_json = function_executor.get_catalog()
-    catalog = json.loads(catalog_json)
-    # print(catalog[0]["functions"]["search_documents"])
-    return catalog
+async def get_available_functions(request: Request):
+    """возвращает каталог из FunctionExecutor (сериализован заранее, поддерживает ETag)"""
+    etag = function_executor.get_catalog_etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in tags or etag in tags or f"W/{etag}" in tags:
+            return Response(status_code=304, headers=headers)
+
+    body = function_executor.get_catalog_body()
+    encoding = _accepted_encoding(request)
+    if encoding is not None and len(body) >= settings.COMPRESSION_MIN_SIZE:
+        key = (etag, encoding)
+        if key not in _catalog_encoded:
+            _catalog_encoded[key] = compress(
+                body, encoding, settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_BROTLI_QUALITY
+            )
+        body = _catalog_encoded[key]
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/functions/{function_id}")
-async def execute_function(function_id: str, request_data: Dict[str, Any]):
+async def execute_function(function_id: str, request_data: Dict[str, Any], request: Request):
     """вызывает execute по id"""
     parameters = request_data.get("parameters", {})
+    return await call_function(function_id, parameters, request)
+
+
+async def call_function(function_id: str, parameters: Dict[str, Any], request: Request) -> Response:
+    """выполнить функцию в пуле потоков с трассировкой и преобразованием ошибок в HTTP-статусы"""
+    with start_trace(function_id, request.headers.get("traceparent"),
+                     function_id=function_id) as trace:
+        try:
+            result = await run_in_threadpool(function_executor.execute, function_id, parameters)
+            logger.debug("Function %s finished with result: %s", function_id, truncated(result))
+            with measure("serialize"):
+                response = ORJSONResponse(result)
+            encoding = _accepted_encoding(request)
+            if encoding is not None and len(response.body) >= settings.COMPRESSION_MIN_SIZE:
+                # сжатие мегабайтных ответов не должно занимать цикл событий
+                response = await run_in_threadpool(_encode, response, encoding)
+            else:
+                response.headers["Vary"] = "Accept-Encoding"
 
-    try:
-        result = function_executor.execute(function_id, parameters)
-        print(f"функция {function_id} выполнена с результатом \n {result}")
-        return result
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=str(e),
+                headers={"Retry-After": e.retry_after_header}
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if trace is not None:
+        response.headers["X-Trace-Id"] = trace.trace_id
+    return response
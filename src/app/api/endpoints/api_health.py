@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+
+from src.app.api.responses import ORJSONResponse
+from src.app.core.config import settings
+from src.app.core.function_executor import function_executor
+from src.app.core.warmup import Warmup
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+warmup = Warmup(
+    function_executor.custom_rag_manager,
+    collections=settings.WARMUP_COLLECTIONS,
+    queries_path=settings.WARMUP_QUERIES_PATH,
+    queries_per_collection=settings.WARMUP_QUERIES_PER_COLLECTION,
+    concurrency=settings.WARMUP_CONCURRENCY,
+    timeout=settings.WARMUP_TIMEOUT_SECONDS
+)
+
+
+@router.get("/health")
+async def health():
+    """процесс жив и обрабатывает запросы"""
+    return ORJSONResponse({"status": "ok"})
+
+
+@router.get("/ready")
+async def ready():
+    """готовность принимать трафик: при WARMUP_BLOCKS_READY — после окончания прогрева"""
+    is_ready = warmup.ready() or not settings.WARMUP_BLOCKS_READY
+    return ORJSONResponse(
+        {"status": "ready" if is_ready else "warming_up", "warmup": warmup.snapshot()},
+        status_code=200 if is_ready else 503
+    )
@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from src.app.api.endpoints.api_functions import call_function
+from src.app.api.responses import ORJSONResponse
+from src.app.core.config import settings
+from src.app.services.custom_rag.extraction import file_kind
+
+logger = logging.getLogger(__name__)
+router = APIRouter(default_response_class=ORJSONResponse)
+
+
+@router.post("/ingest/{collection_name}")
+async def ingest_file(collection_name: str, filename: str, request: Request,
+                      metadata: Optional[str] = None):
+    """
+    загрузка файла телом запроса (Content-Type любой, имя и тип — в параметре filename);
+    файл потоково пишется во временный файл внутри INGEST_ROOT и передаётся в ingest_files
+    """
+    try:
+        file_kind(filename)
+        file_metadata = json.loads(metadata) if metadata else {}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not isinstance(file_metadata, dict):
+        raise HTTPException(status_code=400, detail="Parameter 'metadata' must be a JSON object")
+
+    upload_dir = os.path.join(settings.INGEST_ROOT, "uploads")
+    await run_in_threadpool(os.makedirs, upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, f"{uuid.uuid4().hex}{os.path.splitext(filename)[1].lower()}")
+
+    try:
+        size = 0
+        # открытие, запись и закрытие файла блокируют — в пуле потоков, а не в цикле событий
+        f = await run_in_threadpool(open, path, "wb")
+        try:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > settings.INGEST_MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Uploaded file is too large")
+                await run_in_threadpool(f.write, chunk)
+        finally:
+            await run_in_threadpool(f.close)
+
+        return await call_function("ingest_files", {
+            "collection_name": collection_name,
+            "files": [{"path": path, "source": os.path.basename(filename), "metadata": file_metadata}],
+        }, request)
+    finally:
+        try:
+            await run_in_threadpool(os.remove, path)
+        except OSError:
+            pass
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from src.app.core.config import settings
+from src.app.core.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """метрики сервиса в текстовом формате Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(
+        registry.expose(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
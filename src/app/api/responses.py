@@ -0,0 +1,79 @@
+import gzip
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _default(obj: Any) -> Any:
+    """типы, которые orjson не сериализует сам"""
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON-ответ через orjson, без промежуточного jsonable_encoder"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Сжатие по заголовку Accept-Encoding: "br" (если установлен brotli), "gzip" или None.
+    Учитываются q-значения и "*"
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    candidates = ("br", "gzip") if brotli is not None else ("gzip",)
+    best, best_weight = None, 0.0
+    for encoding in candidates:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 5, brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def encode_response(response: Response, encoding: Optional[str], min_size: int,
+                    gzip_level: int = 5, brotli_quality: int = 4) -> Response:
+    """сжать тело готового ответа, если клиент это поддерживает и тело не меньше min_size"""
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding is None or len(response.body) < min_size:
+        return response
+    response.body = compress(response.body, encoding, gzip_level, brotli_quality)
+    response.headers["Content-Encoding"] = encoding
+    response.headers["Content-Length"] = str(len(response.body))
+    return response
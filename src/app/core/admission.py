@@ -0,0 +1,200 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict, Iterator, List, Optional
+
+from src.app.core.config import settings
+from src.app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "rag_admission_queue_depth",
+    "Calls waiting for a concurrency slot",
+    ("limiter",),
+)
+ADMISSION_ACTIVE = registry.gauge(
+    "rag_admission_active",
+    "Calls holding a concurrency slot",
+    ("limiter",),
+)
+ADMISSION_REJECTED = registry.counter(
+    "rag_admission_rejected_total",
+    "Calls rejected by admission control",
+    ("function_id", "reason"),
+)
+
+
+class PriorityClass(str, Enum):
+    """класс приоритета функции"""
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+
+class AdmissionRejected(Exception):
+    """
+    Вызов отклонён контролем допуска.
+    status_code: 429 — очередь заполнена, 503 — слот не освободился за отведённое время
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class Limiter:
+    """ограничение числа одновременных вызовов с очередью ограниченной длины"""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        # скользящее среднее длительности вызова — для оценки Retry-After
+        self.avg_duration = 0.1
+        self._cond = threading.Condition()
+
+    def retry_after(self) -> float:
+        return self.avg_duration * (self.waiting + 1) / self.concurrency
+
+    def acquire(self, function_id: str) -> None:
+        with self._cond:
+            if self.active < self.concurrency and self.waiting == 0:
+                self._enter()
+                return
+
+            if self.waiting >= self.max_queue:
+                ADMISSION_REJECTED.inc(function_id=function_id, reason="queue_full")
+                raise AdmissionRejected(
+                    f"Too many concurrent '{self.name}' calls, queue is full",
+                    status_code=429,
+                    retry_after=self.retry_after()
+                )
+
+            self.waiting += 1
+            ADMISSION_QUEUE_DEPTH.inc(limiter=self.name)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        ADMISSION_REJECTED.inc(function_id=function_id, reason="queue_timeout")
+                        raise AdmissionRejected(
+                            f"No free '{self.name}' slot within {self.queue_timeout}s",
+                            status_code=503,
+                            retry_after=self.retry_after()
+                        )
+                    self._cond.wait(remaining)
+                self._enter()
+            finally:
+                self.waiting -= 1
+                ADMISSION_QUEUE_DEPTH.dec(limiter=self.name)
+
+    def _enter(self) -> None:
+        self.active += 1
+        ADMISSION_ACTIVE.inc(limiter=self.name)
+
+    def release(self, duration: Optional[float] = None) -> None:
+        with self._cond:
+            self.active -= 1
+            if duration is not None:
+                self.avg_duration = 0.9 * self.avg_duration + 0.1 * duration
+            ADMISSION_ACTIVE.dec(limiter=self.name)
+            self._cond.notify()
+
+
+class AdmissionController:
+    """
+    Контроль допуска для FunctionExecutor: общий лимит на класс приоритета
+    и, если задан в FUNCTION_CONCURRENCY, отдельный лимит на функцию
+    """
+
+    def __init__(self):
+        self.enabled = settings.ADMISSION_ENABLED
+        self.class_limiters: Dict[PriorityClass, Limiter] = {
+            PriorityClass.INTERACTIVE: Limiter(
+                PriorityClass.INTERACTIVE.value,
+                settings.INTERACTIVE_CONCURRENCY,
+                settings.INTERACTIVE_QUEUE_SIZE,
+                settings.INTERACTIVE_QUEUE_TIMEOUT
+            ),
+            PriorityClass.BATCH: Limiter(
+                PriorityClass.BATCH.value,
+                settings.BATCH_CONCURRENCY,
+                settings.BATCH_QUEUE_SIZE,
+                settings.BATCH_QUEUE_TIMEOUT
+            ),
+        }
+        self.function_limiters: Dict[str, Limiter] = {}
+        for function_id, concurrency in settings.FUNCTION_CONCURRENCY.items():
+            self.function_limiters[function_id] = Limiter(
+                function_id,
+                concurrency,
+                settings.FUNCTION_QUEUE_SIZE.get(function_id, concurrency * 2),
+                settings.BATCH_QUEUE_TIMEOUT
+            )
+
+    @contextmanager
+    def admit(self, function_id: str,
+              priority: PriorityClass = PriorityClass.INTERACTIVE) -> Iterator[None]:
+        """занять слоты функции и её класса или отклонить вызов с AdmissionRejected"""
+        if not self.enabled:
+            yield
+            return
+
+        limiters: List[Limiter] = []
+        function_limiter: Optional[Limiter] = self.function_limiters.get(function_id)
+        if function_limiter is not None:
+            limiters.append(function_limiter)
+        limiters.append(self.class_limiters[priority])
+
+        acquired: List[Limiter] = []
+        start = None
+        try:
+            for limiter in limiters:
+                limiter.acquire(function_id)
+                acquired.append(limiter)
+            start = time.perf_counter()
+            yield
+        finally:
+            duration = time.perf_counter() - start if start is not None else None
+            for limiter in reversed(acquired):
+                limiter.release(duration)
+
+
+class RateLimiter:
+    """
+    Ограничение скорости фоновой работы (единиц в секунду), чтобы она
+    не забирала ресурсы у интерактивных запросов; rate <= 0 — без ограничения
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self, amount: float = 1.0) -> None:
+        """дождаться, пока можно обработать amount единиц"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # долг допустим: пачка больше burst просто ждёт дольше
+            self._tokens -= amount
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,205 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from src.app.core.config import settings
+from src.app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Cache:
+    """
+    Кеш байтовых значений по строковому ключу.
+    Значения — готовые к использованию байты (например, float32-буфер эмбеддинга)
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        raise NotImplementedError
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many({key: value})
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def _record(self, keys: Iterable[str], found: Dict[str, bytes]) -> None:
+        for key in keys:
+            record_cache(self.namespace, key in found)
+
+
+class NullCache(Cache):
+    """кеш отключён"""
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        return {}
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCache(Cache):
+    """
+    LRU в памяти процесса, ограниченный числом записей и суммарным размером значений;
+    при нескольких воркерах у каждого своя копия
+    """
+
+    def __init__(self, namespace: str, max_entries: int, max_bytes: int = 0):
+        super().__init__(namespace)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._data.get(key)
+                if value is not None:
+                    self._data.move_to_end(key)
+                    found[key] = value
+        self._record(keys, found)
+        return found
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        with self._lock:
+            for key, value in items.items():
+                previous = self._data.pop(key, None)
+                if previous is not None:
+                    self._size -= len(previous)
+                self._data[key] = value
+                self._size += len(value)
+            while self._data and (len(self._data) > self.max_entries
+                                  or (self.max_bytes and self._size > self.max_bytes)):
+                _, value = self._data.popitem(last=False)
+                self._size -= len(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+
+class SQLiteCache(Cache):
+    """
+    Кеш в файле SQLite (WAL), общий для всех воркеров на узле.
+    Размер ограничивается вытеснением самых старых записей
+    """
+
+    _TRIM_EVERY = 1000
+
+    def __init__(self, namespace: str, path: str, max_entries: int):
+        super().__init__(namespace)
+        self.path = path
+        self.max_entries = max_entries
+        self.table = f"cache_{namespace}"
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            f"(key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_created ON {self.table}(created)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        if not keys:
+            return {}
+        found: Dict[str, bytes] = {}
+        conn = self._connection()
+        # ограничение SQLite на число параметров в запросе
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update((key, bytes(value)) for key, value in rows)
+        self._record(keys, found)
+        return found
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        conn = self._connection()
+        try:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in items.items()]
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.namespace}' write failed: {e}")
+            return
+
+        with self._writes_lock:
+            self._writes += len(items)
+            trim = self._writes >= self._TRIM_EVERY
+            if trim:
+                self._writes = 0
+        if trim:
+            self._trim(conn)
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.namespace}' trim failed: {e}")
+
+    def clear(self) -> None:
+        conn = self._connection()
+        conn.execute(f"DELETE FROM {self.table}")
+        conn.commit()
+
+
+def create_cache(namespace: str, max_entries: Optional[int] = None) -> Cache:
+    """кеш по настройкам CACHE_BACKEND: none, memory или sqlite"""
+    backend = settings.CACHE_BACKEND.lower()
+    max_entries = max_entries or settings.CACHE_MAX_ENTRIES
+
+    if backend == "none":
+        return NullCache(namespace)
+    if backend == "memory":
+        return MemoryCache(namespace, max_entries, settings.CACHE_MAX_MEMORY_MB * 1024 * 1024)
+    if backend == "sqlite":
+        return SQLiteCache(namespace, settings.CACHE_PATH, max_entries)
+    raise ValueError(f"Unknown cache backend: {settings.CACHE_BACKEND}")
@@ -1,12 +1,49 @@
+from typing import Any, Dict, List
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
 
     EMBEDDING_URL: str = "fill_with_real_value"
+    # "base64" — компактная передача float32, "float" — JSON-списки
+    EMBEDDING_ENCODING_FORMAT: str = "base64"
+    # имя модели для поля "model" запроса эмбеддингов (пусто — не передаётся)
+    EMBEDDING_MODEL: str = ""
+    # имя базовой модели (EMBEDDING_URL/EMBEDDING_MODEL) в именах коллекций <коллекция>__<модель>
+    EMBEDDING_MODEL_NAME: str = "default"
+    # дополнительные модели для миграции коллекций: {"имя": {"url": ..., "model": ...}}
+    EMBEDDING_MODELS: Dict[str, Dict[str, str]] = {}
 
     QDRANT_HOST: str = "fill_with_real_value"
     QDRANT_PORT: int = 6333
+    # gRPC вместо REST для всех операций qdrant-client
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    # число независимых соединений (каналов gRPC / HTTP-пулов), запросы распределяются по кругу
+    QDRANT_CONNECTIONS: int = 1
+    # встроенный режим qdrant-client: ":memory:" или путь к каталогу; пусто — сервер по QDRANT_HOST
+    QDRANT_LOCATION: str = ""
+    # создавать коллекции как <коллекция>__<модель> за алиасом <коллекция> (нужно для миграции без простоя)
+    QDRANT_COLLECTION_ALIASES: bool = True
+    # сколько секунд кешировать список алиасов
+    QDRANT_ALIAS_CACHE_SECONDS: float = 5.0
+    # мультитенантный режим: новые коллекции — арендаторы в нескольких общих коллекциях-шардах
+    MULTITENANT_ENABLED: bool = False
+    MULTITENANT_SHARDS: int = 4
+    MULTITENANT_PREFIX: str = "tenants_"
+    # служебная коллекция с реестром арендаторов
+    MULTITENANT_REGISTRY: str = "rag_tenants"
+
+    VALIDATION_URL: str = "http://localhost:11434"
+    VALIDATION_MODEL: str = "mistral"
+    # быстрая проверка по косинусной близости эмбеддингов запроса и темы (и её примеров):
+    # выше ACCEPT — "да", ниже REJECT — "нет", между ними решает LLM
+    VALIDATION_FAST_PATH: bool = False
+    VALIDATION_ACCEPT_THRESHOLD: float = 0.8
+    VALIDATION_REJECT_THRESHOLD: float = 0.3
+    # примеры запросов по теме: {"Запрос относится к IT разработке?": ["Как установить драйвер?"]}
+    VALIDATION_EXAMPLES: Dict[str, List[str]] = {}
 
     # LLM_URL: str = "fill_with_real_value"
     # LLM_TOKEN: str = "fill_with_real_value"
@@ -15,6 +52,141 @@ class Settings(BaseSettings):
     DEFAULT_COLLECTION: str = "test"
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    # размер пакета запросов к сервису эмбеддингов при загрузке
+    EMBED_BATCH_SIZE: int = 64
+    # локальный манифест хешей чанков для инкрементальной синхронизации
+    SYNC_MANIFEST_PATH: str = "/tmp/rag_sync/manifest.sqlite"
+    # миграция коллекции на другую модель: размер пачки и предел скорости (точек/с, 0 — без предела)
+    MIGRATION_BATCH_SIZE: int = 64
+    MIGRATION_MAX_POINTS_PER_SECOND: float = 200.0
+    # сколько раз перед переключением алиаса досинхронизировать копию с изменениями за время миграции,
+    # не останавливая запись (последний проход всегда идёт при остановленной записи)
+    MIGRATION_CATCH_UP_PASSES: int = 3
+    # журнал записей в мигрируемые коллекции (общий для воркеров узла) и сколько секунд запись ждёт
+    # переключения алиаса, прежде чем получить 503; столько же задача ждёт окончания начатых записей
+    MIGRATION_LOG_PATH: str = "/tmp/rag_sync/migrations.sqlite"
+    MIGRATION_FENCE_TIMEOUT: float = 30.0
+    # загрузка файлов: разрешённый каталог для локальных путей (загрузки через API тоже сохраняются в нём),
+    # число процессов извлечения текста (0 — по числу ядер), страниц PDF на задачу, предел размера загрузки
+    INGEST_ROOT: str = "/tmp/rag_ingest"
+    INGEST_WORKERS: int = 0
+    INGEST_PDF_PAGES_PER_TASK: int = 16
+    INGEST_MAX_UPLOAD_BYTES: int = 200 * 1024 * 1024
+    # группировка результатов search_documents: поле родительского документа и размер группы
+    SEARCH_GROUP_BY: str = "doc_id"
+    SEARCH_GROUP_SIZE: int = 3
+    # федеративный поиск: потоки для параллельных запросов к коллекциям и предел числа коллекций
+    FEDERATED_SEARCH_WORKERS: int = 16
+    FEDERATED_SEARCH_MAX_COLLECTIONS: int = 64
+    # параметры поиска, закреплённые за коллекциями (hnsw_ef, exact, rescore, oversampling)
+    SEARCH_PARAMS_PATH: str = "/tmp/rag_sync/search_params.sqlite"
+    # профили поиска для параметра profile (и выбора по deadline_ms) — от быстрого к точному
+    SEARCH_PROFILES: Dict[str, Dict[str, Any]] = {
+        "fast": {"hnsw_ef": 32},
+        "balanced": {"hnsw_ef": 128},
+        "accurate": {"hnsw_ef": 512, "rescore": True, "oversampling": 2.0},
+        "exact": {"exact": True},
+    }
+    # отложенная запись add_to_database: документы подтверждаются после записи в журнал WRITE_BEHIND_PATH
+    # (общий для воркеров узла, пачку пишет захвативший её воркер) и пишутся в Qdrant пачками по
+    # WRITE_BEHIND_BATCH_SIZE или раз в WRITE_BEHIND_MAX_DELAY секунд; сразу увидеть их в поиске позволяет flush_writes
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_PATH: str = "/tmp/rag_sync/write_behind.sqlite"
+    WRITE_BEHIND_BATCH_SIZE: int = 64
+    WRITE_BEHIND_MAX_DELAY: float = 0.2
+    # ошибки, кроме сетевых и таймаутов, повторяются не меньше WRITE_BEHIND_MAX_ATTEMPTS раз и не меньше
+    # WRITE_BEHIND_FLUSH_TIMEOUT секунд, затем документы переносятся в таблицу dead_letter журнала
+    WRITE_BEHIND_MAX_ATTEMPTS: int = 5
+    # сколько ждать в flush_writes и при удалении точек с недописанными документами
+    WRITE_BEHIND_FLUSH_TIMEOUT: float = 30.0
+    # через сколько секунд пачку, захваченную упавшим воркером, может дописать другой
+    WRITE_BEHIND_LEASE_SECONDS: float = 60.0
+    # прогрев после старта: коллекции (имена или glob-шаблоны) и файл запросов — по одному на строку
+    # или "коллекция<TAB>запрос"; без файла коллекция трогается запросом из её имени
+    WARMUP_COLLECTIONS: List[str] = []
+    WARMUP_QUERIES_PATH: str = ""
+    WARMUP_QUERIES_PER_COLLECTION: int = 20
+    WARMUP_CONCURRENCY: int = 2
+    WARMUP_TIMEOUT_SECONDS: float = 300.0
+    # /ready отвечает 503, пока прогрев не закончится
+    WARMUP_BLOCKS_READY: bool = False
+    # выгрузка/загрузка коллекций: каталог выгрузок и размер пачки
+    EXPORT_DIR: str = "/tmp/rag_exports"
+    EXPORT_BATCH_SIZE: int = 1024
+
+    # сжатие ответов /functions по Accept-Encoding: gzip, br — при установленном пакете brotli;
+    # ответы меньше COMPRESSION_MIN_SIZE байт не сжимаются
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # AnythingLLM как альтернативный бэкенд (сравнение в benchmarks.backends);
+    # ANYTHINGLLM_CONCURRENCY — одновременных запросов при пакетной загрузке документов
+    ANYTHINGLLM_URL: str = ""
+    ANYTHINGLLM_API_KEY: str = ""
+    ANYTHINGLLM_VERIFY_SSL: bool = False
+    ANYTHINGLLM_TIMEOUT: float = 30.0
+    ANYTHINGLLM_CONCURRENCY: int = 8
+
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8080
+    # число процессов uvicorn; 0 — по числу ядер. Метрики /metrics, трассы /debug/traces/slow
+    # и лимиты контроля допуска действуют в каждом процессе отдельно
+    WORKERS: int = 1
+
+    # кеш эмбеддингов: "none", "memory" (в каждом процессе свой) или "sqlite" (общий файл для всех воркеров)
+    CACHE_BACKEND: str = "memory"
+    # для общего кеша в памяти узла можно указать путь в /dev/shm
+    CACHE_PATH: str = "/tmp/rag_cache/cache.sqlite"
+    CACHE_MAX_ENTRIES: int = 20000
+    # предел кеша "memory" в каждом процессе (эмбеддинг 1024 float32 — 4 КБ); 0 — без предела
+    CACHE_MAX_MEMORY_MB: int = 64
+
+    # контроль допуска: лимиты одновременных вызовов и очередей по классам приоритета
+    ADMISSION_ENABLED: bool = True
+    INTERACTIVE_CONCURRENCY: int = 32
+    INTERACTIVE_QUEUE_SIZE: int = 64
+    INTERACTIVE_QUEUE_TIMEOUT: float = 2.0
+    BATCH_CONCURRENCY: int = 4
+    BATCH_QUEUE_SIZE: int = 16
+    BATCH_QUEUE_TIMEOUT: float = 30.0
+    # отдельные лимиты для функций, например {"search_by_payload": 2}
+    FUNCTION_CONCURRENCY: Dict[str, int] = {}
+    FUNCTION_QUEUE_SIZE: Dict[str, int] = {}
+    # потоки для синхронных вызовов функций из обработчиков запросов
+    THREADPOOL_SIZE: int = 128
+
+    # фоновые задачи: очередь в SQLite, общая для всех воркеров узла
+    JOBS_ENABLED: bool = True
+    JOBS_DB_PATH: str = "/tmp/rag_jobs/jobs.sqlite"
+    JOB_WORKERS: int = 2
+    # задача без обновлений дольше этого времени считается прерванной и возвращается в очередь
+    JOB_STALE_SECONDS: float = 60.0
+    # попыток шага задачи; столько же раз задачу можно запустить заново после падения процесса
+    JOB_MAX_RETRIES: int = 3
+    JOB_RETRY_BACKOFF: float = 1.0
+    JOB_BATCH_SIZE: int = 64
+    # предел скорости фоновой пакетной загрузки (документов/с, 0 — без предела)
+    JOB_MAX_DOCUMENTS_PER_SECOND: float = 0.0
+
+    LOG_LEVEL: str = "INFO"
+    # запись логов в отдельном потоке через очередь
+    LOG_ASYNC: bool = False
+    LOG_QUEUE_SIZE: int = 10000
+    # максимальная длина параметров/результатов функций в логах
+    LOG_PAYLOAD_MAX_CHARS: int = 500
+
+    # сбор метрик для /metrics; при False вызовы метрик ничего не делают
+    METRICS_ENABLED: bool = True
+
+    # трассировка запросов /functions/{function_id}
+    TRACING_ENABLED: bool = True
+    # сколько самых медленных трасс хранить для /debug/traces/slow
+    TRACING_SLOW_TRACES: int = 50
+    # OTLP/HTTP collector, например http://localhost:4318; пусто — без экспорта
+    TRACING_OTLP_ENDPOINT: str = ""
+    TRACING_SERVICE_NAME: str = "rag-service"
 
 
 settings = Settings()
@@ -1,8 +1,20 @@
 import logging
-import json
-from typing import Dict, Any, List
+import os
+import time
+import uuid
+from typing import Callable, Dict, Any, List, Optional, Union
+from src.app.core.admission import AdmissionController, AdmissionRejected, PriorityClass, RateLimiter
+from src.app.core.config import settings
+from src.app.core.function_registry import FunctionRegistry, catalog_function, field
+from src.app.core.jobs import JobContext, JobInterrupted, JobManager, JobStore, retry
+from src.app.core.logging_config import truncated
+from src.app.core.metrics import FUNCTION_DURATION, FUNCTIONS_IN_FLIGHT
+from src.app.services.custom_rag.ingestion import IngestionPipeline
 from src.app.services.custom_rag.manager import CustomRAGManager
+from src.app.services.custom_rag.snapshot import SnapshotReader, SnapshotWriter, export_path
+from src.app.services.custom_rag.snippets import apply_snippets
 from src.app.services.custom_rag.validation_client import ValidationClient
+from src.app.services.custom_rag.vector_client import TENANT_FIELD
 
 logger = logging.getLogger(__name__)
 
@@ -15,384 +27,384 @@ class FunctionExecutor:
 
     def __init__(self):
         self.custom_rag_manager = CustomRAGManager()
-        self.validator = ValidationClient()
-        self.functions = self._build_catalog()
+        self.validator = ValidationClient(
+            base_url=settings.VALIDATION_URL,
+            model=settings.VALIDATION_MODEL,
+            embedder=self.custom_rag_manager.embedder if settings.VALIDATION_FAST_PATH else None,
+            accept_threshold=settings.VALIDATION_ACCEPT_THRESHOLD,
+            reject_threshold=settings.VALIDATION_REJECT_THRESHOLD,
+            examples=settings.VALIDATION_EXAMPLES
+        )
+        self.ingestion = IngestionPipeline(
+            self.custom_rag_manager,
+            workers=settings.INGEST_WORKERS,
+            pdf_pages_per_task=settings.INGEST_PDF_PAGES_PER_TASK
+        )
+        self.registry = FunctionRegistry(self)
+        self.functions = self.registry.entries
+        self.admission = AdmissionController()
+        self.jobs = JobManager(
+            JobStore(settings.JOBS_DB_PATH),
+            workers=settings.JOB_WORKERS,
+            stale_after=settings.JOB_STALE_SECONDS,
+            max_attempts=settings.JOB_MAX_RETRIES
+        )
+        self.jobs.register("function", self._job_run_function)
+        self.jobs.register("batch_add_documents", self._job_batch_add_documents)
+        self.jobs.register("migrate_collection", self._job_migrate_collection)
+        self.jobs.register("export_collection", self._job_export_collection)
+        self.jobs.register("import_collection", self._job_import_collection)
 
-    def _build_catalog(self) -> Dict[str, Dict]:
-        """
-        Построить каталог доступных функций в формате, требуемом студией моделирования
-        """
-        return {
-            "add_to_database": {
-                "id": "add_to_database",
-                "name": "Добавить в базу знаний",
-                "description": "Добавляет документ в векторную базу данных",
-                "inputs": [
-                    {
-                        "title": "Текст документа",
-                        "name": "text",
-                        "type": "string"
-                    },
-                    {
-                        "title": "Метаданные",
-                        "name": "metadata",
-                        "type": "array", "arrayType": "Map"
-                    },
-                    {
-                        "title": "Коллекция",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "title": "Добавить в базу знаний",
-                        "name": "addition_result",
-                        "type": "array", "arrayType": "Map"
-                    }
-                ],
-                "controls": [
-                    {
-                        "title": "Текст документа",
-                        "name": "text",
-                        "type": "string"
-                    },
-                    {
-                        "title": "Метаданные",
-                        "name": "metadata",
-                        "type": "array", "arrayType": "Map"
-                    },
-                    {
-                        "title": "Коллекция",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ]
-            },
-            "search_documents": {
-                "id": "search_documents",
-                "name": "Поиск документов",
-                "description": "Ищет документы по смыслу в векторной базе",
-                "inputs": [
-                    {
-                        "title": "Запрос",
-                        "name": "query",
-                        "type": "string"
-                    },
-                    {
-                        "title": "Порог схожести",
-                        "name": "threshold",
-                        "type": "number",
-                        "optional": True
-                    },
-                    {
-                        "title": "Коллекция",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ],
-                "outputs": [
-                        {
-                            "title": "Найденные документы",
-                            "name": "search_result",
-                            "type": "array", "arrayType": "Map"
-                        }
-                    ],
-                "controls": [
-                    {
-                        "title": "Запрос",
-                        "name": "query",
-                        "type": "string"
-                    },
-                    {
-                        "title": "Порог схожести",
-                        "name": "threshold",
-                        "type": "number"
-                    },
-                    {
-                        "title": "Коллекция",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ]
-            },
-            "search_by_payload": {
-                "id": "search_by_payload",
-                "name": "Поиск по метаданным",
-                "description": "Ищет документы по параметрам в векторной базе",
-                "inputs": [
-                    {
-                        "title": "Параметры",
-                        "name": "params",
-                        "type": "array", "arrayType": "Map"
-                    },
-                    {
-                        "title": "Коллекция",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "title": "Найденные документы",
-                        "name": "search_result",
-                        "type": "array", "arrayType": "Map"
-                    }
-                ],
-                "controls": [
-                    {
-                        "title": "Параметры",
-                        "name": "params",
-                        "type": "array", "arrayType": "Map"
-                    },
-                    {
-                        "title": "Коллекция",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ]
-            },
-            "delete_by_id": {
-                "id": "delete_by_id",
-                "name": "Удалить по id",
-                "description": "Удаляет запись в коллекции по id",
-                "inputs": [
-                    {
-                        "title": "Параметры",
-                        "name": "params",
-                        "type": "array", "arrayType": "Map"
-                    },
-                    {
-                        "title": "Коллекция",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ],
-                "outputs": [],
-                "controls": [
-                    {
-                        "title": "Параметры",
-                        "name": "params",
-                        "type": "array", "arrayType": "Map"
-                    },
-                    {
-                        "title": "Коллекция",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ]
-            },
-            "collections_list": {
-                "id": "collections_list",
-                "name": "Список коллекций",
-                "description": "Показать все коллекции в Qdrant",
-                "inputs": [],
-                "outputs": [
-                    {
-                        "title": "Список коллекций",
-                        "name": "collections_list",
-                        "type": "array", "arrayType": "string"
-                    }
-                ],
-                "controls": []
-            },
-            "create_collection": {
-                "id": "create_collection",
-                "name": "Создать коллекцию",
-                "description": "Создать новую коллекцию в Qdrant",
-                "inputs": [
-                    {
-                        "title": "Имя коллекции",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "title": "Результат",
-                        "name": "creation_result",
-                        "type": "string"
-                    }
-                ],
-                "controls": [
-                    {
-                        "title": "Имя коллекции",
-                        "name": "collection_name",
-                        "type": "string"
-                    },
-                ]
-            },
-            "delete_collection": {
-                "id": "delete_collection",
-                "name": "Удалить коллекцию",
-                "description": "Удалить коллекцию из Qdrant",
-                "inputs": [
-                    {
-                        "title": "Имя коллекции",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ],
-                "outputs": [],
-                "controls": [
-                    {
-                        "title": "Имя коллекции",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ]
-            },
-            "collection_info": {
-                "id": "collection_info",
-                "name": "Информация о коллекции",
-                "description": "Информация о коллекции",
-                "inputs": [
-                    {
-                        "title": "Имя коллекции",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "title": "Результат",
-                        "name": "collection_info",
-                        "type": "Map"
-                    }
-                ],
-                "controls": [
-                    {
-                        "title": "Имя коллекции",
-                        "name": "collection_name",
-                        "type": "string"
-                    }
-                ]
-            },
-            "validate_query": {
-                "id": "validate_query",
-                "name": "Проверить запрос",
-                "description": "Проверяет запрос на соответствие критерию через LLM",
-                "inputs": [
-                    {
-                        "title": "Запрос пользователя",
-                        "name": "query",
-                        "type": "string",
-                        "optional": False
-                    },
-                    {
-                        "title": "Оценочный вопрос",
-                        "name": "question",
-                        "type": "string",
-                        "optional": False
-                    }
-                ],
-                "outputs": [
-                    {
-                        "title": "Результат проверки",
-                        "name": "validation_result",
-                        "type": "Map"
-                    }
-                ],
-                "controls": [
-                    {
-                        "title": "Запрос пользователя",
-                        "name": "query",
-                        "type": "string"
-                    },
-                    {
-                        "title": "Оценочный вопрос",
-                        "name": "question",
-                        "type": "string"
-                    }
-                ]
-            }
+    def get_catalog(self) -> List[Dict[str, Any]]:
+        """каталог функций"""
+        return self.registry.catalog()
 
-        }
+    def get_catalog_body(self) -> bytes:
+        """сериализованный каталог функций (строится один раз)"""
+        return self.registry.catalog_body
 
-    def get_catalog(self) -> str:
-        """каталог функций"""
-        catalog = [{
-            "id": "rag",
-            "title": "RAG Service",
-            "functions": self.functions
-        }]
-        return json.dumps(catalog, ensure_ascii=False)
+    def get_catalog_etag(self) -> str:
+        """версия каталога для ETag"""
+        return self.registry.catalog_etag
 
     def execute(self, function_id: str, parameters: Dict[str, Any]) -> Any:
         """выполнить функцию по ID"""
-        logger.info(f"Executing function {function_id} with params: {parameters}")
-
-        if function_id in ["list_collections"] and not parameters:
-            parameters = {}
-
-        function_map = {
-            "add_to_database": self._execute_add_document,
-            "search_documents": self._execute_search,
-            "search_by_metadata" : self._execute_search_by_metadata,
-            "delete_by_id": self._execute_delete_by_id,
-            "collections_list": self._execute_list_collections,
-            "create_collection": self._execute_create_collection,
-            "delete_collection": self._execute_delete_collection,
-            "collection_info": self._execute_collection_info,
-            "validate_query": self._execute_validate_query
-        }
+        logger.info("Executing function %s with params: %s", function_id, truncated(parameters))
 
-        if function_id in function_map:
-            print(f"выполняю функцию {function_id}")
-            return function_map[function_id](parameters)
-        else:
+        handler = self.registry.get(function_id)
+        if handler is None:
             raise ValueError(f"Unknown function: {function_id}")
 
+        priority = PriorityClass(self.registry.priority(function_id))
+        with self.admission.admit(function_id, priority):
+            FUNCTIONS_IN_FLIGHT.inc(function_id=function_id)
+            start = time.perf_counter()
+            status = "error"
+            try:
+                result = handler(parameters or {})
+                status = "ok"
+                return result
+            finally:
+                FUNCTIONS_IN_FLIGHT.dec(function_id=function_id)
+                FUNCTION_DURATION.observe(
+                    time.perf_counter() - start, function_id=function_id, status=status
+                )
+
+    @catalog_function(
+        "add_to_database",
+        name="Добавить в базу знаний",
+        description="Добавляет документ в векторную базу данных",
+        inputs=[
+            field("Текст документа", "text", "string"),
+            field("Метаданные", "metadata", "array", "Map"),
+            field("Коллекция", "collection_name", "string"),
+            field("Отложенная запись", "write_behind", "boolean", optional=True),
+        ],
+        outputs=[
+            field("Добавить в базу знаний", "addition_result", "array", "Map"),
+        ],
+        priority="batch",
+    )
     def _execute_add_document(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """добавить документ"""
+        """
+        добавить документ. При отложенной записи (WRITE_BEHIND_ENABLED или write_behind)
+        ответ приходит сразу с ID точки и pending: true, поиску документ виден после flush_writes
+        """
         text = params.get("text")
         collection_name = params.get("collection_name")
         if not text:
             raise ValueError("Parameter 'text' is required")
         if not collection_name:
             raise ValueError("Parameter 'collection_name' is required")
-        if not self.custom_rag_manager.vector_db.collection_exists(collection_name):
+        if not self.custom_rag_manager.collection_exists(collection_name):
             raise ValueError(f"Collection '{collection_name}' doesn't exist")
         metadata = params.get("metadata", {})
-        result = self.custom_rag_manager.add_document(text, collection_name, metadata)
+        write_behind = params.get("write_behind")
+        result = self.custom_rag_manager.add_document(
+            text, collection_name, metadata,
+            write_behind=bool(write_behind) if write_behind is not None else None
+        )
         return result
 
+    @catalog_function(
+        "flush_writes",
+        name="Дождаться отложенной записи",
+        description="Ждёт, пока документы, принятые add_to_database с отложенной записью, попадут в базу",
+        inputs=[
+            field("Коллекция", "collection_name", "string", optional=True),
+            field("Таймаут, с", "timeout", "number", optional=True),
+            field("Повторить неудавшиеся", "retry_failed", "boolean", optional=True),
+        ],
+        outputs=[
+            field("Записано", "flushed", "boolean"),
+            field("Осталось в журнале", "pending", "number"),
+            field("Не удалось записать", "failed", "number"),
+        ],
+        priority="batch",
+    )
+    def _execute_flush_writes(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """барьер отложенной записи: всех коллекций или одной"""
+        timeout = params.get("timeout")
+        return self.custom_rag_manager.flush_writes(
+            params.get("collection_name") or None,
+            timeout=float(timeout) if timeout is not None else None,
+            retry_failed=bool(params.get("retry_failed", False))
+        )
+
+    @catalog_function(
+        "ingest_files",
+        name="Загрузить файлы",
+        description="Извлекает текст из файлов (txt, html, docx, pdf), режет на чанки и добавляет в коллекцию",
+        inputs=[
+            field("Файлы", "files", "array", "Map"),
+            field("Коллекция", "collection_name", "string"),
+        ],
+        outputs=[
+            field("Результат загрузки", "ingestion_result", "array", "Map"),
+        ],
+        priority="batch",
+    )
+    def _execute_ingest_files(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Загрузка файлов с диска сервиса. files — пути внутри INGEST_ROOT
+        или {"path": ..., "source": ..., "metadata": {...}}
+        """
+        files = params.get("files")
+        collection_name = params.get("collection_name")
+        if not isinstance(files, list) or not files:
+            raise ValueError("Parameter 'files' is required")
+        if not collection_name:
+            raise ValueError("Parameter 'collection_name' is required")
+        if not self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+
+        root = os.path.realpath(settings.INGEST_ROOT)
+        normalized = []
+        for file in files:
+            file = {"path": file} if isinstance(file, str) else dict(file)
+            path = os.path.realpath(os.path.join(root, str(file.get("path") or "")))
+            if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+                raise ValueError(f"File not found in ingest root: {file.get('path')}")
+            file["path"] = path
+            normalized.append(file)
+
+        return self.ingestion.ingest_files(collection_name, normalized)
+
+    @catalog_function(
+        "sync_documents",
+        name="Синхронизировать документы",
+        description="Инкрементально загружает документы: эмбеддит только новые и изменённые чанки, удаляет устаревшие",
+        inputs=[
+            field("Документы", "documents", "array", "Map"),
+            field("Коллекция", "collection_name", "string"),
+            field("Удалить отсутствующие", "delete_missing", "boolean", optional=True),
+        ],
+        outputs=[
+            field("Результат синхронизации", "sync_result", "Map"),
+        ],
+        priority="batch",
+    )
+    def _execute_sync_documents(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """инкрементальная синхронизация документов"""
+        documents = params.get("documents")
+        collection_name = params.get("collection_name")
+        if not isinstance(documents, list):
+            raise ValueError("Parameter 'documents' is required")
+        if not collection_name:
+            raise ValueError("Parameter 'collection_name' is required")
+        if not self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+        return self.custom_rag_manager.sync_documents(
+            collection_name,
+            documents,
+            delete_missing=bool(params.get("delete_missing", False))
+        )
+
+    @catalog_function(
+        "search_documents",
+        name="Поиск документов",
+        description="Ищет документы по смыслу в векторной базе",
+        inputs=[
+            field("Запрос", "query", "string"),
+            field("Порог схожести", "threshold", "number", optional=True),
+            field("Коллекция", "collection_name", "string"),
+            field("Группировать по документам", "group_by", "string", optional=True),
+            field("Количество документов", "group_limit", "number", optional=True),
+            field("Чанков на документ", "group_size", "number", optional=True),
+            field("Профиль поиска", "profile", "string", optional=True),
+            field("Дедлайн, мс", "deadline_ms", "number", optional=True),
+            field("Размер списка кандидатов HNSW", "hnsw_ef", "number", optional=True),
+            field("Точный поиск", "exact", "boolean", optional=True),
+            field("Квантизация", "quantization", "Map", optional=True),
+            field("Длина фрагмента текста", "snippet_chars", "number", optional=True),
+            field("Дождаться отложенной записи", "wait_for_writes", "boolean", optional=True),
+        ],
+        outputs=[
+            field("Найденные документы", "search_result", "array", "Map"),
+            field("Профиль поиска", "search_profile", "string", optional=True),
+        ],
+    )
     def _execute_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """поиск документов"""
+        """
+        поиск документов. С group_by (поле родительского документа в payload,
+        true — SEARCH_GROUP_BY) возвращает группы: лучшие документы и их лучшие чанки.
+        profile — профиль из SEARCH_PROFILES, deadline_ms — выбрать профиль под дедлайн;
+        hnsw_ef, exact и quantization ({"rescore", "oversampling"}) задаются поверх профиля.
+        snippet_chars — вместо полного text вернуть фрагмент вокруг слов запроса.
+        wait_for_writes — сначала дождаться отложенной записи в коллекцию (read-your-writes)
+        """
         query = params.get("query")
         collection_name = params.get("collection_name")
         if not query:
             raise ValueError("Parameter 'query' is required")
         if not collection_name:
             raise ValueError("Parameter 'collection_name' is required")
-        if not self.custom_rag_manager.vector_db.collection_exists(collection_name):
+        if not self.custom_rag_manager.collection_exists(collection_name):
             raise ValueError(f"Collection '{collection_name}' doesn't exist")
         threshold = params.get("threshold", 0.8)
+        snippet_chars = self._snippet_chars(params)
+        if params.get("wait_for_writes") and not self.custom_rag_manager.flush_writes(collection_name)["flushed"]:
+            raise RuntimeError(f"Buffered writes to '{collection_name}' are not flushed yet")
+
+        quantization = params.get("quantization") or {}
+        if not isinstance(quantization, dict) or set(quantization) - {"rescore", "oversampling"}:
+            raise ValueError("Parameter 'quantization' must be an object with 'rescore' and/or 'oversampling'")
+        search_params = {"hnsw_ef": params.get("hnsw_ef"), "exact": params.get("exact"), **quantization}
+        deadline_ms = params.get("deadline_ms")
+        request = {
+            "profile": params.get("profile") or None,
+            "search_params": search_params,
+            "deadline_ms": float(deadline_ms) if deadline_ms is not None else None,
+        }
+
+        group_by = params.get("group_by")
+        if group_by:
+            result = self.custom_rag_manager.search_grouped(
+                query,
+                collection_name,
+                group_by=settings.SEARCH_GROUP_BY if group_by is True else str(group_by),
+                limit=int(params.get("group_limit") or 5),
+                group_size=int(params.get("group_size") or settings.SEARCH_GROUP_SIZE),
+                threshold=threshold,
+                **request
+            )
+            if snippet_chars:
+                for group in result["search_result"]:
+                    apply_snippets(group["hits"], query, snippet_chars)
+            return result
+
+        result = self.custom_rag_manager.search(query, collection_name, threshold, **request)
+        if snippet_chars:
+            apply_snippets(result.get("search_result", []), query, snippet_chars)
+        return result
 
-        result = self.custom_rag_manager.search(query, collection_name, threshold)
+    @staticmethod
+    def _snippet_chars(params: Dict[str, Any]) -> int:
+        """длина фрагмента text в ответе (0 — текст целиком)"""
+        value = params.get("snippet_chars")
+        if value is None:
+            return 0
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError("Parameter 'snippet_chars' must be a number")
+        if value < 0:
+            raise ValueError("Parameter 'snippet_chars' must not be negative")
+        return value
+
+    @catalog_function(
+        "federated_search",
+        name="Поиск по нескольким коллекциям",
+        description="Ищет документы по смыслу сразу в нескольких коллекциях и сливает результаты в один список",
+        inputs=[
+            field("Запрос", "query", "string"),
+            field("Коллекции", "collections", "array", "string"),
+            field("Количество результатов", "limit", "number", optional=True),
+            field("Порог схожести", "threshold", "number", optional=True),
+            field("Нормализация", "normalization", "string", optional=True),
+            field("Длина фрагмента текста", "snippet_chars", "number", optional=True),
+        ],
+        outputs=[
+            field("Найденные документы", "search_result", "array", "Map"),
+        ],
+    )
+    def _execute_federated_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """поиск по нескольким коллекциям (имена или glob-шаблоны)"""
+        query = params.get("query")
+        collections = params.get("collections")
+        if not query:
+            raise ValueError("Parameter 'query' is required")
+        if isinstance(collections, str):
+            collections = [collections]
+        if not isinstance(collections, list) or not collections:
+            raise ValueError("Parameter 'collections' is required")
+        snippet_chars = self._snippet_chars(params)
+
+        names = self.custom_rag_manager.expand_collections(collections)
+        existing = set(self.custom_rag_manager.list_collections()["collections_list"])
+        missing = [name for name in names if name not in existing]
+        if missing:
+            raise ValueError(f"Collections don't exist: {', '.join(missing)}")
+
+        result = self.custom_rag_manager.federated_search(
+            query,
+            names,
+            limit=int(params.get("limit") or 5),
+            threshold=params.get("threshold"),
+            normalization=params.get("normalization") or "minmax"
+        )
+        if snippet_chars:
+            apply_snippets(result["search_result"], query, snippet_chars)
         return result
 
+    @catalog_function(
+        "search_by_payload",
+        name="Поиск по метаданным",
+        description="Ищет документы по параметрам в векторной базе",
+        inputs=[
+            field("Параметры", "params", "array", "Map"),
+            field("Коллекция", "collection_name", "string"),
+            field("Длина текста", "snippet_chars", "number", optional=True),
+        ],
+        outputs=[
+            field("Найденные документы", "search_result", "array", "Map"),
+        ],
+        aliases=["search_by_metadata"],
+        priority="batch",
+    )
     def _execute_search_by_metadata(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Поиск по метаданным"""
+        """Поиск по метаданным; snippet_chars — обрезать text до начального фрагмента"""
         metadata_filters = params.get("metadata_filters", {})
-        print(params)
         collection_name = params.get("collection_name")
 
         if not collection_name:
             raise ValueError("Parameter 'collection_name' is required")
 
-        if not self.custom_rag_manager.vector_db.collection_exists(collection_name):
+        if not self.custom_rag_manager.collection_exists(collection_name):
             raise ValueError(f"Collection '{collection_name}' doesn't exist")
 
         if not metadata_filters:
             raise ValueError("Parameter 'metadata_filters' is required")
 
+        snippet_chars = self._snippet_chars(params)
         result = self.custom_rag_manager.search_by_metadata(
             collection_name=collection_name,
             metadata_filters=metadata_filters
         )
+        if snippet_chars:
+            apply_snippets(result["search_by_metadata_result"], None, snippet_chars)
         return result
 
+    @catalog_function(
+        "delete_by_id",
+        name="Удалить по id",
+        description="Удаляет запись в коллекции по id",
+        inputs=[
+            field("Параметры", "params", "array", "Map"),
+            field("Коллекция", "collection_name", "string"),
+        ],
+        priority="batch",
+    )
     def _execute_delete_by_id(self, params: Dict[str, Any]) -> None:
         """Удалить документ по id"""
         point_id = params.get("id")
@@ -403,49 +415,204 @@ class FunctionExecutor:
         if not collection_name:
             raise ValueError("Parameter 'collection_name' is required")
 
-        self.custom_rag_manager.delete_document(collection_name, point_id)
+        self.custom_rag_manager.delete_document(collection_name, self._point_id(point_id))
+
+    @catalog_function(
+        "delete_points",
+        name="Удалить по списку id",
+        description="Удаляет записи коллекции по списку id одной операцией",
+        inputs=[
+            field("ID записей", "ids", "array", "string"),
+            field("Коллекция", "collection_name", "string"),
+            field("Ждать завершения", "wait", "boolean", optional=True),
+        ],
+        outputs=[
+            field("Результат удаления", "deletion_result", "Map"),
+        ],
+        priority="batch",
+    )
+    def _execute_delete_points(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Удалить документы по списку id"""
+        point_ids = params.get("ids")
+        collection_name = params.get("collection_name")
+
+        if not isinstance(point_ids, list) or not point_ids:
+            raise ValueError("Parameter 'ids' is required")
+        if not collection_name:
+            raise ValueError("Parameter 'collection_name' is required")
+        point_ids = [self._point_id(point_id) for point_id in point_ids]
+        if not self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+
+        return self.custom_rag_manager.delete_documents(
+            collection_name, point_ids, wait=bool(params.get("wait", True))
+        )
+
+    @staticmethod
+    def _point_id(value: Any) -> Union[int, str]:
+        """ID точки Qdrant: неотрицательное целое (в том числе строкой из цифр) или UUID"""
+        if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+            return value
+        if isinstance(value, str):
+            value = value.strip()
+            if value.isdigit():
+                return int(value)
+            try:
+                return str(uuid.UUID(value))
+            except ValueError:
+                pass
+        raise ValueError(f"Invalid point id: {value!r}, expected an unsigned integer or a UUID")
+
+    @catalog_function(
+        "delete_by_metadata",
+        name="Удалить по метаданным",
+        description="Удаляет все записи коллекции, совпадающие с фильтром по метаданным, одной операцией",
+        inputs=[
+            field("Фильтр", "metadata_filters", "Map"),
+            field("Коллекция", "collection_name", "string"),
+            field("Ждать завершения", "wait", "boolean", optional=True),
+        ],
+        outputs=[
+            field("Результат удаления", "deletion_result", "Map"),
+        ],
+        priority="batch",
+    )
+    def _execute_delete_by_metadata(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Удалить документы по метаданным"""
+        metadata_filters = params.get("metadata_filters")
+        collection_name = params.get("collection_name")
 
+        if not collection_name:
+            raise ValueError("Parameter 'collection_name' is required")
+        if not isinstance(metadata_filters, dict) or not metadata_filters:
+            raise ValueError("Parameter 'metadata_filters' is required")
+        if not self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+
+        return self.custom_rag_manager.delete_by_metadata(
+            collection_name, metadata_filters, wait=bool(params.get("wait", True))
+        )
+
+    @catalog_function(
+        "collections_list",
+        name="Список коллекций",
+        description="Показать все коллекции в Qdrant",
+        outputs=[
+            field("Список коллекций", "collections_list", "array", "string"),
+        ],
+    )
     def _execute_list_collections(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Выполнить получение списка коллекций"""
         result = self.custom_rag_manager.list_collections()
         return result
 
+    @catalog_function(
+        "create_collection",
+        name="Создать коллекцию",
+        description="Создать новую коллекцию в Qdrant",
+        inputs=[
+            field("Имя коллекции", "collection_name", "string"),
+        ],
+        outputs=[
+            field("Результат", "creation_result", "string"),
+        ],
+        priority="batch",
+    )
     def _execute_create_collection(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Создать коллекцию"""
         collection_name = params.get("collection_name")
-        if self.custom_rag_manager.vector_db.collection_exists(collection_name):
+        if self.custom_rag_manager.collection_exists(collection_name):
             raise ValueError(f"Collection '{collection_name}' already exists")
         if not collection_name:
             raise ValueError("Parameter 'collection_name' is required")
 
-        self.custom_rag_manager.vector_db.create_collection(
-            collection_name=collection_name,
-            vector_size=self.custom_rag_manager.embedding_dimension
-        )
+        self.custom_rag_manager.create_collection(collection_name)
 
         return {
             "creation_result": collection_name
         }
 
+    @catalog_function(
+        "delete_collection",
+        name="Удалить коллекцию",
+        description="Удалить коллекцию из Qdrant",
+        inputs=[
+            field("Имя коллекции", "collection_name", "string"),
+        ],
+        priority="batch",
+    )
     def _execute_delete_collection(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Удалить коллекцию"""
         collection_name = params.get("collection_name")
         if not collection_name:
             raise ValueError("Parameter 'collection_name' is required")
-        if not self.custom_rag_manager.vector_db.collection_exists(collection_name):
+        if not self.custom_rag_manager.collection_exists(collection_name):
             raise ValueError(f"Collection '{collection_name}' doesn't exist")
 
-        success = self.custom_rag_manager.vector_db.delete_collection(collection_name)
+        success = self.custom_rag_manager.delete_collection(collection_name)
 
+    @catalog_function(
+        "collection_info",
+        name="Информация о коллекции",
+        description="Информация о коллекции",
+        inputs=[
+            field("Имя коллекции", "collection_name", "string"),
+        ],
+        outputs=[
+            field("Результат", "collection_info", "Map"),
+        ],
+    )
     def _execute_collection_info(self, params: Dict[str, Any]):
         collection_name = params.get("collection_name")
         if not collection_name:
             raise ValueError("Parameter 'collection_name' is required")
-        if not self.custom_rag_manager.vector_db.collection_exists(collection_name):
+        if not self.custom_rag_manager.collection_exists(collection_name):
             raise ValueError(f"Collection '{collection_name}' doesn't exist")
-        result = self.custom_rag_manager.vector_db.get_collection_info(collection_name)
+        result = self.custom_rag_manager.collection_info(collection_name)
         return {"collection_info": result}
 
+    @catalog_function(
+        "search_params",
+        name="Параметры поиска коллекции",
+        description="Показать или закрепить за коллекцией параметры поиска Qdrant (hnsw_ef, exact, rescore, oversampling)",
+        inputs=[
+            field("Имя коллекции", "collection_name", "string"),
+            field("Параметры", "params", "Map", optional=True),
+        ],
+        outputs=[
+            field("Параметры", "search_params", "Map"),
+        ],
+        priority="batch",
+    )
+    def _execute_search_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Без params возвращает закреплённые параметры, с params — заменяет их
+        (пустой объект — сброс к настройкам коллекции). Подбираются benchmarks.recall
+        """
+        collection_name = params.get("collection_name")
+        if not collection_name:
+            raise ValueError("Parameter 'collection_name' is required")
+        if not self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+        store = self.custom_rag_manager.search_params
+        if "params" not in params:
+            return {"search_params": store.get(collection_name)}
+        if not isinstance(params["params"], dict):
+            raise ValueError("Parameter 'params' must be an object")
+        return {"search_params": store.set(collection_name, params["params"])}
+
+    @catalog_function(
+        "validate_query",
+        name="Проверить запрос",
+        description="Проверяет запрос на соответствие критерию через LLM",
+        inputs=[
+            field("Запрос пользователя", "query", "string", optional=False),
+            field("Оценочный вопрос", "question", "string", optional=False),
+        ],
+        outputs=[
+            field("Результат проверки", "validation_result", "Map"),
+        ],
+    )
     def _execute_validate_query(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Выполнить проверку запроса"""
         query = params.get("query")
@@ -460,5 +627,590 @@ class FunctionExecutor:
 
         return {"validation_result": {is_valid}}
 
+    @catalog_function(
+        "submit_job",
+        name="Запустить фоновую задачу",
+        description="Ставит длительную операцию в очередь фоновых задач и возвращает её ID",
+        inputs=[
+            field("Тип задачи", "kind", "string", optional=True),
+            field("Функция", "function_id", "string", optional=True),
+            field("Параметры", "parameters", "Map"),
+        ],
+        outputs=[
+            field("ID задачи", "job_id", "string"),
+        ],
+    )
+    def _execute_submit_job(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Поставить задачу в очередь.
+        kind="function" (по умолчанию) — выполнить function_id из каталога с parameters;
+        kind="batch_add_documents" — пакетная загрузка parameters.documents с контрольными точками
+        """
+        kind = params.get("kind") or "function"
+        parameters = params.get("parameters") or {}
+        if kind == "function":
+            function_id = params.get("function_id")
+            if not function_id:
+                raise ValueError("Parameter 'function_id' is required")
+            if self.registry.get(function_id) is None or function_id in self.JOB_FUNCTIONS:
+                raise ValueError(f"Function '{function_id}' can't run as a job")
+            job_params = {"function_id": function_id, "parameters": parameters}
+        elif kind == "batch_add_documents":
+            if not parameters.get("collection_name"):
+                raise ValueError("Parameter 'collection_name' is required")
+            if not parameters.get("documents"):
+                raise ValueError("Parameter 'documents' is required")
+            job_params = parameters
+        else:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        return {"job_id": self.jobs.submit(kind, job_params)}
+
+    @catalog_function(
+        "job_status",
+        name="Статус фоновой задачи",
+        description="Статус и прогресс фоновой задачи",
+        inputs=[
+            field("ID задачи", "job_id", "string"),
+        ],
+        outputs=[
+            field("Статус", "job_status", "Map"),
+        ],
+    )
+    def _execute_job_status(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = params.get("job_id")
+        if not job_id:
+            raise ValueError("Parameter 'job_id' is required")
+        return {"job_status": self.jobs.status(job_id)}
+
+    @catalog_function(
+        "cancel_job",
+        name="Отменить фоновую задачу",
+        description="Отменяет задачу в очереди или останавливает выполняющуюся на ближайшей контрольной точке",
+        inputs=[
+            field("ID задачи", "job_id", "string"),
+        ],
+        outputs=[
+            field("Статус", "job_status", "string"),
+        ],
+    )
+    def _execute_cancel_job(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = params.get("job_id")
+        if not job_id:
+            raise ValueError("Parameter 'job_id' is required")
+        return {"job_status": self.jobs.cancel(job_id)}
+
+    @catalog_function(
+        "job_result",
+        name="Результат фоновой задачи",
+        description="Результат успешно завершённой фоновой задачи",
+        inputs=[
+            field("ID задачи", "job_id", "string"),
+        ],
+        outputs=[
+            field("Результат", "job_result", "Map"),
+        ],
+    )
+    def _execute_job_result(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = params.get("job_id")
+        if not job_id:
+            raise ValueError("Parameter 'job_id' is required")
+        return {"job_result": self.jobs.result(job_id)}
+
+    @catalog_function(
+        "migrate_collection",
+        name="Перенести коллекцию на другую модель",
+        description="Фоном строит копию коллекции с эмбеддингами новой модели и атомарно переключает на неё алиас",
+        inputs=[
+            field("Коллекция", "collection_name", "string"),
+            field("Модель", "model", "string"),
+            field("Размер пачки", "batch_size", "number", optional=True),
+            field("Точек в секунду", "max_points_per_second", "number", optional=True),
+            field("Удалить исходную коллекцию", "drop_source", "boolean", optional=True),
+        ],
+        outputs=[
+            field("ID задачи", "job_id", "string"),
+        ],
+        priority="batch",
+    )
+    def _execute_migrate_collection(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Миграция коллекции на модель из EMBEDDING_MODELS: точки читаются постранично,
+        переэмбеддиваются и пишутся в <коллекция>__<модель>, затем на неё
+        переключается алиас. Изменения, сделанные в коллекции во время миграции,
+        переносятся проходами досинхронизации перед переключением
+        """
+        collection_name = params.get("collection_name")
+        model = params.get("model")
+        if not collection_name:
+            raise ValueError("Parameter 'collection_name' is required")
+        if not model:
+            raise ValueError("Parameter 'model' is required")
+        if not self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+        if self.custom_rag_manager.is_tenant(collection_name):
+            raise ValueError(f"Collection '{collection_name}' is a tenant of a shared collection "
+                             f"and can't be migrated to another model")
+        self.custom_rag_manager.embedder_for_model(model)
+
+        return {"job_id": self.jobs.submit("migrate_collection", {
+            "collection_name": collection_name,
+            "model": model,
+            "batch_size": int(params.get("batch_size") or settings.MIGRATION_BATCH_SIZE),
+            "max_points_per_second": float(
+                params.get("max_points_per_second", settings.MIGRATION_MAX_POINTS_PER_SECOND)
+            ),
+            "drop_source": bool(params.get("drop_source", False)),
+        })}
+
+    @catalog_function(
+        "export_collection",
+        name="Выгрузить коллекцию",
+        description="Фоном выгружает точки коллекции (векторы и payload) в файл или нативный снапшот Qdrant",
+        inputs=[
+            field("Коллекция", "collection_name", "string"),
+            field("Имя выгрузки", "name", "string", optional=True),
+            field("Формат", "format", "string", optional=True),
+        ],
+        outputs=[
+            field("ID задачи", "job_id", "string"),
+        ],
+        priority="batch",
+    )
+    def _execute_export_collection(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выгрузка коллекции. format="file" (по умолчанию) — каталог EXPORT_DIR/<name>
+        с векторами float32 и сжатыми payload; format="snapshot" — снапшот на сервере Qdrant
+        """
+        collection_name = params.get("collection_name")
+        export_format = params.get("format") or "file"
+        if not collection_name:
+            raise ValueError("Parameter 'collection_name' is required")
+        if export_format not in ("file", "snapshot"):
+            raise ValueError(f"Unknown export format: {export_format}")
+        if not self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+        if export_format == "snapshot" and self.custom_rag_manager.is_tenant(collection_name):
+            raise ValueError(f"Collection '{collection_name}' is a tenant of a shared collection, "
+                             f"use format 'file'")
+        name = params.get("name") or collection_name
+        export_path(settings.EXPORT_DIR, name)
+
+        return {"job_id": self.jobs.submit("export_collection", {
+            "collection_name": collection_name,
+            "name": name,
+            "format": export_format,
+        })}
+
+    @catalog_function(
+        "import_collection",
+        name="Загрузить коллекцию",
+        description="Фоном создаёт коллекцию из выгрузки export_collection или снапшота Qdrant без пересчёта эмбеддингов",
+        inputs=[
+            field("Коллекция", "collection_name", "string", optional=True),
+            field("Имя выгрузки", "name", "string", optional=True),
+            field("Адрес снапшота", "location", "string", optional=True),
+        ],
+        outputs=[
+            field("ID задачи", "job_id", "string"),
+        ],
+        priority="batch",
+    )
+    def _execute_import_collection(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Загрузка коллекции: из каталога EXPORT_DIR/<name> или, если задан location,
+        из нативного снапшота (URL или file:// путь на сервере Qdrant)
+        """
+        collection_name = params.get("collection_name")
+        name = params.get("name")
+        location = params.get("location")
+        if location:
+            if not collection_name:
+                raise ValueError("Parameter 'collection_name' is required")
+        elif name:
+            collection_name = collection_name or \
+                SnapshotReader(export_path(settings.EXPORT_DIR, name)).manifest["collection"]
+        else:
+            raise ValueError("Parameter 'name' or 'location' is required")
+        if self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' already exists")
+
+        return {"job_id": self.jobs.submit("import_collection", {
+            "collection_name": collection_name,
+            "name": name,
+            "location": location,
+        })}
+
+    JOB_FUNCTIONS = ("submit_job", "job_status", "cancel_job", "job_result", "migrate_collection",
+                     "export_collection", "import_collection")
+
+    def _admitted(self, function_id: str, priority: PriorityClass,
+                  func: Callable[[], Any], context: JobContext) -> Any:
+        """выполнить шаг задачи под контролем допуска, дожидаясь места при перегрузке"""
+        while True:
+            context.check_cancelled()
+            try:
+                with self.admission.admit(function_id, priority):
+                    return func()
+            except AdmissionRejected as e:
+                time.sleep(e.retry_after)
+
+    def _job_run_function(self, context: JobContext) -> Any:
+        """задача: выполнить функцию каталога, дождавшись места при перегрузке"""
+        function_id = context.params["function_id"]
+        context.progress(0, total=1)
+
+        def run():
+            while True:
+                context.check_cancelled()
+                try:
+                    return self.execute(function_id, context.params.get("parameters") or {})
+                except AdmissionRejected as e:
+                    time.sleep(e.retry_after)
+
+        result = retry(run, settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context)
+        context.progress(1)
+        return result
+
+    def _job_migrate_collection(self, context: JobContext) -> Dict[str, Any]:
+        """
+        задача: миграция коллекции на другую модель. Каждая пачка занимает слот
+        класса batch и проходит через ограничитель скорости, так что миграция
+        не вытесняет интерактивные запросы. Контрольная точка — смещение scroll,
+        затем этап: досинхронизация изменений за время прохода и переключение алиаса
+        """
+        try:
+            return self._migrate_collection(context)
+        except JobInterrupted:
+            # задача продолжится с контрольной точки — отмеченные изменения ещё нужны
+            raise
+        except BaseException:
+            # отменённая или упавшая миграция не возобновится: запись больше не отмечается
+            self.custom_rag_manager.migration_log.end(context.params["collection_name"])
+            raise
+
+    def _migrate_collection(self, context: JobContext) -> Dict[str, Any]:
+        params = context.params
+        manager = self.custom_rag_manager
+        collection_name = params["collection_name"]
+        batch_size = int(params["batch_size"])
+        throttle = RateLimiter(float(params["max_points_per_second"]), burst=batch_size)
+
+        checkpoint = context.checkpoint
+        if "target" not in checkpoint:
+            plan = manager.prepare_migration(collection_name, params["model"])
+            checkpoint = {**plan, "offset": None, "migrated": 0, "skipped": 0}
+            context.save_checkpoint(checkpoint, done=0)
+        source, target = checkpoint["source"], checkpoint["target"]
+        if checkpoint.get("stage") == "switch":
+            # сбой во время переключения: исходная коллекция могла быть уже удалена
+            return self._finish_migration(context, checkpoint)
+        context.progress(
+            checkpoint["migrated"] + checkpoint["skipped"],
+            total=manager.vector_db.get_collection_info(source)["vectors_count"]
+        )
+
+        offset = checkpoint["offset"]
+        migrated, skipped = checkpoint["migrated"], checkpoint["skipped"]
+        while True:
+            context.check_cancelled()
+            points, next_offset = retry(
+                lambda: manager.vector_db.scroll_page(source, offset=offset, limit=batch_size),
+                settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context
+            )
+            if points:
+                throttle.wait(len(points))
+                written = self._admitted(
+                    "migrate_collection", PriorityClass.BATCH,
+                    lambda: retry(
+                        lambda: manager.migrate_points(target, points),
+                        settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context
+                    ),
+                    context
+                )
+                migrated += written
+                skipped += len(points) - written
+            offset = next_offset
+            context.save_checkpoint(
+                {"source": source, "target": target, "offset": offset,
+                 "migrated": migrated, "skipped": skipped},
+                done=migrated + skipped
+            )
+            if offset is None:
+                break
+
+        # точки, записанные, изменённые или удалённые в source за время прохода, — по журналу
+        # миграции; запись не останавливается, так что каждый проход лишь сокращает остаток
+        caught_up = {"updated": 0, "deleted": 0}
+        for _ in range(max(0, settings.MIGRATION_CATCH_UP_PASSES)):
+            if manager.migration_log.last_change(collection_name) is None:
+                break
+            for key, value in self._catch_up(context, source, target, throttle).items():
+                caught_up[key] += value
+
+        context.check_cancelled()
+        checkpoint = {"source": source, "target": target, "offset": None, "stage": "switch",
+                      "migrated": migrated, "skipped": skipped, **caught_up}
+        context.save_checkpoint(checkpoint, done=migrated + skipped)
+        return self._finish_migration(context, checkpoint)
+
+    def _catch_up(self, context: JobContext, source: str, target: str,
+                  throttle: Optional[RateLimiter] = None, fence_ttl: float = 0.0) -> Dict[str, int]:
+        """
+        перенести в target изменения из журнала миграции, отмеченные до начала прохода:
+        страница ID за раз, каждая — в слоте класса batch и через ограничитель скорости.
+        fence_ttl — проход при остановленной записи: барьер продлевается перед каждой страницей
+        """
+        manager = self.custom_rag_manager
+        log = manager.migration_log
+        collection_name = context.params["collection_name"]
+        batch_size = int(context.params["batch_size"])
+        stats = {"updated": 0, "deleted": 0}
+        horizon = log.last_change(collection_name)
+        while horizon is not None:
+            context.check_cancelled()
+            last_seq, point_ids = log.changes(collection_name, batch_size)
+            if last_seq is None:
+                break
+            if fence_ttl:
+                log.fence(collection_name, fence_ttl)
+            if throttle is not None:
+                throttle.wait(len(point_ids))
+            changes = self._admitted(
+                "migrate_collection", PriorityClass.BATCH,
+                lambda: retry(
+                    lambda: manager.catch_up_points(source, target, point_ids),
+                    settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context
+                ),
+                context
+            )
+            log.remove_changes(collection_name, last_seq)
+            for key, value in changes.items():
+                stats[key] += value
+            if last_seq >= horizon:
+                break
+        return stats
+
+    def _finish_migration(self, context: JobContext, checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        переключение алиаса: запись в коллекцию останавливается барьером, начатые записи
+        дописываются, последние изменения переносятся в target — после этого в source
+        ничего не теряется. Барьер держится ещё QDRANT_ALIAS_CACHE_SECONDS после переключения,
+        пока кеши алиасов воркеров не обновятся
+        """
+        manager = self.custom_rag_manager
+        log = manager.migration_log
+        collection_name = context.params["collection_name"]
+        source, target = checkpoint["source"], checkpoint["target"]
+        drop_source = bool(context.params.get("drop_source"))
+        caught_up = {key: checkpoint.get(key, 0) for key in ("updated", "deleted")}
+        fence_ttl = 2 * settings.MIGRATION_FENCE_TIMEOUT
+
+        switched = manager.vector_db.get_aliases(refresh=True).get(collection_name) == target
+        if switched or not manager.vector_db.client.collection_exists(source):
+            # повтор после сбоя во время переключения: source уже удалена или алиас переключён
+            result = manager.switch_collection(collection_name, target, drop_source)
+        else:
+            def fence():
+                log.fence(collection_name, fence_ttl)
+                if not log.drain(collection_name, settings.MIGRATION_FENCE_TIMEOUT):
+                    log.lift(collection_name)
+                    raise RuntimeError(f"Writes to '{collection_name}' are still running, "
+                                       f"the alias is not switched yet")
+
+            retry(fence, settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context)
+            try:
+                for key, value in self._catch_up(context, source, target, fence_ttl=fence_ttl).items():
+                    caught_up[key] += value
+                log.fence(collection_name, fence_ttl)
+                result = retry(
+                    lambda: manager.switch_collection(collection_name, target, drop_source),
+                    settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context
+                )
+            except BaseException:
+                log.lift(collection_name)
+                raise
+        log.end(collection_name, hold=settings.QDRANT_ALIAS_CACHE_SECONDS)
+
+        result.update({"migrated": checkpoint.get("migrated", 0), "skipped": checkpoint.get("skipped", 0),
+                       **caught_up})
+        logger.info(f"Migration of '{collection_name}' finished: {result}")
+        return result
+
+    def _job_batch_add_documents(self, context: JobContext) -> Dict[str, Any]:
+        """
+        задача: пакетная загрузка документов. Каждый пакет занимает слот класса batch
+        и проходит через ограничитель скорости; после пакета сохраняется контрольная точка.
+        ID точек детерминированы, поэтому повтор пакета не создаёт дублей
+        """
+        params = context.params
+        collection_name = params["collection_name"]
+        documents: List[str] = params["documents"]
+        metadatas: List[Dict[str, Any]] = params.get("metadatas") or []
+        batch_size = int(params.get("batch_size") or settings.JOB_BATCH_SIZE)
+        throttle = RateLimiter(settings.JOB_MAX_DOCUMENTS_PER_SECOND, burst=batch_size)
+
+        if not self.custom_rag_manager.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+
+        total = len(documents)
+        start = context.checkpoint.get("next_index", 0)
+        context.progress(start, total=total)
+
+        for offset in range(start, total, batch_size):
+            context.check_cancelled()
+            end = min(offset + batch_size, total)
+            ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"job:{context.job_id}:{i}"))
+                   for i in range(offset, end)]
+            throttle.wait(end - offset)
+            self._admitted(
+                "batch_add_documents", PriorityClass.BATCH,
+                lambda: retry(
+                    lambda: self.custom_rag_manager.batch_add_documents(
+                        documents[offset:end],
+                        metadatas=metadatas[offset:end] if metadatas else None,
+                        collection_name=collection_name,
+                        ids=ids
+                    ),
+                    settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context
+                ),
+                context
+            )
+            context.save_checkpoint({"next_index": end}, done=end)
+
+        return {
+            "collection": collection_name,
+            "count": total,
+        }
+
+    def _job_export_collection(self, context: JobContext) -> Dict[str, Any]:
+        """
+        задача: выгрузка коллекции. Файлы пишутся потоково; после перезапуска
+        выгрузка начинается заново, manifest.json появляется только в конце
+        """
+        params = context.params
+        manager = self.custom_rag_manager
+        collection_name = params["collection_name"]
+        physical, embedder, tenant = manager.resolve(collection_name)
+
+        if params["format"] == "snapshot":
+            context.progress(0, total=1)
+            snapshot = self._admitted(
+                "export_collection", PriorityClass.BATCH,
+                lambda: manager.vector_db.create_snapshot(physical), context
+            )
+            context.progress(1)
+            return {"collection": collection_name, "snapshot": snapshot}
+
+        directory = export_path(settings.EXPORT_DIR, params["name"])
+        batch_size = settings.EXPORT_BATCH_SIZE
+        context.progress(0, total=manager.collection_info(collection_name)["vectors_count"])
+
+        writer = SnapshotWriter(directory, manager.vector_db.vector_size(physical))
+        try:
+            offset = None
+            while True:
+                context.check_cancelled()
+                points, offset = self._admitted(
+                    "export_collection", PriorityClass.BATCH,
+                    lambda: retry(
+                        lambda: manager.vector_db.scroll_page(
+                            physical, offset=offset, limit=batch_size, with_vectors=True,
+                            tenant=tenant
+                        ),
+                        settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context
+                    ),
+                    context
+                )
+                if points:
+                    writer.write(
+                        [point.id for point in points],
+                        [point.vector for point in points],
+                        # поле арендатора не выгружается: при загрузке оно ставится заново
+                        [{key: value for key, value in (point.payload or {}).items()
+                          if key != TENANT_FIELD} for point in points]
+                    )
+                context.progress(writer.count)
+                if offset is None:
+                    break
+        except BaseException:
+            writer.abort()
+            raise
+
+        manifest = writer.close(
+            collection=collection_name,
+            model_name=manager.model_name_of(physical),
+            embedding_model=embedder.model_id
+        )
+        logger.info(f"Collection '{collection_name}' exported to {directory}: {manifest['points_count']} points")
+        return {"collection": collection_name, "path": directory, "points_count": manifest["points_count"]}
+
+    def _job_import_collection(self, context: JobContext) -> Dict[str, Any]:
+        """
+        задача: загрузка коллекции из выгрузки. ID точек берутся из выгрузки,
+        поэтому после перезапуска загрузка продолжается с контрольной точки без дублей
+        """
+        params = context.params
+        manager = self.custom_rag_manager
+        collection_name = params["collection_name"]
+
+        if params.get("location"):
+            context.progress(0, total=1)
+            self._admitted(
+                "import_collection", PriorityClass.BATCH,
+                lambda: manager.vector_db.recover_snapshot(collection_name, params["location"]),
+                context
+            )
+            context.progress(1)
+            return {"collection": collection_name, "location": params["location"]}
+
+        reader = SnapshotReader(export_path(settings.EXPORT_DIR, params["name"]))
+        checkpoint = context.checkpoint
+        if "physical" not in checkpoint:
+            model_name = reader.manifest.get("model_name")
+            if model_name is not None and model_name != settings.EMBEDDING_MODEL_NAME \
+                    and model_name not in settings.EMBEDDING_MODELS:
+                raise ValueError(f"Export uses model '{model_name}' which is not configured in EMBEDDING_MODELS")
+            if model_name is None and reader.vector_size != manager.embedding_dimension:
+                raise ValueError(
+                    f"Export vector size {reader.vector_size} doesn't match "
+                    f"embedding dimension {manager.embedding_dimension}"
+                )
+            manager.create_collection(
+                collection_name, vector_size=reader.vector_size, model_name=model_name
+            )
+            target = manager.resolve(collection_name)
+            checkpoint = {"physical": target.physical, "tenant": target.tenant, "next_index": 0}
+            context.save_checkpoint(checkpoint, done=0)
+        physical = checkpoint["physical"]
+        tenant = checkpoint.get("tenant")
+        context.progress(checkpoint["next_index"], total=reader.count)
+
+        for first, ids, vectors, payloads in reader.batches(
+                settings.EXPORT_BATCH_SIZE, start=checkpoint["next_index"]):
+            context.check_cancelled()
+            end = first + len(ids)
+            if tenant is not None:
+                # общая коллекция: ID из выгрузки могут совпасть с точками других арендаторов
+                ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"{tenant}\0{point_id}")) for point_id in ids]
+                for payload in payloads:
+                    payload[TENANT_FIELD] = tenant
+            # ждать применения только последней пачки: Qdrant применяет операции по порядку
+            self._admitted(
+                "import_collection", PriorityClass.BATCH,
+                lambda: retry(
+                    lambda: manager.vector_db.upsert_batch(
+                        physical, vectors, payloads, ids=ids, wait=end >= reader.count
+                    ),
+                    settings.JOB_MAX_RETRIES, settings.JOB_RETRY_BACKOFF, context
+                ),
+                context
+            )
+            context.save_checkpoint({"physical": physical, "tenant": tenant, "next_index": end}, done=end)
+
+        manager.sync_manifest.drop_collection(collection_name)
+        logger.info(f"Collection '{collection_name}' imported: {reader.count} points")
+        return {"collection": collection_name, "points_count": reader.count}
+
 
 function_executor = FunctionExecutor()
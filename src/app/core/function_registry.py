@@ -0,0 +1,126 @@
+import hashlib
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import orjson
+
+CATALOG_ID = "rag"
+CATALOG_TITLE = "RAG Service"
+
+
+def field(title: str, name: str, type: str, array_type: Optional[str] = None,
+          optional: Optional[bool] = None) -> Dict[str, Any]:
+    """описание входа/выхода функции в формате студии моделирования"""
+    spec: Dict[str, Any] = {"title": title, "name": name, "type": type}
+    if array_type is not None:
+        spec["arrayType"] = array_type
+    if optional is not None:
+        spec["optional"] = optional
+    return spec
+
+
+def catalog_function(function_id: str, name: str, description: str,
+                     inputs: Iterable[Dict[str, Any]] = (),
+                     outputs: Iterable[Dict[str, Any]] = (),
+                     controls: Optional[Iterable[Dict[str, Any]]] = None,
+                     aliases: Iterable[str] = (),
+                     priority: str = "interactive") -> Callable:
+    """
+    Объявить обработчик функции вместе с её записью в каталоге
+
+    Args:
+        function_id: ID функции, по которому её вызывает студия
+        name: Отображаемое имя
+        description: Описание
+        inputs: Входы функции
+        outputs: Выходы функции
+        controls: Контролы; по умолчанию повторяют inputs без флага optional
+        aliases: Дополнительные ID, по которым функция доступна, но не попадает в каталог
+        priority: Класс приоритета для контроля допуска ("interactive" или "batch")
+    """
+    inputs = list(inputs)
+    if controls is None:
+        controls = [{k: v for k, v in item.items() if k != "optional"} for item in inputs]
+
+    entry = {
+        "id": function_id,
+        "name": name,
+        "description": description,
+        "inputs": inputs,
+        "outputs": list(outputs),
+        "controls": list(controls),
+    }
+
+    def decorator(method: Callable) -> Callable:
+        method.__catalog_entry__ = entry
+        method.__catalog_aliases__ = tuple(aliases)
+        method.__catalog_priority__ = priority
+        return method
+
+    return decorator
+
+
+class FunctionRegistry:
+    """
+    Реестр функций: обработчики и записи каталога собираются из методов,
+    помеченных catalog_function, один раз при создании
+    """
+
+    def __init__(self, owner: Any):
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.priorities: Dict[str, str] = {}
+
+        members: Dict[str, Callable] = {}
+        for cls in reversed(type(owner).__mro__):
+            members.update(vars(cls))
+
+        for attr_name, method in members.items():
+            entry = getattr(method, "__catalog_entry__", None)
+            if entry is None:
+                continue
+            handler = getattr(owner, attr_name)
+            function_id = entry["id"]
+            if function_id in self.handlers:
+                raise ValueError(f"Function '{function_id}' is registered twice")
+            self.entries[function_id] = entry
+            self.handlers[function_id] = handler
+            self.priorities[function_id] = method.__catalog_priority__
+            for alias in method.__catalog_aliases__:
+                self.handlers[alias] = handler
+                self.priorities[alias] = method.__catalog_priority__
+
+        self._catalog_body: Optional[bytes] = None
+        self._catalog_etag: Optional[str] = None
+
+    def get(self, function_id: str) -> Optional[Callable[[Dict[str, Any]], Any]]:
+        return self.handlers.get(function_id)
+
+    def priority(self, function_id: str) -> str:
+        return self.priorities.get(function_id, "interactive")
+
+    def catalog(self) -> List[Dict[str, Any]]:
+        """каталог в формате студии"""
+        return [{
+            "id": CATALOG_ID,
+            "title": CATALOG_TITLE,
+            "functions": self.entries
+        }]
+
+    def _serialize(self) -> None:
+        body = orjson.dumps(self.catalog())
+        self._catalog_body = body
+        self._catalog_etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    @property
+    def catalog_body(self) -> bytes:
+        """сериализованный каталог, строится один раз"""
+        if self._catalog_body is None:
+            self._serialize()
+        return self._catalog_body
+
+    @property
+    def catalog_etag(self) -> str:
+        """версия каталога (хеш сериализованного тела) для ETag"""
+        if self._catalog_etag is None:
+            self._serialize()
+        return self._catalog_etag
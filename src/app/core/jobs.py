@@ -0,0 +1,391 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+
+from src.app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+JOBS_TOTAL = registry.counter(
+    "rag_jobs_total",
+    "Finished background jobs by kind and final status",
+    ("kind", "status"),
+)
+JOBS_RUNNING = registry.gauge(
+    "rag_jobs_running",
+    "Background jobs currently running in this process",
+    ("kind",),
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class JobCancelled(Exception):
+    """задача отменена пользователем"""
+
+
+class JobInterrupted(JobCancelled):
+    """процесс останавливается: задача вернётся в очередь и продолжится с контрольной точки"""
+
+
+class JobStore:
+    """
+    Долговременная очередь задач в SQLite.
+    Несколько процессов могут работать с одним файлом: задачу забирает тот,
+    чей UPDATE первым сменит статус queued -> running
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, params BLOB NOT NULL, "
+            "status TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0, total INTEGER, "
+            "message TEXT, checkpoint BLOB, result BLOB, error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+            "owner TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, params, status, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, orjson.dumps(params), QUEUED, now, now)
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def claim_next(self, owner: str, max_attempts: int = 0) -> Optional[sqlite3.Row]:
+        """
+        забрать самую старую задачу из очереди; задача, которую уже забирали
+        max_attempts раз (процесс каждый раз падал), помечается неудавшейся
+        """
+        conn = self._connection()
+        while True:
+            row = conn.execute(
+                "SELECT id, kind, attempts FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            if max_attempts and row["attempts"] >= max_attempts:
+                failed = conn.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, error = ?, updated = ? WHERE id = ? AND status = ?",
+                    (FAILED, f"Job was interrupted {row['attempts']} times, giving up",
+                     time.time(), row["id"], QUEUED)
+                ).rowcount
+                if failed:
+                    logger.error("Job %s (%s) failed after %s attempts", row["id"], row["kind"], row["attempts"])
+                    JOBS_TOTAL.inc(kind=row["kind"], status=FAILED)
+                continue
+            claimed = conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, updated = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, owner, time.time(), row["id"], QUEUED)
+            ).rowcount
+            if claimed:
+                return self.get(row["id"])
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        fields["updated"] = time.time()
+        for key in ("checkpoint", "result"):
+            if key in fields and fields[key] is not None:
+                fields[key] = orjson.dumps(
+                    fields[key], default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY
+                )
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        self._connection().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+        )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """отменить задачу; возвращает новый статус или None, если задачи нет"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = ?, cancel_requested = 1, updated = ? WHERE id = ? AND status = ?",
+            (CANCELLED, now, job_id, QUEUED)
+        )
+        conn.execute(
+            "UPDATE jobs SET cancel_requested = 1, updated = ? WHERE id = ? AND status = ?",
+            (now, job_id, RUNNING)
+        )
+        row = self.get(job_id)
+        return row["status"] if row is not None else None
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        placeholders = ",".join("?" * len(job_ids))
+        self._connection().execute(
+            f"UPDATE jobs SET updated = ? WHERE id IN ({placeholders})", (time.time(), *job_ids)
+        )
+
+    def requeue(self, job_id: str) -> None:
+        """вернуть задачу в очередь после штатной остановки процесса (попытка не засчитывается)"""
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, owner = NULL, attempts = MAX(attempts - 1, 0), updated = ? "
+            "WHERE id = ? AND status = ?",
+            (QUEUED, time.time(), job_id, RUNNING)
+        )
+
+    def requeue_stale(self, stale_after: float) -> int:
+        """вернуть в очередь задачи, чей процесс перестал обновлять их (упал или перезапущен)"""
+        return self._connection().execute(
+            "UPDATE jobs SET status = ?, owner = NULL WHERE status = ? AND updated < ?",
+            (QUEUED, RUNNING, time.time() - stale_after)
+        ).rowcount
+
+
+class JobContext:
+    """интерфейс задачи к менеджеру: прогресс, контрольные точки, отмена"""
+
+    def __init__(self, store: JobStore, row: sqlite3.Row, stopping: Optional[threading.Event] = None):
+        self.store = store
+        self.stopping = stopping
+        self.job_id = row["id"]
+        self.kind = row["kind"]
+        self.params: Dict[str, Any] = orjson.loads(row["params"])
+        self.checkpoint: Dict[str, Any] = orjson.loads(row["checkpoint"]) if row["checkpoint"] else {}
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        fields: Dict[str, Any] = {"done": done}
+        if total is not None:
+            fields["total"] = total
+        if message is not None:
+            fields["message"] = message
+        self.store.update(self.job_id, **fields)
+
+    def save_checkpoint(self, checkpoint: Dict[str, Any], done: Optional[int] = None) -> None:
+        """сохранить состояние, с которого задача продолжится после перезапуска"""
+        self.checkpoint = checkpoint
+        fields: Dict[str, Any] = {"checkpoint": checkpoint}
+        if done is not None:
+            fields["done"] = done
+        self.store.update(self.job_id, **fields)
+
+    def check_cancelled(self) -> None:
+        if self.stopping is not None and self.stopping.is_set():
+            raise JobInterrupted(f"Job {self.job_id} was interrupted by shutdown")
+        if self.store.cancel_requested(self.job_id):
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+
+JobHandler = Callable[[JobContext], Any]
+
+
+class JobManager:
+    """
+    Фоновые задачи: очередь в SQLite и пул потоков-исполнителей.
+    Задачи, прерванные перезапуском, возвращаются в очередь и продолжают
+    работу с последней сохранённой контрольной точки
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, poll_interval: float = 1.0,
+                 stale_after: float = 60.0, max_attempts: int = 0):
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self._running: Dict[str, str] = {}
+        self._running_lock = threading.Lock()
+        self._slots = threading.Semaphore(workers)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = self.store.create(kind, params)
+        self._wakeup.set()
+        return job_id
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        row = self.store.get(job_id)
+        if row is None:
+            raise ValueError(f"Job '{job_id}' doesn't exist")
+        total = row["total"]
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "done": row["done"],
+            "total": total,
+            "progress": round(row["done"] / total, 4) if total else None,
+            "message": row["message"],
+            "attempts": row["attempts"],
+            "error": row["error"],
+            "created": row["created"],
+            "updated": row["updated"],
+        }
+
+    def result(self, job_id: str) -> Any:
+        row = self.store.get(job_id)
+        if row is None:
+            raise ValueError(f"Job '{job_id}' doesn't exist")
+        if row["status"] != SUCCEEDED:
+            raise ValueError(f"Job '{job_id}' is {row['status']}, result is not available")
+        return orjson.loads(row["result"]) if row["result"] else None
+
+    def cancel(self, job_id: str) -> str:
+        status = self.store.request_cancel(job_id)
+        if status is None:
+            raise ValueError(f"Job '{job_id}' doesn't exist")
+        return status
+
+    def start(self) -> None:
+        if self._dispatcher is not None:
+            return
+        requeued = self.store.requeue_stale(self.stale_after)
+        if requeued:
+            logger.info("Requeued %s interrupted job(s)", requeued)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Остановить исполнителей: выполняющиеся задачи получают JobInterrupted при следующей
+        проверке отмены и возвращаются в очередь. Задачи, не успевшие остановиться за timeout,
+        вернутся в очередь по JOB_STALE_SECONDS (потоки пула не фоновые — выход процесса их ждёт)
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=5)
+            self._dispatcher = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                with self._running_lock:
+                    running = list(self._running)
+                if not running:
+                    break
+                time.sleep(0.05)
+            else:
+                logger.warning("Job(s) %s didn't stop within %.0fs", ", ".join(running), timeout)
+            self._pool = None
+
+    def _dispatch(self) -> None:
+        last_maintenance = 0.0
+        while not self._stop.is_set():
+            now = time.time()
+            if now - last_maintenance >= self.stale_after / 3:
+                with self._running_lock:
+                    running = list(self._running)
+                self.store.heartbeat(running)
+                self.store.requeue_stale(self.stale_after)
+                last_maintenance = now
+
+            if not self._slots.acquire(timeout=self.poll_interval):
+                continue
+            try:
+                row = self.store.claim_next(self.owner, self.max_attempts)
+            except sqlite3.Error as e:
+                logger.warning("Job queue is unavailable: %s", e)
+                row = None
+            if row is None:
+                self._slots.release()
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._pool.submit(self._run, row)
+
+    def _run(self, row: sqlite3.Row) -> None:
+        context = JobContext(self.store, row, self._stop)
+        kind = context.kind
+        with self._running_lock:
+            self._running[context.job_id] = kind
+        JOBS_RUNNING.inc(kind=kind)
+        try:
+            context.check_cancelled()
+            result = self.handlers[kind](context)
+            self.store.update(context.job_id, status=SUCCEEDED, result=result, error=None)
+            JOBS_TOTAL.inc(kind=kind, status=SUCCEEDED)
+        except JobInterrupted:
+            logger.info("Job %s (%s) interrupted by shutdown, requeued", context.job_id, kind)
+            self.store.requeue(context.job_id)
+        except JobCancelled:
+            self.store.update(context.job_id, status=CANCELLED)
+            JOBS_TOTAL.inc(kind=kind, status=CANCELLED)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", context.job_id, kind)
+            self.store.update(context.job_id, status=FAILED, error=str(e))
+            JOBS_TOTAL.inc(kind=kind, status=FAILED)
+        finally:
+            with self._running_lock:
+                self._running.pop(context.job_id, None)
+            JOBS_RUNNING.dec(kind=kind)
+            self._slots.release()
+
+
+def retry(func: Callable[[], Any], attempts: int, backoff: float,
+          context: Optional[JobContext] = None) -> Any:
+    """повторить шаг задачи при ошибке с экспоненциальной паузой"""
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except (JobCancelled, ValueError):
+            # ValueError — ошибка во входных данных, повтор не поможет
+            raise
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            logger.warning("Job step failed (attempt %s/%s), retrying in %.1fs: %s",
+                           attempt, attempts, delay, e)
+            if context is not None:
+                context.check_cancelled()
+            time.sleep(delay)
@@ -0,0 +1,97 @@
+import atexit
+import logging
+import queue
+import reprlib
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from src.app.core.config import settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[QueueListener] = None
+# обработчик, установленный setup_logging: при повторном вызове заменяется, а не дублируется
+_handler: Optional[logging.Handler] = None
+
+
+class Truncated:
+    """
+    Ленивое представление значения для логов: repr строится только при
+    форматировании записи и обрезается до max_chars
+    """
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: Optional[int] = None):
+        self.value = value
+        self.max_chars = max_chars if max_chars is not None else settings.LOG_PAYLOAD_MAX_CHARS
+
+    def __str__(self) -> str:
+        short_repr = reprlib.Repr()
+        short_repr.maxstring = self.max_chars
+        short_repr.maxother = self.max_chars
+        short_repr.maxlevel = 3
+        text = short_repr.repr(self.value)
+        if len(text) > self.max_chars:
+            text = f"{text[:self.max_chars]}... ({len(text)} chars)"
+        return text
+
+    __repr__ = __str__
+
+
+def truncated(value: Any, max_chars: Optional[int] = None) -> Truncated:
+    """обернуть значение для логирования с обрезкой"""
+    return Truncated(value, max_chars)
+
+
+def setup_logging() -> None:
+    """
+    Настроить логирование сервиса. При LOG_ASYNC запись в поток вывода
+    уходит в отдельный поток через очередь, обработчик запроса только кладёт запись в очередь.
+    Повторный вызов заменяет ранее установленный обработчик
+    """
+    global _listener, _handler
+
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+        _handler = None
+    shutdown_logging()
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    if settings.LOG_ASYNC:
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        _handler = _DroppingQueueHandler(log_queue)
+    else:
+        _handler = stream_handler
+    root.addHandler(_handler)
+
+
+def shutdown_logging() -> None:
+    """дописать оставшиеся в очереди записи и остановить поток логирования"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    не блокирует запрос при переполненной очереди — запись отбрасывается.
+    Сообщение, как в QueueHandler.prepare, подставляется в потоке запроса:
+    аргументы могут измениться до того, как поток логирования до них дойдёт
+    """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
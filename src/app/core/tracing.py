@@ -0,0 +1,259 @@
+import contextvars
+import heapq
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+_current_span_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_span_id", default=None
+)
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "start_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.start_ns = time.time_ns()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def to_dict(self, trace_start: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round((self.start - trace_start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """трасса одного запроса: корневой спан и вложенные спаны стадий"""
+
+    def __init__(self, name: str, trace_id: Optional[str] = None,
+                 parent_span_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id or _new_id(16)
+        self.root = Span(name, parent_span_id, attributes or {})
+        self.spans: List[Span] = [self.root]
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": [span.to_dict(self.root.start) for span in self.spans],
+        }
+
+
+class SlowTraceSampler:
+    """хранит N самых медленных трасс (минимальная куча по длительности)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._heap: List[Tuple[float, int, Trace]] = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def offer(self, trace: Trace) -> None:
+        if self.size <= 0:
+            return
+        duration = trace.duration
+        with self._lock:
+            # быстрый отказ без блокировки кучи для заведомо быстрых запросов
+            if len(self._heap) >= self.size and duration <= self._heap[0][0]:
+                return
+            self._counter += 1
+            item = (duration, self._counter, trace)
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, item)
+            else:
+                heapq.heapreplace(self._heap, item)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = [trace for _, _, trace in sorted(self._heap, key=lambda item: -item[0])]
+        return [trace.to_dict() for trace in traces]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+
+
+class OTLPExporter:
+    """
+    Экспорт трасс в OpenTelemetry collector по OTLP/HTTP (JSON).
+    Отправка идёт из фонового потока, очередь ограничена — при переполнении трассы отбрасываются
+    """
+
+    def __init__(self, endpoint: str, service_name: str, queue_size: int = 1000,
+                 batch_size: int = 64, timeout: float = 5.0):
+        self.url = f"{endpoint.rstrip('/')}/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            pass
+
+    def _run(self) -> None:
+        import requests
+
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                requests.post(self.url, json=self._encode(batch), timeout=self.timeout)
+            except Exception as e:
+                logger.warning("OTLP export failed: %s", e)
+
+    def _encode(self, traces: List[Trace]) -> Dict[str, Any]:
+        spans = []
+        for trace in traces:
+            root_start = trace.root.start
+            for span in trace.spans:
+                start_ns = trace.root.start_ns + int((span.start - root_start) * 1e9)
+                spans.append({
+                    "traceId": trace.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 2 if span is trace.root else 1,
+                    "startTimeUnixNano": str(start_ns),
+                    "endTimeUnixNano": str(start_ns + int(span.duration * 1e9)),
+                    "attributes": [
+                        {"key": key, "value": {"stringValue": str(value)}}
+                        for key, value in span.attributes.items()
+                    ],
+                    "status": {"code": 2, "message": span.error} if span.error else {},
+                })
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": self.service_name}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "rag-service"}, "spans": spans}],
+            }]
+        }
+
+
+slow_traces = SlowTraceSampler(settings.TRACING_SLOW_TRACES)
+_exporter: Optional[OTLPExporter] = None
+if settings.TRACING_ENABLED and settings.TRACING_OTLP_ENDPOINT:
+    _exporter = OTLPExporter(settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME)
+
+
+def parse_traceparent(header: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """разобрать W3C traceparent: (trace_id, parent_span_id)"""
+    if not header:
+        return None, None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None,
+                **attributes: Any) -> Iterator[Optional[Trace]]:
+    """
+    Начать трассу запроса. По завершении трасса попадает в выборку
+    медленных запросов и, если настроено, экспортируется в collector
+    """
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+
+    trace_id, parent_span_id = parse_traceparent(traceparent)
+    trace = Trace(name, trace_id, parent_span_id, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span_id.set(trace.root.span_id)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = str(e)
+        raise
+    finally:
+        trace.root.end = time.perf_counter()
+        _current_span_id.reset(span_token)
+        _current_trace.reset(trace_token)
+        slow_traces.offer(trace)
+        if _exporter is not None:
+            _exporter.export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """спан стадии внутри текущей трассы; вне трассы ничего не делает"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    current = Span(name, _current_span_id.get(), attributes)
+    trace.spans.append(current)
+    token = _current_span_id.set(current.span_id)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = str(e)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span_id.reset(token)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def outgoing_headers() -> Dict[str, str]:
+    """заголовки для передачи контекста трассы во внешние сервисы"""
+    trace = _current_trace.get()
+    if trace is None:
+        return {}
+    span_id = _current_span_id.get() or trace.root.span_id
+    return {"traceparent": f"00-{trace.trace_id}-{span_id}-01"}
@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+WARMUP_QUERIES = registry.counter(
+    "rag_warmup_queries_total",
+    "Warm-up searches by outcome",
+    ("status",),
+)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+TIMED_OUT = "timed_out"
+FAILED = "failed"
+
+
+def load_queries(path: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Запросы прогрева из файла: по одному на строку — для всех коллекций,
+    "коллекция<TAB>запрос" — только для этой коллекции. Пустые строки и строки с # пропускаются
+    """
+    common: List[str] = []
+    by_collection: Dict[str, List[str]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            collection, tab, query = line.partition("\t")
+            if tab and query.strip():
+                by_collection[collection.strip()].append(query.strip())
+            else:
+                common.append(line)
+    return common, dict(by_collection)
+
+
+class Warmup:
+    """
+    Прогрев горячих коллекций в фоне после старта: запросы эмбеддятся пачкой (заполняя кеш
+    эмбеддингов) и прогоняются через CustomRAGManager.search, чтобы Qdrant поднял сегменты
+    и HNSW-графы в память. Пока прогрев идёт, ready() — False
+    """
+
+    def __init__(self, manager, collections: List[str], queries_path: str = "",
+                 queries_per_collection: int = 20, concurrency: int = 2, timeout: float = 300.0):
+        self.manager = manager
+        self.collections = collections
+        self.queries_path = queries_path
+        self.queries_per_collection = queries_per_collection
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.status = PENDING if collections else DONE
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._skipped = 0
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if not collections:
+            self._done.set()
+
+    def start(self) -> None:
+        if self._thread is not None or not self.collections:
+            return
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            collections = {name: dict(stats) for name, stats in self._stats.items()}
+        finished = self._finished or time.monotonic()
+        return {
+            "status": self.status,
+            "duration_s": round(finished - self._started, 3) if self._started else None,
+            "skipped": self._skipped,
+            "collections": collections,
+        }
+
+    def _plan(self) -> List[Tuple[str, str]]:
+        common: List[str] = []
+        by_collection: Dict[str, List[str]] = {}
+        if self.queries_path:
+            try:
+                common, by_collection = load_queries(self.queries_path)
+            except OSError as e:
+                logger.warning(f"Warm-up queries file is unavailable: {e}")
+
+        tasks: List[Tuple[str, str]] = []
+        for name in self.manager.expand_collections(self.collections):
+            if not self.manager.collection_exists(name):
+                logger.warning(f"Warm-up: collection '{name}' doesn't exist, skipped")
+                continue
+            # без запросов коллекцию всё равно стоит тронуть: хватит имени в качестве запроса
+            queries = (by_collection.get(name, []) + common)[:self.queries_per_collection] or [name]
+            self._stats[name] = {"queries": len(queries), "done": 0, "errors": 0, "max_ms": 0.0}
+            # заранее заполнить кеш эмбеддингов одним пакетным запросом
+            try:
+                self.manager.resolve(name).embedder.get_embeddings(queries)
+            except Exception as e:
+                logger.warning(f"Warm-up: embedding queries for '{name}' failed: {e}")
+            tasks.extend((name, query) for query in queries)
+        return tasks
+
+    def _search(self, deadline: float, name: str, query: str) -> None:
+        if self._stop.is_set() or time.monotonic() > deadline:
+            with self._lock:
+                self._skipped += 1
+            return
+        started = time.monotonic()
+        try:
+            self.manager.search(query, name, threshold=0.0)
+            outcome = "ok"
+        except Exception as e:
+            logger.debug(f"Warm-up search in '{name}' failed: {e}")
+            outcome = "error"
+        elapsed_ms = (time.monotonic() - started) * 1000
+        WARMUP_QUERIES.inc(status=outcome)
+        with self._lock:
+            stats = self._stats[name]
+            stats["done"] += 1
+            stats["errors"] += int(outcome == "error")
+            stats["max_ms"] = round(max(stats["max_ms"], elapsed_ms), 3)
+
+    def _run(self) -> None:
+        self._started = time.monotonic()
+        self.status = RUNNING
+        deadline = self._started + self.timeout
+        try:
+            tasks = self._plan()
+            logger.info(f"Warm-up started: {len(self._stats)} collection(s), {len(tasks)} queries")
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="warmup") as pool:
+                list(pool.map(lambda task: self._search(deadline, *task), tasks))
+            self.status = TIMED_OUT if self._skipped else DONE
+        except Exception:
+            logger.exception("Warm-up failed")
+            self.status = FAILED
+        finally:
+            self._finished = time.monotonic()
+            self._done.set()
+        logger.info(f"Warm-up {self.status} in {self._finished - self._started:.1f}s")
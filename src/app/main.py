@@ -1,10 +1,43 @@
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 from fastapi import FastAPI
-from src.app.api.endpoints import api_functions
+from src.app.core.config import settings
+from src.app.core.logging_config import setup_logging, shutdown_logging
+
+setup_logging()
+
+from src.app.api.endpoints import api_debug, api_functions, api_health, api_ingest, api_metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # синхронные вызовы функций выполняются в пуле потоков anyio;
+    # его размер должен покрывать лимиты контроля допуска
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    if settings.JOBS_ENABLED:
+        api_functions.function_executor.jobs.start()
+    api_health.warmup.start()
+    yield
+    api_health.warmup.stop()
+    if api_functions.function_executor.custom_rag_manager.write_buffer is not None:
+        api_functions.function_executor.custom_rag_manager.write_buffer.stop(
+            timeout=settings.WRITE_BEHIND_FLUSH_TIMEOUT
+        )
+    api_functions.function_executor.jobs.stop()
+    api_functions.function_executor.ingestion.shutdown()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="RAG Service",
     description="RAG-сервис с заменяемыми компонентами",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 app.include_router(api_functions.router, tags=["functions"])
+app.include_router(api_ingest.router, tags=["ingest"])
+app.include_router(api_metrics.router, tags=["metrics"])
+app.include_router(api_debug.router, tags=["debug"])
+app.include_router(api_health.router, tags=["health"])
@@ -0,0 +1,42 @@
+"""
+Запуск сервиса: python -m src.app.serve
+
+Число процессов задаётся WORKERS (0 — по числу ядер). При нескольких воркерах
+кеш эмбеддингов стоит держать в общем backend (CACHE_BACKEND=sqlite),
+иначе каждый процесс прогревает свою копию
+"""
+import logging
+import os
+
+import uvicorn
+
+from src.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count() -> int:
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    return os.cpu_count() or 1
+
+
+def main() -> None:
+    workers = worker_count()
+    if workers > 1 and settings.CACHE_BACKEND.lower() == "memory":
+        logger.warning(
+            "WORKERS=%s with CACHE_BACKEND=memory: every worker keeps its own cache, "
+            "use CACHE_BACKEND=sqlite to share it", workers
+        )
+    uvicorn.run(
+        "src.app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+    )
+
+
+if __name__ == "__main__":
+    main()
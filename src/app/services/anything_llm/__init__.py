@@ -0,0 +1,5 @@
+from .anythingllm_client import AnythingLLMClient
+from .async_client import AsyncAnythingLLMClient
+from .backend import AnythingLLMBackend
+
+__all__ = ["AnythingLLMClient", "AsyncAnythingLLMClient", "AnythingLLMBackend"]
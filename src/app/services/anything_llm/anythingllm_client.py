@@ -1,47 +1,56 @@
+from typing import Any, Dict, Optional
+
 import requests
 
 
+def workspace_payload(name: str, **kwargs) -> Dict[str, Any]:
+    """тело запроса создания рабочего пространства"""
+    payload = {
+        "name": name,
+        "similarityThreshold": kwargs.get("similarity_threshold", 0.7),
+        "openAiTemp": kwargs.get("temperature", 0.7),
+        "openAiHistory": kwargs.get("history_length", 20),
+        "chatMode": kwargs.get("chat_mode", "chat"),
+        "topN": kwargs.get("top_n", 4)
+    }
+
+    if "prompt" in kwargs:
+        payload["openAiPrompt"] = kwargs["prompt"]
+    if "refusal_response" in kwargs:
+        payload["queryRefusalResponse"] = kwargs["refusal_response"]
+    return payload
+
+
+def document_payload(text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {"text": text}
+    if metadata:
+        payload["metadata"] = metadata
+    return payload
+
+
 class AnythingLLMClient:
-    def __init__(self, base_url: str, api_key: str = "", verify_ssl: bool = False):
+    def __init__(self, base_url: str, api_key: str = "", verify_ssl: bool = False, timeout: float = 30.0):
         self.base_url = base_url.rstrip('/')
         self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
         self.verify = verify_ssl
+        self.timeout = timeout
+        self.session = requests.Session()
 
-    def create_workspace(self, name: str, **kwargs):
-        payload = {
-            "name": name,
-            "similarityThreshold": kwargs.get("similarity_threshold", 0.7),
-            "openAiTemp": kwargs.get("temperature", 0.7),
-            "openAiHistory": kwargs.get("history_length", 20),
-            "chatMode": kwargs.get("chat_mode", "chat"),
-            "topN": kwargs.get("top_n", 4)
-        }
-
-        if "prompt" in kwargs:
-            payload["openAiPrompt"] = kwargs["prompt"]
-        if "refusal_response" in kwargs:
-            payload["queryRefusalResponse"] = kwargs["refusal_response"]
-
-        response = requests.post(
-            f"{self.base_url}/api/workspace/new",
+    def _post(self, path: str, payload: Dict[str, Any]):
+        response = self.session.post(
+            f"{self.base_url}{path}",
             json=payload,
             headers=self.headers,
-            verify=self.verify
+            verify=self.verify,
+            timeout=self.timeout
         )
         return response.json()
 
-    def add_document(self, workspace_id: str, text: str):
-        response = requests.post(
-            f"{self.base_url}/api/workspace/{workspace_id}/document",
-            json={"text": text},
-            headers=self.headers
-        )
-        return response.json()
+    def create_workspace(self, name: str, **kwargs):
+        return self._post("/api/workspace/new", workspace_payload(name, **kwargs))
+
+    def add_document(self, workspace_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        return self._post(f"/api/workspace/{workspace_id}/document", document_payload(text, metadata))
 
     def query(self, workspace_id: str, message: str):
-        response = requests.post(
-            f"{self.base_url}/api/workspace/{workspace_id}/chat",
-            json={"message": message},
-            headers=self.headers
-        )
-        return response.json()
+        return self._post(f"/api/workspace/{workspace_id}/chat", {"message": message})
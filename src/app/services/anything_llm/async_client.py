@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
+
+import httpx
+import orjson
+from httpx_sse import aconnect_sse
+
+from .anythingllm_client import document_payload, workspace_payload
+
+logger = logging.getLogger(__name__)
+
+# ответы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class AsyncAnythingLLMClient:
+    """
+    Асинхронный клиент AnythingLLM: одно httpx-соединение (пул keep-alive) на все запросы,
+    пакетная загрузка документов с ограниченной конкурентностью и потоковый чат (SSE)
+    """
+
+    def __init__(self, base_url: str, api_key: str = "", verify_ssl: bool = False,
+                 timeout: float = 30.0, concurrency: int = 8, retries: int = 2):
+        """
+        Args:
+            base_url: URL AnythingLLM
+            api_key: API-ключ (Bearer)
+            verify_ssl: Проверять сертификат сервера
+            timeout: Таймаут запроса в секундах (для потокового чата — между событиями)
+            concurrency: Сколько документов загружать одновременно в add_documents
+            retries: Повторы при сетевых ошибках и ответах 429/502/503/504
+        """
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            verify=verify_ssl,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=self.concurrency * 2,
+                                max_keepalive_connections=self.concurrency),
+        )
+
+    async def __aenter__(self) -> "AsyncAnythingLLMClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Any:
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.post(path, json=payload)
+            except httpx.TransportError as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"AnythingLLM request {path} failed ({e}), retrying")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    response.raise_for_status()
+                    return orjson.loads(response.content)
+                logger.warning(f"AnythingLLM request {path} returned {response.status_code}, retrying")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def create_workspace(self, name: str, **kwargs) -> Any:
+        return await self._post("/api/workspace/new", workspace_payload(name, **kwargs))
+
+    async def add_document(self, workspace_id: str, text: str,
+                           metadata: Optional[Dict[str, Any]] = None) -> Any:
+        return await self._post(f"/api/workspace/{workspace_id}/document", document_payload(text, metadata))
+
+    async def add_documents(self, workspace_id: str, texts: Sequence[str],
+                            metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+                            concurrency: Optional[int] = None) -> List[Union[Any, Exception]]:
+        """
+        Загрузить много документов, не больше concurrency запросов одновременно.
+        Результаты — в порядке texts; для неудавшихся документов на месте результата исключение
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def one(index: int) -> Any:
+            metadata = metadatas[index] if metadatas and index < len(metadatas) else None
+            async with semaphore:
+                return await self.add_document(workspace_id, texts[index], metadata)
+
+        return await asyncio.gather(*(one(index) for index in range(len(texts))), return_exceptions=True)
+
+    async def query(self, workspace_id: str, message: str) -> Any:
+        return await self._post(f"/api/workspace/{workspace_id}/chat", {"message": message})
+
+    async def stream_chat(self, workspace_id: str, message: str,
+                          mode: str = "chat") -> AsyncIterator[Dict[str, Any]]:
+        """события потокового ответа (textResponseChunk, ...) по мере генерации; до события с close"""
+        async with aconnect_sse(self.client, "POST", f"/api/workspace/{workspace_id}/stream-chat",
+                                json={"message": message, "mode": mode}) as source:
+            source.response.raise_for_status()
+            async for event in source.aiter_sse():
+                if not event.data:
+                    continue
+                chunk = orjson.loads(event.data)
+                yield chunk
+                if chunk.get("error"):
+                    raise RuntimeError(f"AnythingLLM stream error: {chunk['error']}")
+                if chunk.get("close"):
+                    break
+
+    async def vector_search(self, workspace_id: str, query: str, top_n: int = 10,
+                            score_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """фрагменты рабочего пространства, близкие к запросу, без генерации ответа"""
+        payload: Dict[str, Any] = {"query": query, "topN": top_n}
+        if score_threshold is not None:
+            payload["scoreThreshold"] = score_threshold
+        result = await self._post(f"/api/workspace/{workspace_id}/vector-search", payload)
+        return result.get("results", []) if isinstance(result, dict) else []
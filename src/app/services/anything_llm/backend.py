@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from .async_client import AsyncAnythingLLMClient
+
+logger = logging.getLogger(__name__)
+
+
+class AnythingLLMBackend:
+    """
+    AnythingLLM с интерфейсом загрузки и поиска CustomRAGManager (коллекция — рабочее пространство),
+    чтобы сравнивать бэкенды на одних сценариях. Методы синхронные, как у менеджера: запросы
+    выполняет AsyncAnythingLLMClient в собственном цикле событий в фоновом потоке
+    """
+
+    def __init__(self, base_url: str, api_key: str = "", verify_ssl: bool = False,
+                 timeout: float = 30.0, concurrency: int = 8, top_n: int = 10):
+        self.top_n = top_n
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="anythingllm", daemon=True)
+        self._thread.start()
+        self.client: AsyncAnythingLLMClient = self._run(self._make_client(
+            base_url, api_key, verify_ssl, timeout, concurrency
+        ))
+
+    @staticmethod
+    async def _make_client(*args) -> AsyncAnythingLLMClient:
+        # httpx.AsyncClient создаётся внутри цикла, в котором будет работать
+        return AsyncAnythingLLMClient(*args)
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self) -> None:
+        self._run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def create_collection(self, collection_name: str, **kwargs) -> str:
+        """создать рабочее пространство; возвращает его slug — имя коллекции для остальных методов"""
+        result = self._run(self.client.create_workspace(collection_name, **kwargs))
+        workspace = result.get("workspace") if isinstance(result, dict) else None
+        return (workspace or {}).get("slug") or collection_name
+
+    def add_document(self, text: str, collection_name: str,
+                     metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        result = self._run(self.client.add_document(collection_name, text, metadata))
+        payload = {"text": text, **(metadata or {})}
+        return {"addition_result": {"id": _document_id(result), "payload": payload}}
+
+    def batch_add_documents(self, documents: List[str],
+                            metadatas: Optional[List[Dict]] = None,
+                            collection_name: Optional[str] = None) -> Dict[str, Any]:
+        results = self._run(self.client.add_documents(collection_name, documents, metadatas))
+        failed = {index for index, result in enumerate(results) if isinstance(result, Exception)}
+        if failed:
+            logger.error(f"AnythingLLM batch add: {len(failed)} of {len(documents)} documents failed, "
+                         f"first error: {results[min(failed)]}")
+            if len(failed) == len(documents):
+                raise results[min(failed)]
+        return {
+            "status": "partial" if failed else "success",
+            "message": f"Added {len(documents) - len(failed)} documents to '{collection_name}'",
+            "collection": collection_name,
+            "count": len(documents) - len(failed),
+            "point_ids": [None if index in failed else _document_id(result)
+                          for index, result in enumerate(results)],
+            "failed": sorted(failed),
+        }
+
+    def search(self, query: str, collection_name: str, threshold: float = 0.8) -> Dict[str, Any]:
+        if not collection_name or not isinstance(collection_name, str):
+            return {}
+        results = self._run(self.client.vector_search(collection_name, query, self.top_n, threshold))
+        return {"search_result": [
+            {
+                "id": item.get("id"),
+                "score": item.get("score"),
+                "payload": {"text": item.get("text", ""), **(item.get("metadata") or {})},
+            }
+            for item in results
+        ]}
+
+
+def _document_id(result: Any) -> Any:
+    if not isinstance(result, dict):
+        return None
+    document = result.get("document")
+    return (document if isinstance(document, dict) else result).get("id")
@@ -0,0 +1,24 @@
+from functools import lru_cache
+from typing import List
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+@lru_cache(maxsize=16)
+def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Разбить текст на чанки
+    Args:
+        text: Текст документа
+        chunk_size: Максимальный размер чанка в символах
+        chunk_overlap: Перекрытие соседних чанков в символах
+    Returns:
+        Список чанков (для короткого текста — один чанк)
+    """
+    if len(text) <= chunk_size:
+        return [text]
+    return _splitter(chunk_size, chunk_overlap).split_text(text)
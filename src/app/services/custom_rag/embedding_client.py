@@ -1,6 +1,15 @@
+import base64
+import hashlib
 import requests
 import logging
-from typing import List
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import orjson
+
+from ...core.cache import Cache
+from ...core.metrics import BATCH_SIZE, measure_stage
+from ...core.tracing import outgoing_headers
 
 logger = logging.getLogger(__name__)
 
@@ -8,26 +17,41 @@ logger = logging.getLogger(__name__)
 class EmbeddingClient:
     """Клиент для сервиса эмбеддингов"""
 
-    def __init__(self, base_url: str, timeout: int = 30):
+    def __init__(self, base_url: str, timeout: int = 30, encoding_format: str = "base64",
+                 model: str = "", cache: Optional[Cache] = None):
         """
         Args:
             base_url: URL сервиса эмбеддингов (например, "http://gpt-dev.com:8000")
             timeout: Таймаут запроса в секундах
+            encoding_format: "base64" (float32 в base64) или "float" (JSON-списки);
+                если сервер не поддерживает base64, клиент переключается на float
+            model: Имя модели для поля "model" запроса (пусто — не передаётся)
+            cache: Кеш эмбеддингов (ключ — модель и текст)
         """
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
+        self.encoding_format = encoding_format
+        self.model = model
+        self.cache = cache
+        self.session = requests.Session()
 
-    def get_embedding(self, text: str) -> List[float]:
+    @property
+    def model_id(self) -> str:
+        """идентификатор модели: имя, если задано, иначе адрес сервиса"""
+        return self.model or self.base_url
+
+    def get_embedding(self, text: str) -> np.ndarray:
         """
         Получить эмбеддинг для текста
         Args:
             text: Текст для векторизации
         Returns:
-            Список чисел (эмбеддинг)
+            Вектор float32
         """
         return self.get_embeddings([text])[0]
 
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+    @measure_stage("embed", upstream="embedding")
+    def get_embeddings(self, texts: List[str]) -> List[np.ndarray]:
         """
         Получить эмбеддинги для списка текстов
 
@@ -35,30 +59,78 @@ class EmbeddingClient:
             texts: Список текстов для векторизации
 
         Returns:
-            Список эмбеддингов
+            Список векторов float32
         """
         if not texts:
             return []
-
+        if self.cache is None:
+            return self._request_embeddings(texts)
+
+        keys = [self._cache_key(text) for text in texts]
+        cached = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        # копия: np.frombuffer над bytes только для чтения, а встроенный Qdrant нормализует вектор запроса на месте
+        vectors = {key: np.frombuffer(value, dtype="<f4").copy() for key, value in cached.items()}
+        if missing:
+            fetched = self._request_embeddings(list(missing.values()))
+            if len(fetched) != len(missing):
+                return self._request_embeddings(texts)
+            new_items = dict(zip(missing.keys(), fetched))
+            self.cache.set_many({
+                key: vector.astype("<f4", copy=False).tobytes() for key, vector in new_items.items()
+            })
+            vectors.update(new_items)
+
+        return [vectors[key] for key in keys]
+
+    def _cache_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def _request_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """запрос эмбеддингов у сервиса"""
+        BATCH_SIZE.observe(len(texts), stage="embed")
         url = f"{self.base_url}/v1/embeddings"
         payload = {
             "input": texts
         }
+        if self.model:
+            payload["model"] = self.model
+        if self.encoding_format != "float":
+            payload["encoding_format"] = self.encoding_format
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 url,
                 json=payload,
+                headers=outgoing_headers(),
                 timeout=self.timeout
             )
+            if response.status_code in (400, 422) and "encoding_format" in payload:
+                logger.warning(
+                    f"Сервис эмбеддингов не принял encoding_format={self.encoding_format}, "
+                    f"переключаюсь на float"
+                )
+                self.encoding_format = "float"
+                del payload["encoding_format"]
+                response = self.session.post(
+                    url,
+                    json=payload,
+                    headers=outgoing_headers(),
+                    timeout=self.timeout
+                )
             response.raise_for_status()
 
-            data = response.json()
+            data = orjson.loads(response.content)
 
             embeddings = []
             for item in data.get("data", []):
                 if "embedding" in item:
-                    embeddings.append(item["embedding"])
+                    embeddings.append(self._decode(item["embedding"]))
 
             if len(embeddings) != len(texts):
                 logger.warning(
@@ -71,15 +143,22 @@ class EmbeddingClient:
         except requests.exceptions.RequestException as e:
             logger.error(f"Ошибка при запросе эмбеддингов: {e}")
             raise Exception(f"Embedding service error: {str(e)}")
-        except (KeyError, ValueError) as e:
+        except (KeyError, ValueError, TypeError) as e:
             logger.error(f"Ошибка парсинга ответа от эмбеддинг-сервиса: {e}")
             raise Exception(f"Invalid response from embedding service: {str(e)}")
 
+    @staticmethod
+    def _decode(embedding: Union[str, List[float]]) -> np.ndarray:
+        """base64 -> float32 (изменяемый массив, как и для списка чисел); список чисел -> float32"""
+        if isinstance(embedding, str):
+            return np.frombuffer(base64.b64decode(embedding), dtype="<f4").copy()
+        return np.asarray(embedding, dtype=np.float32)
+
     def test_connection(self) -> bool:
         """Проверить подключение к сервису"""
         try:
             url = f"{self.base_url}/v1/embeddings"
-            response = requests.post(
+            response = self.session.post(
                 url,
                 json={"input": ["test"]},
                 timeout=5
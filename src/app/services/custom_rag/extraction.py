@@ -0,0 +1,171 @@
+# извлечение текста по страницам; функции верхнего уровня выполняются в процессах пула IngestionPipeline
+import os
+import re
+import zipfile
+from html.parser import HTMLParser
+from typing import Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+# (номер страницы с 1, текст)
+Page = Tuple[int, str]
+
+TEXT_EXTENSIONS = (".txt", ".md", ".csv", ".log")
+HTML_EXTENSIONS = (".html", ".htm")
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# страница docx/текста без разметки страниц — по числу символов
+_PSEUDO_PAGE_CHARS = 20000
+
+_SPACES_RE = re.compile(r"[ \t\f\v\u00a0]+")
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\n(\w)")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def file_kind(name: str) -> str:
+    """тип файла по расширению: text, html, pdf или docx"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        return "text"
+    if extension in HTML_EXTENSIONS:
+        return "html"
+    if extension == ".pdf":
+        return "pdf"
+    if extension == ".docx":
+        return "docx"
+    raise ValueError(f"Unsupported file type: {extension or name}")
+
+
+def normalize_whitespace(text: str) -> str:
+    """схлопнуть пробелы, склеить переносы по дефису, убрать лишние пустые строки"""
+    text = text.replace("\x00", "").replace("\r\n", "\n").replace("\r", "\n")
+    text = _SPACES_RE.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    text = _HYPHEN_BREAK_RE.sub(r"\1\2", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def pdf_page_count(path: str) -> int:
+    return len(_pdf_reader(path).pages)
+
+
+def extract_pages(path: str, kind: str, start: int = 0, end: Optional[int] = None) -> List[Page]:
+    """
+    Страницы файла [start, end) с нормализованным текстом; пустые страницы пропускаются.
+    Диапазон имеет смысл для pdf, остальные типы извлекаются целиком
+    """
+    if kind == "pdf":
+        pages = _pdf_pages(path, start, end)
+    elif kind == "docx":
+        pages = _paginate(_docx_paragraphs(path))
+    elif kind == "html":
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages = _paginate(_html_blocks(f.read()))
+    else:
+        pages = _text_pages(path)
+
+    result = []
+    for number, text in pages:
+        text = normalize_whitespace(text)
+        if text:
+            result.append((number, text))
+    return result
+
+
+def _pdf_reader(path: str):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ValueError("PDF extraction requires the 'pypdf' package")
+    return PdfReader(path)
+
+
+def _pdf_pages(path: str, start: int, end: Optional[int]) -> Iterator[Page]:
+    reader = _pdf_reader(path)
+    end = len(reader.pages) if end is None else min(end, len(reader.pages))
+    for index in range(start, end):
+        yield index + 1, reader.pages[index].extract_text() or ""
+
+
+def _text_pages(path: str) -> Iterator[Page]:
+    """текстовый файл: страницы по символу перевода страницы, иначе по размеру"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if "\f" in text:
+        for number, page in enumerate(text.split("\f"), start=1):
+            yield number, page
+    else:
+        yield from _paginate(iter(text.split("\n")))
+
+
+def _paginate(blocks: Iterator[str]) -> Iterator[Page]:
+    """склеить блоки (абзацы, строки) в псевдостраницы ограниченного размера"""
+    number, page, size = 1, [], 0
+    for block in blocks:
+        page.append(block)
+        size += len(block) + 1
+        if size >= _PSEUDO_PAGE_CHARS:
+            yield number, "\n".join(page)
+            number, page, size = number + 1, [], 0
+    if page:
+        yield number, "\n".join(page)
+
+
+def _docx_paragraphs(path: str) -> Iterator[str]:
+    """абзацы docx прямо из word/document.xml, без python-docx"""
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+        parts: List[str] = []
+        for event, element in ElementTree.iterparse(document, events=("end",)):
+            if element.tag == f"{_WORD_NS}t" and element.text:
+                parts.append(element.text)
+            elif element.tag == f"{_WORD_NS}tab":
+                parts.append("\t")
+            elif element.tag in (f"{_WORD_NS}br", f"{_WORD_NS}cr"):
+                parts.append("\n")
+            elif element.tag == f"{_WORD_NS}p":
+                yield "".join(parts)
+                parts = []
+                element.clear()
+
+
+class _HTMLText(HTMLParser):
+    _SKIP = {"script", "style", "noscript", "template", "head"}
+    _BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+              "section", "article", "pre", "blockquote", "table", "ul", "ol"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[str] = []
+        self._current: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag in self._BLOCK:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self._BLOCK:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._current.append(data)
+
+    def _flush(self):
+        if self._current:
+            self.blocks.append("".join(self._current))
+            self._current = []
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _html_blocks(html: str) -> Iterator[str]:
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    return iter(parser.blocks)
@@ -0,0 +1,165 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .chunking import split_text
+from .extraction import extract_pages, file_kind, pdf_page_count
+from .sync import chunk_point_id
+from .vector_client import build_filter
+from ...core.config import settings
+from ...core.metrics import measure
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionPipeline:
+    """
+    Загрузка файлов: текст извлекается по страницам в пуле процессов,
+    готовые страницы сразу режутся на чанки и отправляются на эмбеддинг пачками —
+    извлечение следующих страниц идёт параллельно с запросами к сервису эмбеддингов
+    """
+
+    def __init__(self, manager, workers: int = 0, pdf_pages_per_task: int = 16):
+        """
+        Args:
+            manager: CustomRAGManager
+            workers: Число процессов (0 — по числу доступных ядер)
+            pdf_pages_per_task: Сколько страниц PDF извлекает одна задача пула
+        """
+        self.manager = manager
+        if not workers:
+            workers = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") \
+                else os.cpu_count() or 1
+        self.workers = workers
+        self.pdf_pages_per_task = pdf_pages_per_task
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: fork многопоточного процесса сервера небезопасен
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def ingest_files(self, collection_name: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Извлечь, разбить на чанки и загрузить файлы
+
+        Args:
+            collection_name: Имя коллекции
+            files: Список {"path": ..., "source": имя для payload (по умолчанию имя файла),
+                "metadata": {...}}
+
+        Returns:
+            Число страниц и чанков по каждому файлу, число удалённых чанков прежней версии
+            файла (и ошибка, если файл не удалось разобрать)
+        """
+        futures: Dict[Future, int] = {}
+        stats: List[Dict[str, Any]] = []
+        written: List[Set[str]] = [set() for _ in files]
+        for file_index, file in enumerate(files):
+            path = file["path"]
+            source = file.get("source") or os.path.basename(path)
+            kind = file_kind(source)
+            stats.append({"source": source, "pages": 0, "chunks": 0})
+            for start, end in self._page_ranges(path, kind):
+                future = self.pool.submit(extract_pages, path, kind, start, end)
+                futures[future] = file_index
+
+        batch: List[Tuple[str, Dict[str, Any], str]] = []
+        for future in as_completed(futures):
+            file_index = futures[future]
+            file = files[file_index]
+            source = stats[file_index]["source"]
+            try:
+                pages = future.result()
+            except BrokenProcessPool as e:
+                # процесс пула упал (например, по памяти) — следующий вызов создаст новый пул
+                self.shutdown()
+                logger.error(f"Text extraction from '{source}' failed: {e}")
+                stats[file_index]["error"] = str(e)
+                continue
+            except Exception as e:
+                logger.error(f"Text extraction from '{source}' failed: {e}")
+                stats[file_index]["error"] = str(e)
+                continue
+            stats[file_index]["pages"] += len(pages)
+
+            with measure("chunk"):
+                for page_number, text in pages:
+                    for chunk_index, chunk in enumerate(
+                            split_text(text, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)):
+                        metadata = dict(file.get("metadata") or {})
+                        metadata.update({
+                            "doc_id": source, "source": source,
+                            "page": page_number, "chunk_index": chunk_index,
+                        })
+                        # повторная загрузка того же файла перезаписывает его чанки
+                        point_id = chunk_point_id(collection_name, f"{source}#{page_number}", chunk_index)
+                        batch.append((chunk, metadata, point_id))
+                        written[file_index].add(point_id)
+                        stats[file_index]["chunks"] += 1
+
+            while len(batch) >= settings.EMBED_BATCH_SIZE:
+                self._flush(collection_name, batch[:settings.EMBED_BATCH_SIZE])
+                batch = batch[settings.EMBED_BATCH_SIZE:]
+
+        if batch:
+            self._flush(collection_name, batch)
+
+        # файл мог стать короче: чанки прежней версии, которые не перезаписаны, удаляются
+        for file_stats, point_ids in zip(stats, written):
+            if "error" not in file_stats:
+                file_stats["deleted"] = self._delete_stale(collection_name, file_stats["source"], point_ids)
+
+        logger.info(f"Ingested {len(files)} file(s) into '{collection_name}': {stats}")
+        return {"ingestion_result": stats}
+
+    def _page_ranges(self, path: str, kind: str) -> List[Tuple[int, Optional[int]]]:
+        """диапазоны страниц для задач пула: PDF делится на части, остальное — целиком"""
+        if kind != "pdf":
+            return [(0, None)]
+        count = pdf_page_count(path)
+        step = max(1, self.pdf_pages_per_task)
+        return [(start, min(start + step, count)) for start in range(0, count, step)] or [(0, None)]
+
+    def _delete_stale(self, collection_name: str, source: str, keep: Set[str]) -> int:
+        """удалить точки файла source, которых нет среди только что записанных"""
+        target = self.manager.resolve(collection_name)
+        vector_db = self.manager.vector_db
+        stale = [
+            point.id
+            for points in vector_db.scroll_points(target.physical, build_filter({"source": source}),
+                                                  with_payload=False, batch_size=1024,
+                                                  tenant=target.tenant)
+            for point in points
+            if str(point.id) not in keep
+        ]
+        if stale:
+            # через менеджер: удаление учитывается миграцией коллекции, если она идёт
+            self.manager.delete_documents(collection_name, stale)
+            logger.info(f"Deleted {len(stale)} stale chunk(s) of '{source}' from '{collection_name}'")
+        return len(stale)
+
+    def _flush(self, collection_name: str, batch: List[Tuple[str, Dict[str, Any], str]]) -> None:
+        self.manager.batch_add_documents(
+            [chunk for chunk, _, _ in batch],
+            metadatas=[metadata for _, metadata, _ in batch],
+            collection_name=collection_name,
+            ids=[point_id for _, _, point_id in batch]
+        )
@@ -1,6 +1,7 @@
 import requests
 import logging
 from typing import Optional, Dict, Any
+from ...core.tracing import outgoing_headers
 
 logger = logging.getLogger(__name__)
 
@@ -104,7 +105,7 @@ class LLMClient:
             response = requests.post(
                 url,
                 json=payload,
-                headers=self.headers,
+                headers={**self.headers, **outgoing_headers()},
                 timeout=self.timeout
             )
             response.raise_for_status()
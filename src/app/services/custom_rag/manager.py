@@ -1,21 +1,196 @@
+import contextlib
+import contextvars
+import fnmatch
 import logging
-from typing import List, Dict, Any, Optional
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, NamedTuple, Optional, Union
+from .chunking import split_text
 from .embedding_client import EmbeddingClient
-from .vector_client import VectorClient
+from .migration_log import MigrationLog
+from .search_params import ProfileSelector, SearchParamsStore, validate_search_params
+from .sync import SyncManifest, chunk_point_id, config_fingerprint, content_hash, rehash_payload
+from .tenants import TenantRegistry
+from .vector_client import TENANT_FIELD, VectorClient, build_filter, new_point_ids
+from .write_buffer import Entry, WriteBuffer, is_connection_error
+from ...core.admission import AdmissionRejected
+from ...core.cache import create_cache
 from ...core.config import settings
+from ...core.metrics import SEARCH_PROFILES
 
 logger = logging.getLogger(__name__)
 
+# физическая коллекция модели: <коллекция>__<модель>, за алиасом <коллекция>
+MODEL_SEPARATOR = "__"
+
+
+def _is_transient(error: Exception) -> bool:
+    """для отложенной записи: сетевые ошибки и барьер переключения коллекции повторяются без ограничения"""
+    return isinstance(error, AdmissionRejected) or is_connection_error(error)
+
+
+class Target(NamedTuple):
+    """куда идут запросы к логической коллекции"""
+    physical: str
+    embedder: EmbeddingClient
+    # арендатор в общей коллекции (None — коллекция целиком)
+    tenant: Optional[str] = None
+
 
 class CustomRAGManager:
     def __init__(self):
-        self.embedder = EmbeddingClient(base_url=settings.EMBEDDING_URL)
+        self.embedder = EmbeddingClient(
+            base_url=settings.EMBEDDING_URL,
+            encoding_format=settings.EMBEDDING_ENCODING_FORMAT,
+            model=settings.EMBEDDING_MODEL,
+            cache=create_cache("embeddings")
+        )
         self.vector_db = VectorClient(
-            url=f"{settings.QDRANT_HOST}:{settings.QDRANT_PORT}"
+            url=f"{settings.QDRANT_HOST}:{settings.QDRANT_PORT}",
+            location=settings.QDRANT_LOCATION or None,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            connections=settings.QDRANT_CONNECTIONS,
+            alias_ttl=settings.QDRANT_ALIAS_CACHE_SECONDS
         )
+        self._embedders: Dict[str, EmbeddingClient] = {settings.EMBEDDING_MODEL_NAME: self.embedder}
+        self._embedders_lock = threading.Lock()
+        self._search_pool = ThreadPoolExecutor(
+            max_workers=settings.FEDERATED_SEARCH_WORKERS, thread_name_prefix="search"
+        )
+        self.tenants = TenantRegistry(
+            self.vector_db,
+            registry_collection=settings.MULTITENANT_REGISTRY,
+            shard_prefix=settings.MULTITENANT_PREFIX,
+            shards=settings.MULTITENANT_SHARDS,
+            ttl=settings.QDRANT_ALIAS_CACHE_SECONDS,
+            keyword_indexes=(settings.SEARCH_GROUP_BY,)
+        )
+        self.sync_manifest = SyncManifest(settings.SYNC_MANIFEST_PATH)
+        self.migration_log = MigrationLog(settings.MIGRATION_LOG_PATH)
+        self._writes = threading.local()
+        self.search_params = SearchParamsStore(
+            settings.SEARCH_PARAMS_PATH, ttl=settings.QDRANT_ALIAS_CACHE_SECONDS
+        )
+        self.profiles = ProfileSelector(settings.SEARCH_PROFILES)
+        self.write_buffer: Optional[WriteBuffer] = None
+        if settings.WRITE_BEHIND_ENABLED:
+            self.write_buffer = WriteBuffer(
+                settings.WRITE_BEHIND_PATH,
+                self._flush_buffered,
+                batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+                max_delay=settings.WRITE_BEHIND_MAX_DELAY,
+                max_attempts=settings.WRITE_BEHIND_MAX_ATTEMPTS,
+                retry_window=settings.WRITE_BEHIND_FLUSH_TIMEOUT,
+                lease=settings.WRITE_BEHIND_LEASE_SECONDS,
+                is_transient=_is_transient
+            )
+            # недописанные до падения документы дописываются сразу
+            self.write_buffer.start()
         self.embedding_dimension = self._get_embedding_dimension()
         logger.info(f"RAG manager initialized. Embedding dimension: {self.embedding_dimension}")
 
+    def embedder_for_model(self, model_name: str) -> EmbeddingClient:
+        """Клиент эмбеддингов модели из EMBEDDING_MODELS (или базовой модели)"""
+        with self._embedders_lock:
+            embedder = self._embedders.get(model_name)
+            if embedder is not None:
+                return embedder
+            config = settings.EMBEDDING_MODELS.get(model_name)
+            if config is None or not config.get("url"):
+                raise ValueError(f"Unknown embedding model: {model_name}")
+            embedder = EmbeddingClient(
+                base_url=config["url"],
+                encoding_format=config.get("encoding_format", settings.EMBEDDING_ENCODING_FORMAT),
+                model=config.get("model", ""),
+                cache=self.embedder.cache
+            )
+            self._embedders[model_name] = embedder
+            return embedder
+
+    def resolve(self, collection_name: str) -> Target:
+        """
+        Физическая коллекция за именем (алиасом) и клиент эмбеддингов её модели.
+        Запросы идут в физическую коллекцию, а не в алиас: воркер с устаревшим кешем
+        алиасов получит старую коллекцию вместе со старой моделью, а не смесь.
+        При MULTITENANT_ENABLED имя арендатора разрешается в общую коллекцию-шард
+        """
+        if settings.MULTITENANT_ENABLED:
+            shard = self.tenants.get(collection_name)
+            if shard is not None:
+                return Target(shard, self.embedder, collection_name)
+        physical = self.vector_db.resolve_collection(collection_name)
+        model_name = self.model_name_of(physical)
+        if model_name is not None:
+            return Target(physical, self.embedder_for_model(model_name))
+        return Target(physical, self.embedder)
+
+    def is_tenant(self, collection_name: str) -> bool:
+        return settings.MULTITENANT_ENABLED and self.tenants.get(collection_name) is not None
+
+    def collection_exists(self, collection_name: str) -> bool:
+        """Существует ли коллекция, алиас или арендатор с таким именем"""
+        if settings.MULTITENANT_ENABLED:
+            if self.tenants.is_internal(collection_name):
+                return False
+            if self.tenants.get(collection_name) is not None:
+                return True
+        if self.vector_db.collection_exists(collection_name):
+            return True
+        # арендатора мог создать другой воркер — при промахе реестр перечитывается
+        return settings.MULTITENANT_ENABLED \
+            and self.tenants.get(collection_name, refresh=True) is not None
+
+    def collection_info(self, collection_name: str) -> Dict[str, Any]:
+        """Информация о коллекции; для арендатора — число его точек"""
+        target = self.resolve(collection_name)
+        if target.tenant is None:
+            return self.vector_db.get_collection_info(collection_name)
+        return {
+            "id": collection_name,
+            "vectors_count": self.vector_db.count_points(target.physical, tenant=target.tenant),
+            "vector_size": self.vector_db.vector_size(target.physical),
+            "status": "tenant",
+            "shard": target.physical,
+        }
+
+    @staticmethod
+    def model_name_of(physical: str) -> Optional[str]:
+        """имя модели по имени физической коллекции <коллекция>__<модель> (None — не указана)"""
+        _, separator, model_name = physical.rpartition(MODEL_SEPARATOR)
+        if separator and (model_name == settings.EMBEDDING_MODEL_NAME
+                          or model_name in settings.EMBEDDING_MODELS):
+            return model_name
+        return None
+
+    def create_collection(self, collection_name: str, vector_size: Optional[int] = None,
+                          model_name: Optional[str] = None) -> str:
+        """
+        Создать коллекцию (по умолчанию — для базовой модели). При QDRANT_COLLECTION_ALIASES
+        создаётся <коллекция>__<модель> и алиас <коллекция> на неё.
+        При MULTITENANT_ENABLED коллекция базовой модели создаётся арендатором в общем шарде
+        """
+        if settings.MULTITENANT_ENABLED and self.tenants.is_internal(collection_name):
+            raise ValueError(f"Collection name '{collection_name}' is reserved for shared tenant collections")
+        vector_size = vector_size or self.embedding_dimension
+        if settings.MULTITENANT_ENABLED and vector_size == self.embedding_dimension \
+                and model_name in (None, settings.EMBEDDING_MODEL_NAME):
+            return self.tenants.create(collection_name, vector_size)
+        if not settings.QDRANT_COLLECTION_ALIASES:
+            self.vector_db.create_collection(
+                collection_name, vector_size=vector_size, keyword_indexes=(settings.SEARCH_GROUP_BY,)
+            )
+            return collection_name
+
+        physical = f"{collection_name}{MODEL_SEPARATOR}{model_name or settings.EMBEDDING_MODEL_NAME}"
+        self.vector_db.create_collection(
+            physical, vector_size=vector_size, keyword_indexes=(settings.SEARCH_GROUP_BY,)
+        )
+        self.vector_db.switch_alias(collection_name, physical)
+        return physical
+
     def _get_embedding_dimension(self) -> int:
         """Определить размерность эмбеддингов"""
         try:
@@ -30,6 +205,7 @@ class CustomRAGManager:
 
     def add_document(self, text: str, collection_name: str,
                      metadata: Optional[Dict] = None,
+                     write_behind: Optional[bool] = None,
                      ) -> Dict[str, Any]:
         """
         Добавить документ в базу знаний
@@ -38,18 +214,121 @@ class CustomRAGManager:
             text: Текст документа
             metadata: Дополнительные метаданные
             collection_name: Имя коллекции (обязательно)
+            write_behind: Отложенная запись (по умолчанию — при WRITE_BEHIND_ENABLED): документ
+                пишется в журнал и подтверждается сразу, в Qdrant попадает в фоне; см. flush_writes
 
         Returns:
             Словарь с результатом
         """
-        embedding = self.embedder.get_embedding(text)
+        if write_behind is None:
+            write_behind = self.write_buffer is not None
+        if write_behind:
+            return self._add_buffered(text, collection_name, metadata)
+
+        with self._writing(collection_name) as touched:
+            target = self.resolve(collection_name)
+            embedding = target.embedder.get_embedding(text)
+            self._check_dimensions([embedding], target.physical)
+
+            payload = self._document_payload(text, metadata)
+            self._tag(payload, target)
+            result = self.vector_db.upsert_points(
+                collection_name=target.physical,
+                vector=embedding,
+                payload=payload
+            )
+            touched.append(result["point_id"])
+        results = {
+                "addition_result": {
+                    "id": result.get("point_id", "N/A"),
+                    # "text": text,
+                    "payload": payload,
+                    # "collection_name": collection_name,
+                    # "embedding_dimension": len(embedding),
+                    # "embedding": embedding,
+                }
+            }
+
+        return results
+
+    def _add_buffered(self, text: str, collection_name: str, metadata: Optional[Dict]) -> Dict[str, Any]:
+        """принять документ в журнал отложенной записи; ID точки назначается сразу"""
+        if self.write_buffer is None:
+            raise ValueError("Write-behind is disabled (WRITE_BEHIND_ENABLED)")
+        payload = self._document_payload(text, metadata)
+        point_id = new_point_ids(1)[0]
+        self.write_buffer.append(collection_name, [(point_id, text, payload)])
+        return {"addition_result": {"id": point_id, "payload": payload, "pending": True}}
 
-        if len(embedding) != self.embedding_dimension:
-            logger.warning(
-                f"Embedding dimension mismatch: "
-                f"expected {self.embedding_dimension}, got {len(embedding)}"
+    def _flush_buffered(self, collection_name: str, entries: List[Entry]) -> None:
+        """
+        записать пачку документов из журнала; коллекция разрешается в момент записи,
+        так что документы, принятые до миграции, попадают в новую коллекцию
+        """
+        if not self.collection_exists(collection_name):
+            raise ValueError(f"Collection '{collection_name}' doesn't exist")
+        with self._writing(collection_name) as touched:
+            target = self.resolve(collection_name)
+            embeddings = target.embedder.get_embeddings([text for _, _, text, _ in entries])
+            self._check_dimensions(embeddings, target.physical)
+            point_ids = [point_id for _, point_id, _, _ in entries]
+            self.vector_db.upsert_batch(
+                collection_name=target.physical,
+                vectors=embeddings,
+                payloads=[self._tag(payload, target) for _, _, _, payload in entries],
+                ids=point_ids
             )
+            touched.extend(point_ids)
 
+    def flush_writes(self, collection_name: Optional[str] = None, timeout: Optional[float] = None,
+                     retry_failed: bool = False) -> Dict[str, Any]:
+        """
+        Барьер отложенной записи: дождаться, пока все принятые до вызова документы
+        (всех коллекций или одной) попадут в Qdrant — после этого они видны поиску.
+        failed — документы, которые так и не удалось записать (dead_letter);
+        retry_failed возвращает их в журнал перед ожиданием
+        """
+        if self.write_buffer is None:
+            return {"flushed": True, "pending": 0, "failed": 0}
+        if retry_failed:
+            self.write_buffer.retry_dead_letters(collection_name)
+        flushed = self.write_buffer.flush(
+            collection_name, timeout=settings.WRITE_BEHIND_FLUSH_TIMEOUT if timeout is None else timeout
+        )
+        return {
+            "flushed": flushed,
+            "pending": self.write_buffer.pending(collection_name),
+            "failed": self.write_buffer.dead_letters(collection_name),
+        }
+
+    def _settle_writes(self, collection_name: str) -> None:
+        """дописать отложенные документы коллекции перед операцией, которая может их затронуть"""
+        if self.write_buffer is not None and self.write_buffer.pending(collection_name):
+            if not self.write_buffer.flush(collection_name, timeout=settings.WRITE_BEHIND_FLUSH_TIMEOUT):
+                raise RuntimeError(f"Buffered writes to '{collection_name}' are not flushed yet")
+
+    @contextlib.contextmanager
+    def _writing(self, collection_name: str) -> Iterator[List[Union[int, str]]]:
+        """
+        Запись в коллекцию: ждёт снятия барьера миграции и отмечает в журнале миграции
+        ID точек, добавленных в выданный список. Коллекцию разрешать внутри блока —
+        после барьера алиас может указывать уже на новую коллекцию
+        """
+        touched = getattr(self._writes, "touched", None)
+        if touched is not None:
+            # вложенная запись (дописывание отложенных документов) учитывается во внешней
+            yield touched
+            return
+        write_id = self.migration_log.enter_write(collection_name, timeout=settings.MIGRATION_FENCE_TIMEOUT)
+        self._writes.touched = touched = []
+        try:
+            yield touched
+        finally:
+            self._writes.touched = None
+            self.migration_log.exit_write(write_id, collection_name, touched)
+
+    @staticmethod
+    def _document_payload(text: str, metadata: Any) -> Dict[str, Any]:
         payload = {"text": text}
         if metadata:
             try:
@@ -63,69 +342,217 @@ class CustomRAGManager:
                     logger.warning(f"Unexpected metadata type: {type(metadata)}")
             except Exception as meta_error:
                 logger.warning(f"Could not process metadata: {meta_error}")
-        result = self.vector_db.upsert_points(
-            collection_name=collection_name,
-            vector=embedding,
-            payload=payload
-        )
-        results = {
-                "addition_result": {
-                    "id": result.get("point_id", "N/A"),
-                    # "text": text,
-                    "payload": payload,
-                    # "collection_name": collection_name,
-                    # "embedding_dimension": len(embedding),
-                    # "embedding": embedding,
-                }
-            }
+        return payload
 
-        return results
+    def search(self, query: str, collection_name: str, threshold: float = 0.8,
+               profile: Optional[str] = None, search_params: Optional[Dict[str, Any]] = None,
+               deadline_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Поиск в указанной коллекции
 
-    def search(self, query: str, collection_name: str, threshold: float = 0.8) \
-            -> Dict[str, Any]:
-        """Поиск в указанной коллекции"""
+        Args:
+            query: Текст запроса
+            collection_name: Имя коллекции
+            threshold: Минимальный скор
+            profile: Профиль поиска из SEARCH_PROFILES (по умолчанию — параметры коллекции)
+            search_params: Явные hnsw_ef, exact, rescore, oversampling (поверх профиля)
+            deadline_ms: Дедлайн запроса — профиль выбирается по наблюдаемым задержкам
+        """
 
         if not collection_name or not isinstance(collection_name, str):
             return {}
 
-        query_embedding = self.embedder.get_embedding(query)
+        started = time.monotonic()
+        target = self.resolve(collection_name)
+        query_embedding = target.embedder.get_embedding(query)
+        params, profile = self._request_params(collection_name, profile, search_params,
+                                               deadline_ms, started)
+        search_started = time.monotonic()
         results = self.vector_db.search_points(
-            collection_name=collection_name,
+            collection_name=target.physical,
+            query_vector=query_embedding,
+            score_threshold=threshold,
+            tenant=target.tenant,
+            search_params=params
+        )
+        self._observe(collection_name, profile, search_started)
+
+        response: Dict[str, Any] = {"search_result": results or []}
+        if profile is not None:
+            response["search_profile"] = profile
+        return response
+
+    def search_grouped(self, query: str, collection_name: str, group_by: str,
+                       limit: int = 5, group_size: int = 3,
+                       threshold: Optional[float] = None, profile: Optional[str] = None,
+                       search_params: Optional[Dict[str, Any]] = None,
+                       deadline_ms: Optional[float] = None) -> Dict[str, Any]:
+        """Поиск лучших документов (групп по полю group_by) с лучшими чанками каждого"""
+        started = time.monotonic()
+        target = self.resolve(collection_name)
+        query_embedding = target.embedder.get_embedding(query)
+        params, profile = self._request_params(collection_name, profile, search_params,
+                                               deadline_ms, started)
+        search_started = time.monotonic()
+        groups = self.vector_db.search_groups(
+            collection_name=target.physical,
             query_vector=query_embedding,
-            score_threshold=threshold
+            group_by=group_by,
+            limit=limit,
+            group_size=group_size,
+            score_threshold=threshold,
+            tenant=target.tenant,
+            search_params=params
         )
+        self._observe(collection_name, profile, search_started)
 
-        if not results:
-            return {"search_result": []}
+        response: Dict[str, Any] = {"search_result": groups}
+        if profile is not None:
+            response["search_profile"] = profile
+        return response
+
+    def _request_params(self, collection_name: str, profile: Optional[str],
+                        search_params: Optional[Dict[str, Any]], deadline_ms: Optional[float],
+                        started: float):
+        """
+        Параметры поиска запроса: профиль (явный или выбранный по оставшемуся до дедлайна
+        времени) либо закреплённые за коллекцией, поверх них — явные параметры
+        """
+        if profile is not None and deadline_ms is not None:
+            raise ValueError("Use either 'profile' or 'deadline_ms', not both")
+        reason = "explicit"
+        if deadline_ms is not None:
+            budget = deadline_ms / 1000 - (time.monotonic() - started)
+            profile = self.profiles.choose(collection_name, budget)
+            reason = "deadline"
+        if profile is not None:
+            params = self.profiles.params(profile)
+            SEARCH_PROFILES.inc(profile=profile, reason=reason)
         else:
-            return {"search_result": results}
+            params = self.search_params.get(collection_name)
+        explicit = validate_search_params(search_params)
+        if explicit:
+            params = {**params, **explicit}
+        return params, profile
+
+    def _observe(self, collection_name: str, profile: Optional[str], search_started: float) -> None:
+        if profile is not None:
+            self.profiles.observe(collection_name, profile, time.monotonic() - search_started)
+
+    def expand_collections(self, patterns: List[str]) -> List[str]:
+        """Имена коллекций по списку имён и glob-шаблонов (docs_*), без повторов"""
+        names: List[str] = []
+        available: Optional[List[str]] = None
+        for pattern in patterns:
+            if any(char in pattern for char in "*?["):
+                if available is None:
+                    available = self.list_collections()["collections_list"]
+                names.extend(fnmatch.filter(available, pattern))
+            else:
+                names.append(pattern)
+        return list(dict.fromkeys(names))
+
+    def federated_search(self, query: str, collections: List[str], limit: int = 5,
+                         threshold: Optional[float] = None,
+                         normalization: str = "minmax") -> Dict[str, Any]:
+        """
+        Поиск сразу по нескольким коллекциям. Запрос эмбеддится один раз на модель,
+        коллекции опрашиваются параллельно, скоры нормализуются внутри каждой коллекции
+        (minmax, zscore или none) и результаты сливаются в один список
+
+        Args:
+            query: Текст запроса
+            collections: Имена коллекций или glob-шаблоны
+            limit: Число результатов (и на коллекцию, и в итоговом списке)
+            threshold: Минимальный исходный скор
+            normalization: Способ нормализации скоров
+
+        Returns:
+            Найденные точки с исходной коллекцией, нормализованным и исходным скором
+        """
+        if normalization not in ("minmax", "zscore", "none"):
+            raise ValueError(f"Unknown normalization: {normalization}")
+        names = self.expand_collections(collections)
+        if not names:
+            return {"search_result": [], "failed_collections": {}}
+        if len(names) > settings.FEDERATED_SEARCH_MAX_COLLECTIONS:
+            raise ValueError(
+                f"Too many collections: {len(names)} > {settings.FEDERATED_SEARCH_MAX_COLLECTIONS}"
+            )
+
+        targets = {name: self.resolve(name) for name in names}
+        embedders = {id(target.embedder): target.embedder for target in targets.values()}
+        query_vectors = {key: embedder.get_embedding(query) for key, embedder in embedders.items()}
+
+        futures = {
+            name: self._search_pool.submit(
+                contextvars.copy_context().run,
+                self.vector_db.search_points,
+                target.physical, query_vectors[id(target.embedder)], limit, threshold, target.tenant,
+                self.search_params.get(name)
+            )
+            for name, target in targets.items()
+        }
+
+        merged: List[Dict[str, Any]] = []
+        failed: Dict[str, str] = {}
+        for name, future in futures.items():
+            try:
+                hits = future.result()
+            except Exception as e:
+                logger.warning(f"Federated search in '{name}' failed: {e}")
+                failed[name] = str(e)
+                continue
+            for hit, score in zip(hits, self._normalize([hit["score"] for hit in hits], normalization)):
+                merged.append({
+                    "collection": name,
+                    "id": hit["id"],
+                    "score": score,
+                    "raw_score": hit["score"],
+                    "payload": hit["payload"],
+                })
+
+        merged.sort(key=lambda hit: (hit["score"], hit["raw_score"]), reverse=True)
+        return {"search_result": merged[:limit], "failed_collections": failed}
+
+    @staticmethod
+    def _normalize(scores: List[float], method: str) -> List[float]:
+        """нормализация скоров одной коллекции"""
+        if method == "none" or not scores:
+            return scores
+        if method == "zscore":
+            if len(scores) < 2:
+                return [0.0] * len(scores)
+            mean = statistics.fmean(scores)
+            deviation = statistics.pstdev(scores) or 1.0
+            return [(score - mean) / deviation for score in scores]
+        low, high = min(scores), max(scores)
+        if high == low:
+            return [1.0] * len(scores)
+        return [(score - low) / (high - low) for score in scores]
 
     def search_by_metadata(self, collection_name: str,
                            metadata_filters: Dict[str, Any]) -> Dict[str, Any]:
         """Поиск документов по метаданным"""
 
-        if not self.vector_db.collection_exists(collection_name):
+        if not self.collection_exists(collection_name):
             return {"search_by_metadata_result": []}
 
-        if not metadata_filters:
-            return {"search_by_metadata_result": []}
-
-        clean_filters = {}
-        for key, value in metadata_filters.items():
-            if value is not None and value != "":
-                clean_filters[key] = value
-
+        clean_filters = self._clean_filters(metadata_filters)
         if not clean_filters:
             return {"search_by_metadata_result": []}
+        target = self.resolve(collection_name)
         results = self.vector_db.search_by_metadata(
-            collection_name=collection_name,
-            metadata_filters=clean_filters
+            collection_name=target.physical,
+            metadata_filters=clean_filters,
+            tenant=target.tenant
         )
         return {"search_by_metadata_result": results}
 
     def batch_add_documents(self, documents: List[str],
                             metadatas: Optional[List[Dict]] = None,
-                            collection_name: Optional[str] = None) -> Dict[str, Any]:
+                            collection_name: Optional[str] = None,
+                            ids: Optional[List[Union[int, str]]] = None) -> Dict[str, Any]:
         """
         Пакетное добавление документов
 
@@ -133,41 +560,46 @@ class CustomRAGManager:
             documents: Список текстов
             metadatas: Список метаданных (опционально)
             collection_name: Имя коллекции
+            ids: ID точек (опционально; повторная загрузка с теми же ID перезаписывает точки)
 
         Returns:
             Результат операции
         """
         target_collection = collection_name
         try:
-            embeddings = self.embedder.get_embeddings(documents)
-
-            for i, emb in enumerate(embeddings):
-                if len(emb) != self.embedding_dimension:
-                    logger.warning(
-                        f"Document {i}: embedding dimension mismatch: "
-                        f"expected {self.embedding_dimension}, got {len(emb)}"
+            with self._writing(target_collection) as touched:
+                target = self.resolve(target_collection)
+                embeddings = target.embedder.get_embeddings(documents)
+                if len(embeddings) != len(documents):
+                    raise ValueError(
+                        f"Embedding service returned {len(embeddings)} vectors "
+                        f"for {len(documents)} documents"
                     )
+                self._check_dimensions(embeddings, target.physical)
 
-            payloads = []
-            for i, text in enumerate(documents):
-                payload = {"text": text}
-                if metadatas and i < len(metadatas):
-                    payload.update(metadatas[i])
-                payloads.append(payload)
+                payloads = []
+                for i, text in enumerate(documents):
+                    payload = {"text": text}
+                    if metadatas and i < len(metadatas):
+                        payload.update(metadatas[i])
+                    payloads.append(self._tag(payload, target))
 
-            result = self.vector_db.upsert_points(
-                collection_name=target_collection,
-                vectors=embeddings,
-                payloads=payloads
-            )
+                result = self.vector_db.upsert_batch(
+                    collection_name=target.physical,
+                    vectors=embeddings,
+                    payloads=payloads,
+                    ids=ids
+                )
+                touched.extend(result.get("point_ids") or [])
 
-            return {
-                "status": "success",
-                "message": f"Added {len(documents)} documents to '{target_collection}'",
-                "collection": target_collection,
-                "count": len(documents),
-                "operation_id": result.get("operation_id")
-            }
+                return {
+                    "status": "success",
+                    "message": f"Added {len(documents)} documents to '{target_collection}'",
+                    "collection": target_collection,
+                    "count": len(documents),
+                    "point_ids": result.get("point_ids"),
+                    "operation_id": result.get("operation_id")
+                }
 
         except Exception as e:
             logger.error(f"Error in batch add: {e}")
@@ -180,15 +612,366 @@ class CustomRAGManager:
             collection_name: Имя коллекции
             point_id: ID точки для удаления
         """
-        self.vector_db.delete_point_by_id(
-                collection_name=collection_name,
-                point_id=point_id
-            )
+        self._settle_writes(collection_name)
+        with self._writing(collection_name) as touched:
+            target = self.resolve(collection_name)
+            self.vector_db.delete_point_by_id(
+                    collection_name=target.physical,
+                    point_id=point_id,
+                    tenant=target.tenant
+                )
+            touched.append(point_id)
+        self.sync_manifest.remove_points(collection_name, [point_id])
+
+    def delete_documents(self, collection_name: str, point_ids: List[Union[int, str]],
+                         wait: bool = True) -> Dict[str, Any]:
+        """
+        Удалить точки по списку ID одной операцией
+
+        Args:
+            collection_name: Имя коллекции
+            point_ids: ID точек
+            wait: Ждать применения удаления в Qdrant
+        """
+        self._settle_writes(collection_name)
+        with self._writing(collection_name) as touched:
+            target = self.resolve(collection_name)
+            result = self.vector_db.delete_points(target.physical, point_ids, wait=wait, tenant=target.tenant)
+            touched.extend(point_ids)
+        self.sync_manifest.remove_points(collection_name, point_ids)
+        return {"deletion_result": result}
+
+    def delete_by_metadata(self, collection_name: str, metadata_filters: Dict[str, Any],
+                           wait: bool = True) -> Dict[str, Any]:
+        """
+        Удалить все точки, совпадающие с фильтром по метаданным, одной операцией
+
+        Args:
+            collection_name: Имя коллекции
+            metadata_filters: Словарь {поле: значение}, как в search_by_metadata
+            wait: Ждать применения удаления в Qdrant
+        """
+        clean_filters = self._clean_filters(metadata_filters)
+        if not clean_filters:
+            raise ValueError("Parameter 'metadata_filters' must contain at least one value")
+        self._settle_writes(collection_name)
+        with self._writing(collection_name) as touched:
+            target = self.resolve(collection_name)
+            in_manifest = self.sync_manifest.has_collection(collection_name)
+            if in_manifest or self.migration_log.active(collection_name):
+                # из манифеста убираются, а в журнал миграции попадают только удаляемые точки —
+                # их ID берутся у Qdrant до удаления
+                for points in self.vector_db.scroll_points(target.physical, build_filter(clean_filters),
+                                                           with_payload=False, batch_size=1024,
+                                                           tenant=target.tenant):
+                    point_ids = [point.id for point in points]
+                    touched.extend(point_ids)
+                    if in_manifest:
+                        self.sync_manifest.remove_points(collection_name, point_ids)
+            result = self.vector_db.delete_by_filter(target.physical, clean_filters, wait=wait,
+                                                     tenant=target.tenant)
+        return {"deletion_result": result}
 
     def list_collections(self) -> dict[str, List]:
-        """Получить список всех коллекций в виде дикшинари"""
+        """
+        Получить список всех коллекций в виде дикшинари (коллекции за алиасами — под именем алиаса,
+        арендаторы — вместо общих коллекций-шардов)
+        """
         collections = self.vector_db.get_collections()
         if not collections:
             return {"collections_list": []}
 
-        return {"collections_list": collections}
+        aliases = self.vector_db.get_aliases(refresh=True)
+        hidden = set(aliases.values())
+        visible = [name for name in collections if name not in hidden]
+        visible.extend(alias for alias, target in aliases.items() if target in collections)
+        if settings.MULTITENANT_ENABLED:
+            visible = [name for name in visible if not self.tenants.is_internal(name)]
+            visible.extend(self.tenants.names())
+        return {"collections_list": sorted(visible)}
+
+    def delete_collection(self, collection_name: str) -> bool:
+        """
+        Удалить коллекцию (для алиаса — алиас и коллекцию за ним, для арендатора — его точки
+        в общей коллекции) вместе с манифестом синхронизации, закреплёнными параметрами поиска
+        и недописанными документами отложенной записи
+        """
+        if self.write_buffer is not None:
+            self.write_buffer.discard(collection_name)
+        if self.is_tenant(collection_name):
+            shard = self.tenants.get(collection_name)
+            self.vector_db.delete_by_filter(shard, {}, tenant=collection_name)
+            self.tenants.delete(collection_name)
+            deleted = True
+        else:
+            target = self.vector_db.get_aliases(refresh=True).get(collection_name)
+            if target is not None:
+                self.vector_db.delete_alias(collection_name)
+                deleted = self.vector_db.delete_collection(target)
+            else:
+                deleted = self.vector_db.delete_collection(collection_name)
+        self.sync_manifest.drop_collection(collection_name)
+        self.search_params.drop_collection(collection_name)
+        return deleted
+
+    def sync_documents(self, collection_name: str, documents: List[Dict[str, Any]],
+                       delete_missing: bool = False) -> Dict[str, Any]:
+        """
+        Инкрементальная синхронизация документов с коллекцией.
+        Документы режутся на чанки, хеш каждого чанка (текст, метаданные, параметры
+        чанкинга и модель) сравнивается с локальным манифестом; эмбеддятся и
+        загружаются только новые и изменённые чанки, лишние чанки удаляются
+
+        Args:
+            collection_name: Имя коллекции
+            documents: Список {"doc_id": ..., "text": ..., "metadata": {...}}
+            delete_missing: Удалить документы коллекции, которых нет в documents
+
+        Returns:
+            Количество добавленных, обновлённых, неизменных и удалённых чанков
+        """
+        with self._writing(collection_name) as touched:
+            target = self.resolve(collection_name)
+            embedder = target.embedder
+            fingerprint = config_fingerprint(
+                settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, embedder.model_id
+            )
+            if not self.sync_manifest.has_collection(collection_name):
+                self.rebuild_manifest(collection_name)
+
+            doc_ids = []
+            for document in documents:
+                doc_id = document.get("doc_id")
+                if doc_id is None or document.get("text") is None:
+                    raise ValueError("Every document needs 'doc_id' and 'text'")
+                doc_ids.append(str(doc_id))
+            if len(set(doc_ids)) != len(doc_ids):
+                raise ValueError("Duplicate 'doc_id' in documents")
+
+            known = self.sync_manifest.documents(
+                collection_name, None if delete_missing else doc_ids
+            )
+
+            pending: List[Dict[str, Any]] = []
+            stale: List[tuple] = []
+            stats = {"added": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+
+            for doc_id, document in zip(doc_ids, documents):
+                metadata = document.get("metadata") or {}
+                chunks = split_text(document["text"], settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+                existing = known.pop(doc_id, {})
+
+                for index, chunk in enumerate(chunks):
+                    chunk_hash = content_hash(chunk, metadata, fingerprint)
+                    previous = existing.get(index)
+                    if previous is not None and previous[1] == chunk_hash:
+                        stats["unchanged"] += 1
+                        continue
+                    stats["updated" if previous is not None else "added"] += 1
+                    payload = {"text": chunk}
+                    payload.update(metadata)
+                    payload.update({
+                        "doc_id": doc_id,
+                        "chunk_index": index,
+                        "content_hash": chunk_hash,
+                        "chunking": {"size": settings.CHUNK_SIZE, "overlap": settings.CHUNK_OVERLAP},
+                        "embedding_model": embedder.model_id,
+                    })
+                    self._tag(payload, target)
+                    pending.append({
+                        "doc_id": doc_id,
+                        "index": index,
+                        # у импортированной коллекции ID точек вычислены от исходного имени
+                        "point_id": previous[0] if previous is not None
+                        else chunk_point_id(collection_name, doc_id, index),
+                        "hash": chunk_hash,
+                        "text": chunk,
+                        "payload": payload,
+                    })
+
+                for index, (point_id, _) in existing.items():
+                    if index >= len(chunks):
+                        stale.append((doc_id, index, point_id))
+
+            # при delete_missing в known остались документы, которых больше нет в корпусе
+            for doc_id, chunks in known.items():
+                for index, (point_id, _) in chunks.items():
+                    stale.append((doc_id, index, point_id))
+
+            batch_size = settings.EMBED_BATCH_SIZE
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                embeddings = embedder.get_embeddings([item["text"] for item in batch])
+                self._check_dimensions(embeddings, target.physical)
+                self.vector_db.upsert_batch(
+                    collection_name=target.physical,
+                    vectors=embeddings,
+                    payloads=[item["payload"] for item in batch],
+                    ids=[item["point_id"] for item in batch]
+                )
+                touched.extend(item["point_id"] for item in batch)
+                self.sync_manifest.upsert(collection_name, [
+                    (item["doc_id"], item["index"], item["point_id"], item["hash"]) for item in batch
+                ])
+
+            if stale:
+                for start in range(0, len(stale), batch_size * 16):
+                    batch = stale[start:start + batch_size * 16]
+                    point_ids = [point_id for _, _, point_id in batch]
+                    self.vector_db.delete_points(target.physical, point_ids, tenant=target.tenant)
+                    touched.extend(point_ids)
+                    self.sync_manifest.remove(collection_name, [(doc_id, index) for doc_id, index, _ in batch])
+                stats["deleted"] = len(stale)
+
+        logger.info(f"Sync of '{collection_name}': {stats}")
+        return {"sync_result": stats}
+
+    def rebuild_manifest(self, collection_name: str) -> int:
+        """Восстановить локальный манифест по payload точек коллекции"""
+        entries = []
+        target = self.resolve(collection_name)
+        for points in self.vector_db.scroll_points(
+                target.physical,
+                with_payload=["doc_id", "chunk_index", "content_hash"],
+                batch_size=1024,
+                tenant=target.tenant):
+            for point in points:
+                payload = point.payload or {}
+                if "doc_id" in payload and "content_hash" in payload:
+                    entries.append((
+                        str(payload["doc_id"]),
+                        int(payload.get("chunk_index", 0)),
+                        str(point.id),
+                        payload["content_hash"]
+                    ))
+        self.sync_manifest.rebuild(collection_name, entries)
+        logger.info(f"Sync manifest of '{collection_name}' rebuilt: {len(entries)} chunks")
+        return len(entries)
+
+    def prepare_migration(self, collection_name: str, model_name: str) -> Dict[str, Any]:
+        """
+        Создать теневую коллекцию <коллекция>__<модель> с размерностью новой модели.
+        Недостроенная коллекция от прерванной миграции пересоздаётся
+        """
+        source, embedder, tenant = self.resolve(collection_name)
+        if tenant is not None:
+            raise ValueError(f"Collection '{collection_name}' is a tenant of a shared collection "
+                             f"and can't be migrated to another model")
+        # записи, сделанные с этого момента, досинхронизируются по журналу
+        self.migration_log.begin(collection_name)
+        target_embedder = self.embedder_for_model(model_name)
+        target = f"{collection_name}{MODEL_SEPARATOR}{model_name}"
+        if target == source:
+            raise ValueError(f"Collection '{collection_name}' already uses model '{model_name}'")
+
+        if self.vector_db.collection_exists(target):
+            logger.warning(f"Dropping leftover migration target '{target}'")
+            self.vector_db.delete_collection(target)
+
+        dimension = len(target_embedder.get_embedding("test"))
+        self.vector_db.create_collection(
+            target, vector_size=dimension, keyword_indexes=(settings.SEARCH_GROUP_BY,)
+        )
+        logger.info(
+            f"Migrating '{collection_name}' from '{source}' ({embedder.model_id}) "
+            f"to '{target}' ({target_embedder.model_id}), dimension {dimension}"
+        )
+        return {"source": source, "target": target}
+
+    def migrate_points(self, target: str, points: List[Any]) -> int:
+        """Переэмбеддить страницу точек исходной коллекции и записать в target с теми же ID"""
+        embedder = self.resolve(target).embedder
+        items = [point for point in points if isinstance((point.payload or {}).get("text"), str)]
+        if not items:
+            return 0
+        embeddings = embedder.get_embeddings([point.payload["text"] for point in items])
+        self._check_dimensions(embeddings, target)
+        self.vector_db.upsert_batch(
+            collection_name=target,
+            vectors=embeddings,
+            payloads=[rehash_payload(point.payload, embedder.model_id) for point in items],
+            ids=[point.id for point in items]
+        )
+        return len(items)
+
+    def catch_up_points(self, source: str, target: str, point_ids: List[Union[int, str]]) -> Dict[str, int]:
+        """
+        Перенести в target точки source, изменённые за время миграции (ID из журнала миграции):
+        существующие переэмбеддиваются, удалённые из source удаляются из target
+        """
+        points = self.vector_db.retrieve_points(source, point_ids)
+        present = {str(point.id) for point in points}
+        removed = [point_id for point_id in point_ids if str(point_id) not in present]
+        updated = self.migrate_points(target, points) if points else 0
+        if removed:
+            # точку могли добавить и удалить за время прохода — в target её тогда нет
+            removed = [point.id for point in self.vector_db.retrieve_points(target, removed, with_payload=False)]
+        if removed:
+            self.vector_db.delete_points(target, removed)
+        return {"updated": updated, "deleted": len(removed)}
+
+    def switch_collection(self, collection_name: str, target: str,
+                          drop_source: bool = False) -> Dict[str, Any]:
+        """
+        Переключить алиас collection_name на target. Если collection_name — сама
+        коллекция, а не алиас (создана до QDRANT_COLLECTION_ALIASES), её приходится
+        удалить перед созданием алиаса: между этими шагами коллекция недоступна,
+        поэтому вызывать только когда target уже содержит все её точки. Повторный вызов
+        после сбоя между удалением и созданием алиаса просто создаёт алиас
+        """
+        source = self.vector_db.get_aliases(refresh=True).get(collection_name)
+        if source == target:
+            # повтор после сбоя: алиас уже переключён
+            return {"collection": collection_name, "source": None, "target": target,
+                    "source_dropped": False}
+        if source is not None:
+            self.vector_db.switch_alias(collection_name, target)
+        else:
+            source = collection_name
+            drop_source = False
+            if self.vector_db.client.collection_exists(collection_name):
+                logger.warning(
+                    f"'{collection_name}' is not an alias: dropping it to create the alias, "
+                    f"the collection is unavailable until the alias is created"
+                )
+                self.vector_db.delete_collection(collection_name)
+            self.vector_db.switch_alias(collection_name, target)
+
+        if drop_source:
+            self.vector_db.delete_collection(source)
+        # хеши в payload пересчитаны под новую модель — манифест перестроится по ним
+        self.sync_manifest.drop_collection(collection_name)
+        return {
+            "collection": collection_name,
+            "source": source,
+            "target": target,
+            "source_dropped": drop_source or source == collection_name,
+        }
+
+    @staticmethod
+    def _tag(payload: Dict[str, Any], target: Target) -> Dict[str, Any]:
+        """пометить payload арендатором (перекрывает одноимённое поле метаданных)"""
+        if target.tenant is not None:
+            payload[TENANT_FIELD] = target.tenant
+        return payload
+
+    @staticmethod
+    def _clean_filters(metadata_filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """фильтры без пустых значений"""
+        if not metadata_filters:
+            return {}
+        return {
+            key: value for key, value in metadata_filters.items()
+            if value is not None and value != ""
+        }
+
+    def _check_dimensions(self, embeddings: List[Any], collection_name: str) -> None:
+        """размерность эмбеддингов должна совпадать с размерностью коллекции"""
+        expected = self.vector_db.vector_size(collection_name)
+        for i, emb in enumerate(embeddings):
+            if len(emb) != expected:
+                raise ValueError(
+                    f"Document {i}: embedding dimension {len(emb)} doesn't match "
+                    f"collection '{collection_name}' dimension {expected}; "
+                    f"migrate the collection to the new model with migrate_collection"
+                )
@@ -0,0 +1,198 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple, Union
+
+import orjson
+
+from ...core.admission import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+PointId = Union[int, str]
+
+
+class MigrationLog:
+    """
+    Журнал записей в мигрируемые коллекции (общий для воркеров узла).
+
+    Пока коллекция мигрирует, каждая запись в неё отмечает ID изменённых точек — задача
+    миграции переносит в копию только их, не просматривая коллекции целиком. Перед
+    переключением алиаса задача ставит барьер: новые записи ждут его снятия, начатые
+    дописываются (drain), так что после последнего прохода по изменениям исходная
+    коллекция уже не меняется. Записи процессов, упавших посреди записи, через stale
+    секунд не учитываются
+    """
+
+    def __init__(self, path: str, stale: float = 600.0):
+        self.path = path
+        self.stale = stale
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS migrations (collection TEXT PRIMARY KEY, started REAL NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS fences (collection TEXT PRIMARY KEY, until REAL NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS writes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT NOT NULL, started REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT NOT NULL, point_id TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS writes_collection ON writes (collection)")
+        conn.execute("CREATE INDEX IF NOT EXISTS changes_collection ON changes (collection, seq)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def begin(self, collection_name: str) -> None:
+        """начать отмечать записи в коллекцию; отметки прерванной миграции больше не нужны — копия строится заново"""
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO migrations (collection, started) VALUES (?, ?)", (collection_name, time.time())
+        )
+        conn.execute("DELETE FROM changes WHERE collection = ?", (collection_name,))
+        conn.execute("DELETE FROM writes WHERE started < ?", (time.time() - self.stale,))
+        conn.commit()
+
+    def end(self, collection_name: str, hold: float = 0.0) -> None:
+        """
+        закончить миграцию: журнал изменений очищается, барьер держится ещё hold секунд —
+        пока воркеры не увидят переключённый алиас
+        """
+        conn = self._connection()
+        conn.execute("DELETE FROM migrations WHERE collection = ?", (collection_name,))
+        conn.execute("DELETE FROM changes WHERE collection = ?", (collection_name,))
+        if hold > 0:
+            conn.execute(
+                "INSERT OR REPLACE INTO fences (collection, until) VALUES (?, ?)",
+                (collection_name, time.time() + hold)
+            )
+        else:
+            conn.execute("DELETE FROM fences WHERE collection = ?", (collection_name,))
+        conn.commit()
+
+    def active(self, collection_name: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM migrations WHERE collection = ?", (collection_name,)
+        ).fetchone()
+        return row is not None
+
+    def enter_write(self, collection_name: str, timeout: float) -> int:
+        """
+        зарегистрировать начинающуюся запись в коллекцию; пока стоит барьер — ждать
+        не дольше timeout секунд, затем AdmissionRejected (503)
+        """
+        conn = self._connection()
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                fence = conn.execute(
+                    "SELECT until FROM fences WHERE collection = ?", (collection_name,)
+                ).fetchone()
+                if fence is None or fence[0] <= now:
+                    write_id = conn.execute(
+                        "INSERT INTO writes (collection, started) VALUES (?, ?)", (collection_name, now)
+                    ).lastrowid
+                    conn.commit()
+                    return write_id
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise AdmissionRejected(
+                    f"Collection '{collection_name}' is being switched to a new model, retry later",
+                    status_code=503, retry_after=max(1.0, fence[0] - now)
+                )
+            time.sleep(min(0.05, remaining))
+
+    def exit_write(self, write_id: int, collection_name: str, point_ids: Iterable[PointId]) -> None:
+        """запись закончена (в том числе с ошибкой); point_ids отмечаются, если коллекция мигрирует"""
+        conn = self._connection()
+        conn.execute("DELETE FROM writes WHERE id = ?", (write_id,))
+        conn.executemany(
+            "INSERT INTO changes (collection, point_id) "
+            "SELECT ?, ? WHERE EXISTS (SELECT 1 FROM migrations WHERE collection = ?)",
+            [(collection_name, orjson.dumps(point_id).decode("utf-8"), collection_name)
+             for point_id in point_ids]
+        )
+        conn.commit()
+
+    def fence(self, collection_name: str, ttl: float) -> None:
+        """
+        поставить (или продлить) барьер на ttl секунд: если задача упадёт,
+        барьер истечёт сам и записи продолжатся
+        """
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO fences (collection, until) VALUES (?, ?)",
+            (collection_name, time.time() + ttl)
+        )
+        conn.commit()
+
+    def lift(self, collection_name: str) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM fences WHERE collection = ?", (collection_name,))
+        conn.commit()
+
+    def drain(self, collection_name: str, timeout: float) -> bool:
+        """дождаться окончания начатых записей в коллекцию; False — не дождались за timeout секунд"""
+        conn = self._connection()
+        deadline = time.monotonic() + timeout
+        while True:
+            row = conn.execute(
+                "SELECT 1 FROM writes WHERE collection = ? AND started >= ? LIMIT 1",
+                (collection_name, time.time() - self.stale)
+            ).fetchone()
+            conn.commit()
+            if row is None:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def last_change(self, collection_name: str) -> Optional[int]:
+        """seq последней отметки об изменении (None — изменений нет)"""
+        return self._connection().execute(
+            "SELECT MAX(seq) FROM changes WHERE collection = ?", (collection_name,)
+        ).fetchone()[0]
+
+    def changes(self, collection_name: str, limit: int) -> Tuple[Optional[int], List[PointId]]:
+        """
+        первые limit отметок об изменениях: (seq последней отметки, ID точек без повторов);
+        обработанные отметки снимаются remove_changes(seq)
+        """
+        rows = self._connection().execute(
+            "SELECT seq, point_id FROM changes WHERE collection = ? ORDER BY seq LIMIT ?",
+            (collection_name, limit)
+        ).fetchall()
+        if not rows:
+            return None, []
+        point_ids = list(dict.fromkeys(point_id for _, point_id in rows))
+        return rows[-1][0], [orjson.loads(point_id) for point_id in point_ids]
+
+    def remove_changes(self, collection_name: str, last_seq: int) -> None:
+        """
+        снять отметки до last_seq включительно; отмеченные позже (точку изменили
+        ещё раз, пока шёл проход) остаются до следующего прохода
+        """
+        conn = self._connection()
+        conn.execute("DELETE FROM changes WHERE collection = ? AND seq <= ?", (collection_name, last_seq))
+        conn.commit()
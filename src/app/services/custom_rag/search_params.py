@@ -0,0 +1,166 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# параметры поиска Qdrant, которые можно закрепить за коллекцией
+SEARCH_PARAM_TYPES = {
+    "hnsw_ef": int,
+    "exact": bool,
+    "rescore": bool,
+    "oversampling": float,
+}
+
+
+def validate_search_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """проверить и привести типы параметров поиска; None-значения отбрасываются"""
+    result: Dict[str, Any] = {}
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        kind = SEARCH_PARAM_TYPES.get(key)
+        if kind is None:
+            raise ValueError(f"Unknown search parameter: {key}")
+        if kind is bool and not isinstance(value, bool):
+            raise ValueError(f"Search parameter '{key}' must be a boolean")
+        try:
+            value = kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Search parameter '{key}' must be {kind.__name__}")
+        if kind in (int, float) and value <= 0:
+            raise ValueError(f"Search parameter '{key}' must be positive")
+        result[key] = value
+    return result
+
+
+class ProfileSelector:
+    """
+    Профили поиска (от дешёвого к точному) и выбор профиля под дедлайн:
+    самый точный профиль, чья наблюдаемая задержка на коллекции укладывается в бюджет.
+    Задержка оценивается как сглаженное среднее плюс два сглаженных отклонения
+    """
+
+    def __init__(self, profiles: Dict[str, Dict[str, Any]], alpha: float = 0.2):
+        if not profiles:
+            raise ValueError("At least one search profile is required")
+        self.profiles = {name: validate_search_params(params) for name, params in profiles.items()}
+        self.names: List[str] = list(self.profiles)
+        self.alpha = alpha
+        # (коллекция, профиль) -> (среднее, отклонение) в секундах
+        self._latency: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def params(self, name: str) -> Dict[str, Any]:
+        params = self.profiles.get(name)
+        if params is None:
+            raise ValueError(f"Unknown search profile: {name}")
+        return params
+
+    def estimate(self, collection_name: str, name: str) -> Optional[float]:
+        with self._lock:
+            observed = self._latency.get((collection_name, name))
+        return None if observed is None else observed[0] + 2 * observed[1]
+
+    def choose(self, collection_name: str, budget: float) -> str:
+        """
+        профиль под оставшийся бюджет (секунды). Ещё не измеренный профиль пробуется,
+        только если предыдущий уложился в половину бюджета; иначе — самый дешёвый
+        """
+        chosen = self.names[0]
+        previous: Optional[float] = None
+        for index, name in enumerate(self.names):
+            estimate = self.estimate(collection_name, name)
+            if estimate is None:
+                if index == 0 or (previous is not None and previous * 2 <= budget):
+                    chosen = name
+                break
+            if estimate > budget:
+                break
+            chosen, previous = name, estimate
+        return chosen
+
+    def observe(self, collection_name: str, name: str, seconds: float) -> None:
+        key = (collection_name, name)
+        with self._lock:
+            observed = self._latency.get(key)
+            if observed is None:
+                self._latency[key] = (seconds, seconds / 2)
+                return
+            mean, deviation = observed
+            self._latency[key] = (
+                mean + self.alpha * (seconds - mean),
+                deviation + self.alpha * (abs(seconds - mean) - deviation),
+            )
+
+
+class SearchParamsStore:
+    """
+    Закреплённые параметры поиска коллекций (подобранные benchmarks.recall) в SQLite,
+    общем для всех воркеров узла; в памяти кешируются на ttl секунд
+    """
+
+    def __init__(self, path: str, ttl: float = 5.0):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._cache: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._cache_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_params ("
+            "collection TEXT PRIMARY KEY, params TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, collection_name: str) -> Dict[str, Any]:
+        """параметры коллекции ({} — настройки коллекции по умолчанию)"""
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(collection_name)
+        if cached is not None and now - cached[1] < self.ttl:
+            return cached[0]
+
+        row = self._connection().execute(
+            "SELECT params FROM search_params WHERE collection = ?", (collection_name,)
+        ).fetchone()
+        params = orjson.loads(row[0]) if row else {}
+        with self._cache_lock:
+            self._cache[collection_name] = (params, now)
+        return params
+
+    def set(self, collection_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """закрепить параметры за коллекцией; пустые параметры — сброс"""
+        params = validate_search_params(params)
+        conn = self._connection()
+        if params:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_params (collection, params, updated) VALUES (?, ?, ?)",
+                (collection_name, orjson.dumps(params).decode("utf-8"), time.time())
+            )
+        else:
+            conn.execute("DELETE FROM search_params WHERE collection = ?", (collection_name,))
+        conn.commit()
+        with self._cache_lock:
+            self._cache[collection_name] = (params, time.monotonic())
+        logger.info(f"Search params of '{collection_name}' set to {params}")
+        return params
+
+    def drop_collection(self, collection_name: str) -> None:
+        self.set(collection_name, {})
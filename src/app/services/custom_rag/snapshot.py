@@ -0,0 +1,127 @@
+import io
+import logging
+import os
+import re
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+import orjson
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+PAYLOADS_FILE = "payloads.jsonl.zst"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+PointId = Union[int, str]
+
+
+def export_path(root: str, name: str) -> str:
+    """каталог выгрузки внутри root; имя без разделителей пути"""
+    if not name or not _NAME_RE.match(name) or name.startswith("."):
+        raise ValueError(f"Invalid export name: {name!r}")
+    return os.path.join(root, name)
+
+
+class SnapshotWriter:
+    """
+    Выгрузка коллекции в каталог:
+    vectors.f32 — векторы float32 подряд (memmap-совместимая матрица N x dim),
+    payloads.jsonl.zst — записи {"id", "payload"} в том же порядке, сжатые zstd,
+    manifest.json — описание; пишется последним, без него выгрузка считается незавершённой
+    """
+
+    def __init__(self, directory: str, vector_size: int, level: int = 3):
+        self.directory = directory
+        self.vector_size = vector_size
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+        manifest = os.path.join(directory, MANIFEST_FILE)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        self._vectors = open(os.path.join(directory, VECTORS_FILE), "wb")
+        self._payloads_file = open(os.path.join(directory, PAYLOADS_FILE), "wb")
+        self._payloads = zstandard.ZstdCompressor(level=level).stream_writer(self._payloads_file)
+
+    def write(self, ids: List[PointId], vectors: Any, payloads: List[Dict[str, Any]]) -> None:
+        matrix = np.asarray(vectors, dtype="<f4")
+        if matrix.shape != (len(ids), self.vector_size):
+            raise ValueError(
+                f"Expected {len(ids)} vectors of size {self.vector_size}, got shape {matrix.shape}"
+            )
+        matrix.tofile(self._vectors)
+        self._payloads.write(b"".join(
+            orjson.dumps({"id": point_id, "payload": payload}) + b"\n"
+            for point_id, payload in zip(ids, payloads)
+        ))
+        self.count += len(ids)
+
+    def close(self, **info: Any) -> Dict[str, Any]:
+        """закрыть файлы и записать manifest.json"""
+        self._payloads.close()
+        self._vectors.close()
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "vector_size": self.vector_size,
+            "points_count": self.count,
+            **info,
+        }
+        tmp = os.path.join(self.directory, MANIFEST_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+        os.replace(tmp, os.path.join(self.directory, MANIFEST_FILE))
+        return manifest
+
+    def abort(self) -> None:
+        self._payloads.close()
+        self._vectors.close()
+
+
+class SnapshotReader:
+    """чтение выгрузки SnapshotWriter; векторы отображаются в память, а не читаются целиком"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"No complete export in '{directory}'")
+        with open(manifest_path, "rb") as f:
+            self.manifest: Dict[str, Any] = orjson.loads(f.read())
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported export format: {self.manifest.get('format_version')}")
+
+        self.vector_size: int = self.manifest["vector_size"]
+        self.count: int = self.manifest["points_count"]
+        self.vectors = np.memmap(
+            os.path.join(directory, VECTORS_FILE), dtype="<f4", mode="r",
+            shape=(self.count, self.vector_size)
+        ) if self.count else np.empty((0, self.vector_size), dtype="<f4")
+
+    def batches(self, batch_size: int, start: int = 0) \
+            -> Iterator[Tuple[int, List[PointId], np.ndarray, List[Dict[str, Any]]]]:
+        """(позиция, ID, векторы, payload) пачками, начиная с записи start"""
+        with open(os.path.join(self.directory, PAYLOADS_FILE), "rb") as raw:
+            stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+            position = 0
+            ids: List[PointId] = []
+            payloads: List[Dict[str, Any]] = []
+            for line in stream:
+                if position >= start:
+                    record = orjson.loads(line)
+                    ids.append(record["id"])
+                    payloads.append(record["payload"])
+                position += 1
+                if len(ids) == batch_size:
+                    first = position - len(ids)
+                    yield first, ids, self.vectors[first:position], payloads
+                    ids, payloads = [], []
+            if ids:
+                first = position - len(ids)
+                yield first, ids, self.vectors[first:position], payloads
+        if position != self.count:
+            raise ValueError(f"Export is truncated: {position} of {self.count} records")
+
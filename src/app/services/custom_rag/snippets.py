@@ -0,0 +1,62 @@
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+_WORD_RE = re.compile(r"\w{2,}")
+ELLIPSIS = "…"
+
+
+def query_terms(query: Optional[str]) -> List[str]:
+    """слова запроса (в нижнем регистре, без повторов)"""
+    return list(dict.fromkeys(word.lower() for word in _WORD_RE.findall(query or "")))
+
+
+def make_snippet(text: str, terms: List[str], max_chars: int) -> str:
+    """
+    Фрагмент text не длиннее max_chars вокруг места с наибольшим числом разных слов запроса;
+    без совпадений — начало текста. Обрезанные края отмечаются многоточием
+    """
+    if len(text) <= max_chars:
+        return text
+
+    start = 0
+    if terms:
+        pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)))
+        matches = [(match.start(), match.group()) for match in pattern.finditer(text.lower())]
+        if matches:
+            # скользящее окно по совпадениям: максимум разных слов в max_chars символах
+            counts: Counter = Counter()
+            best, best_count, left = matches[0][0], 0, 0
+            for right, (position, term) in enumerate(matches):
+                counts[term] += 1
+                while position - matches[left][0] > max_chars // 2:
+                    counts[matches[left][1]] -= 1
+                    if not counts[matches[left][1]]:
+                        del counts[matches[left][1]]
+                    left += 1
+                if len(counts) > best_count:
+                    best, best_count = matches[left][0], len(counts)
+            # немного контекста перед первым совпадением
+            start = max(0, best - max_chars // 4)
+
+    end = min(len(text), start + max_chars)
+    start = max(0, end - max_chars)
+    # не резать слова по краям
+    if start > 0:
+        space = text.find(" ", start, start + 30)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(" ", end - 30, end)
+        end = space if space > start else end
+    return (ELLIPSIS if start > 0 else "") + text[start:end].strip() + (ELLIPSIS if end < len(text) else "")
+
+
+def apply_snippets(hits: Iterable[Dict[str, Any]], query: Optional[str], max_chars: int) -> None:
+    """заменить payload["text"] найденных точек фрагментами (на месте); обрезанные помечаются text_truncated"""
+    terms = query_terms(query)
+    for hit in hits:
+        payload = hit.get("payload")
+        text = payload.get("text") if payload else None
+        if isinstance(text, str) and len(text) > max_chars:
+            payload["text"] = make_snippet(text, terms, max_chars)
+            payload["text_truncated"] = True
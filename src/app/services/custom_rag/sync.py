@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+SYNC_NAMESPACE = uuid.UUID("5c1b8e58-3b0e-4d6e-9f0a-6a4f3a1f2d11")
+
+
+def config_fingerprint(chunk_size: int, chunk_overlap: int, model_id: str) -> str:
+    """отпечаток параметров чанкинга и модели: при их смене все чанки считаются изменёнными"""
+    return hashlib.sha256(f"{chunk_size}:{chunk_overlap}:{model_id}".encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(text: str, metadata: Dict[str, Any], fingerprint: str) -> str:
+    """хеш содержимого чанка вместе с метаданными и отпечатком конфигурации"""
+    digest = hashlib.sha256()
+    digest.update(fingerprint.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(orjson.dumps(metadata, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS))
+    return digest.hexdigest()
+
+
+# служебные поля payload, которые sync_documents добавляет к метаданным документа
+SYNC_PAYLOAD_FIELDS = ("text", "doc_id", "chunk_index", "content_hash", "chunking", "embedding_model")
+
+
+def rehash_payload(payload: Dict[str, Any], model_id: str) -> Dict[str, Any]:
+    """
+    payload чанка с хешем, пересчитанным под другую модель — чтобы после миграции
+    коллекции sync_documents не считал все чанки изменёнными
+    """
+    chunking = payload.get("chunking")
+    if "content_hash" not in payload or not isinstance(chunking, dict):
+        return payload
+    metadata = {key: value for key, value in payload.items() if key not in SYNC_PAYLOAD_FIELDS}
+    fingerprint = config_fingerprint(chunking.get("size"), chunking.get("overlap"), model_id)
+    updated = dict(payload)
+    updated["content_hash"] = content_hash(payload.get("text", ""), metadata, fingerprint)
+    updated["embedding_model"] = model_id
+    return updated
+
+
+def chunk_point_id(collection_name: str, doc_id: str, chunk_index: int) -> str:
+    """детерминированный ID точки чанка"""
+    return str(uuid.uuid5(SYNC_NAMESPACE, f"{collection_name}\0{doc_id}\0{chunk_index}"))
+
+
+class SyncManifest:
+    """
+    Локальный манифест синхронизации: для каждой коллекции хранит
+    хеши чанков по документам, чтобы не запрашивать их у Qdrant
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        upgrading = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'manifest'"
+        ).fetchone() is not None and conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'collections'"
+        ).fetchone() is None
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            "collection TEXT NOT NULL, doc_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, "
+            "point_id TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "PRIMARY KEY (collection, doc_id, chunk_index))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS manifest_point ON manifest (collection, point_id)")
+        # коллекции, чей манифест построен (в том числе пустой — повторно строить его не нужно)
+        conn.execute("CREATE TABLE IF NOT EXISTS collections (collection TEXT PRIMARY KEY)")
+        if upgrading:
+            # манифест прежней версии: построенными считаются коллекции, у которых есть записи
+            conn.execute("INSERT OR IGNORE INTO collections SELECT DISTINCT collection FROM manifest")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def has_collection(self, collection_name: str) -> bool:
+        """построен ли манифест коллекции (rebuild); пустой манифест тоже считается построенным"""
+        row = self._connection().execute(
+            "SELECT 1 FROM collections WHERE collection = ?", (collection_name,)
+        ).fetchone()
+        return row is not None
+
+    def rebuild(self, collection_name: str, entries: List[Tuple[str, int, str, str]]) -> None:
+        """заменить манифест коллекции целиком и отметить его построенным; entries — как в upsert"""
+        conn = self._connection()
+        conn.execute("DELETE FROM manifest WHERE collection = ?", (collection_name,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO manifest (collection, doc_id, chunk_index, point_id, content_hash) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(collection_name, *entry) for entry in entries]
+        )
+        conn.execute("INSERT OR IGNORE INTO collections (collection) VALUES (?)", (collection_name,))
+        conn.commit()
+
+    def documents(self, collection_name: str,
+                  doc_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[int, Tuple[str, str]]]:
+        """{doc_id: {chunk_index: (point_id, content_hash)}} для всей коллекции или указанных документов"""
+        conn = self._connection()
+        if doc_ids is None:
+            rows = conn.execute(
+                "SELECT doc_id, chunk_index, point_id, content_hash FROM manifest WHERE collection = ?",
+                (collection_name,)
+            ).fetchall()
+        else:
+            doc_ids = list(doc_ids)
+            rows = []
+            for start in range(0, len(doc_ids), 500):
+                chunk = doc_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(conn.execute(
+                    f"SELECT doc_id, chunk_index, point_id, content_hash FROM manifest "
+                    f"WHERE collection = ? AND doc_id IN ({placeholders})",
+                    (collection_name, *chunk)
+                ).fetchall())
+
+        result: Dict[str, Dict[int, Tuple[str, str]]] = {}
+        for doc_id, chunk_index, point_id, chunk_hash in rows:
+            result.setdefault(doc_id, {})[chunk_index] = (point_id, chunk_hash)
+        return result
+
+    def upsert(self, collection_name: str, entries: List[Tuple[str, int, str, str]]) -> None:
+        """entries: (doc_id, chunk_index, point_id, content_hash)"""
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO manifest (collection, doc_id, chunk_index, point_id, content_hash) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(collection_name, *entry) for entry in entries]
+        )
+        conn.commit()
+
+    def remove(self, collection_name: str, entries: List[Tuple[str, int]]) -> None:
+        """entries: (doc_id, chunk_index)"""
+        conn = self._connection()
+        conn.executemany(
+            "DELETE FROM manifest WHERE collection = ? AND doc_id = ? AND chunk_index = ?",
+            [(collection_name, *entry) for entry in entries]
+        )
+        conn.commit()
+
+    def remove_points(self, collection_name: str, point_ids: Iterable[Union[int, str]]) -> None:
+        """удалить записи удалённых точек"""
+        point_ids = [str(point_id) for point_id in point_ids]
+        conn = self._connection()
+        for start in range(0, len(point_ids), 500):
+            chunk = point_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            conn.execute(
+                f"DELETE FROM manifest WHERE collection = ? AND point_id IN ({placeholders})",
+                (collection_name, *chunk)
+            )
+        conn.commit()
+
+    def drop_collection(self, collection_name: str) -> None:
+        """забыть манифест коллекции: следующая синхронизация построит его заново"""
+        conn = self._connection()
+        conn.execute("DELETE FROM manifest WHERE collection = ?", (collection_name,))
+        conn.execute("DELETE FROM collections WHERE collection = ?", (collection_name,))
+        conn.commit()
@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .vector_client import VectorClient
+
+logger = logging.getLogger(__name__)
+
+TENANT_NAMESPACE = uuid.UUID("0f6f2b7e-52c4-4f5b-9a53-1d7f0c1a9e44")
+
+
+class TenantRegistry:
+    """
+    Логические коллекции-арендаторы внутри общих коллекций-шардов.
+    Реестр хранится в служебной коллекции Qdrant, поэтому общий для всех воркеров и узлов;
+    ответы кешируются на ttl секунд
+    """
+
+    def __init__(self, vector_db: VectorClient, registry_collection: str, shard_prefix: str,
+                 shards: int, ttl: float = 5.0, keyword_indexes: Sequence[str] = ()):
+        self.vector_db = vector_db
+        self.registry_collection = registry_collection
+        self.shard_prefix = shard_prefix
+        self.shards = max(1, shards)
+        self.ttl = ttl
+        self.keyword_indexes = tuple(keyword_indexes)
+        # имя -> (шард или None, время загрузки)
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self._registry_exists = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _point_id(name: str) -> str:
+        return str(uuid.uuid5(TENANT_NAMESPACE, name))
+
+    def shard_for(self, name: str) -> str:
+        """шард арендатора — стабильно по хешу имени"""
+        return f"{self.shard_prefix}{zlib.crc32(name.encode('utf-8')) % self.shards}"
+
+    def is_internal(self, collection_name: str) -> bool:
+        """служебная коллекция: реестр или шард"""
+        if collection_name == self.registry_collection:
+            return True
+        suffix = collection_name[len(self.shard_prefix):]
+        return collection_name.startswith(self.shard_prefix) and suffix.isdigit()
+
+    def get(self, name: str, refresh: bool = False) -> Optional[str]:
+        """шард арендатора или None, если такого арендатора нет"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(name)
+        if cached is not None and not refresh and now - cached[1] < self.ttl:
+            return cached[0]
+
+        shard = None
+        if self._has_registry(refresh):
+            points = self.vector_db.retrieve_points(self.registry_collection, [self._point_id(name)])
+            if points:
+                shard = points[0].payload.get("shard")
+        with self._lock:
+            self._cache[name] = (shard, now)
+        return shard
+
+    def create(self, name: str, vector_size: int) -> str:
+        """зарегистрировать арендатора, при необходимости создав реестр и шард"""
+        self._ensure_collection(self.registry_collection, 1, tenant_shard=False)
+        shard = self.shard_for(name)
+        self._ensure_collection(shard, vector_size, tenant_shard=True)
+        self.vector_db.upsert_batch(
+            self.registry_collection,
+            vectors=[[1.0]],
+            payloads=[{"name": name, "shard": shard, "created": time.time()}],
+            ids=[self._point_id(name)]
+        )
+        with self._lock:
+            self._cache[name] = (shard, time.monotonic())
+        logger.info(f"Tenant collection '{name}' created in shard '{shard}'")
+        return shard
+
+    def delete(self, name: str) -> None:
+        self.vector_db.delete_points(self.registry_collection, [self._point_id(name)])
+        with self._lock:
+            self._cache[name] = (None, time.monotonic())
+
+    def names(self) -> List[str]:
+        if not self._has_registry(refresh=True):
+            return []
+        names = []
+        for points in self.vector_db.scroll_points(self.registry_collection, with_payload=["name"]):
+            names.extend(point.payload["name"] for point in points)
+        return names
+
+    def _has_registry(self, refresh: bool) -> bool:
+        if not self._registry_exists or refresh:
+            self._registry_exists = self.vector_db.collection_exists(self.registry_collection)
+        return self._registry_exists
+
+    def _ensure_collection(self, collection_name: str, vector_size: int, tenant_shard: bool) -> None:
+        if self.vector_db.collection_exists(collection_name):
+            return
+        try:
+            self.vector_db.create_collection(
+                collection_name, vector_size=vector_size, tenant_shard=tenant_shard,
+                keyword_indexes=self.keyword_indexes if tenant_shard else ()
+            )
+        except Exception:
+            # коллекцию мог одновременно создать другой воркер
+            if not self.vector_db.collection_exists(collection_name):
+                raise
+        if collection_name == self.registry_collection:
+            self._registry_exists = True
@@ -1,17 +1,119 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 import requests
+from .embedding_client import EmbeddingClient
+from ...core.metrics import UPSTREAM_ERRORS, VALIDATION_DECISIONS, measure, measure_stage
+from ...core.tracing import outgoing_headers
+
+logger = logging.getLogger(__name__)
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def calibrate_thresholds(similarities: Sequence[float], labels: Sequence[bool],
+                         precision: float = 0.98) -> Tuple[float, float]:
+    """
+    Пороги быстрой проверки по размеченным примерам: accept — наименьшая близость,
+    выше которой доля положительных не ниже precision; reject — наибольшая,
+    ниже которой доля отрицательных не ниже precision
+    """
+    pairs = sorted(zip(similarities, labels), reverse=True)
+    accept = float("inf")
+    positives = 0
+    for count, (similarity, label) in enumerate(pairs, start=1):
+        positives += bool(label)
+        if positives / count >= precision:
+            accept = similarity
+
+    reject = float("-inf")
+    negatives = 0
+    for count, (similarity, label) in enumerate(reversed(pairs), start=1):
+        negatives += not label
+        if negatives / count >= precision:
+            reject = similarity
+    return accept, min(reject, accept)
 
 
 class ValidationClient:
     """
     клиент для проверки запросов через компактную LLM
-    перед отправкой в поиск контекста и большую LLM"""
+    перед отправкой в поиск контекста и большую LLM.
+    С embedder сначала сравнивает эмбеддинги запроса и темы, LLM вызывается
+    только когда близость попала между порогами"""
+
+    _MAX_TOPICS = 1024
 
-    def __init__(self, base_url: str = "http://localhost:11434"):
-        self.base_url = base_url
-        self.model = "mistral"
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "mistral",
+                 embedder: Optional[EmbeddingClient] = None,
+                 accept_threshold: float = 0.8, reject_threshold: float = 0.3,
+                 examples: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            base_url: URL Ollama
+            model: Модель LLM
+            embedder: Клиент эмбеддингов для быстрой проверки (None — только LLM)
+            accept_threshold: Близость, начиная с которой запрос относится к теме
+            reject_threshold: Близость, до которой включительно запрос не относится к теме
+            examples: Примеры запросов по темам, сравниваются вместе с самой темой
+        """
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.embedder = embedder
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.examples = examples or {}
+        # нормализованные эмбеддинги темы и её примеров
+        self._topics: Dict[str, np.ndarray] = {}
+        self._topics_lock = threading.Lock()
 
+    @measure_stage("validate")
     def validate(self, query: str, question: str) -> bool:
+        if self.embedder is not None:
+            similarity = self.similarity(query, question)
+            if similarity is not None:
+                if similarity >= self.accept_threshold:
+                    VALIDATION_DECISIONS.inc(tier="embedding", result="yes")
+                    return True
+                if similarity <= self.reject_threshold:
+                    VALIDATION_DECISIONS.inc(tier="embedding", result="no")
+                    return False
+
+        with measure("validate_llm"):
+            result = self._validate_llm(query, question)
+        VALIDATION_DECISIONS.inc(tier="llm", result="yes" if result else "no")
+        return result
+
+    def similarity(self, query: str, question: str) -> Optional[float]:
+        """наибольшая косинусная близость запроса к теме и её примерам (None — эмбеддинги недоступны)"""
+        try:
+            topic = self._topic_vectors(question)
+            vector = _normalized(np.asarray(self.embedder.get_embedding(query), dtype=np.float32))
+        except Exception as e:
+            logger.warning(f"Embedding fast path unavailable, falling back to LLM: {e}")
+            return None
+        return float(np.max(topic @ vector))
+
+    def _topic_vectors(self, question: str) -> np.ndarray:
+        with self._topics_lock:
+            vectors = self._topics.get(question)
+        if vectors is not None:
+            return vectors
+
+        texts = [question, *self.examples.get(question, ())]
+        vectors = _normalized(np.asarray(self.embedder.get_embeddings(texts), dtype=np.float32))
+        with self._topics_lock:
+            if len(self._topics) >= self._MAX_TOPICS:
+                self._topics.clear()
+            self._topics[question] = vectors
+        return vectors
 
+    def _validate_llm(self, query: str, question: str) -> bool:
         prompt = f"""Определи, относится ли запрос к указанной в вопросе теме.
         Ответь только одним словом: "да" или "нет".
 
@@ -44,6 +146,7 @@ class ValidationClient:
                         "num_predict": 5
                     }
                 },
+                headers=outgoing_headers(),
                 timeout=10
             )
             response.raise_for_status()
@@ -51,4 +154,5 @@ class ValidationClient:
             return result == "да" or result == "yes"
 
         except Exception as e:
+            UPSTREAM_ERRORS.inc(upstream="llm")
             return False
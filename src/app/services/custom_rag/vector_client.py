@@ -1,45 +1,171 @@
-import json
+import itertools
 import logging
+import threading
 import time
-from typing import List, Dict, Any, Optional
+import uuid
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Distance, VectorParams, PointStruct,
-    Filter, FieldCondition, MatchValue
+    Filter, FieldCondition, MatchValue, FilterSelector, HasIdCondition, PayloadSchemaType,
+    HnswConfigDiff, SearchParams, QuantizationSearchParams,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
 )
+from ...core.metrics import BATCH_SIZE, measure, measure_stage
 
 logger = logging.getLogger(__name__)
 
+Vector = Union[np.ndarray, List[float]]
+
+# поле payload с именем арендатора в общих коллекциях (см. TenantRegistry)
+TENANT_FIELD = "rag_tenant"
+
+
+def new_point_ids(count: int) -> List[str]:
+    """
+    ID новых точек — UUID: числовые ID по времени совпадали бы у разных воркеров
+    и узлов и перезаписывали чужие точки
+    """
+    return [str(uuid.uuid4()) for _ in range(count)]
+
+
+def build_filter(metadata_filters: Dict[str, Any]) -> Filter:
+    """фильтр Qdrant: все поля payload равны заданным значениям"""
+    return Filter(must=[
+        FieldCondition(key=key, match=MatchValue(value=str(value)))
+        for key, value in metadata_filters.items()
+    ])
+
+
+def scoped_filter(query_filter: Optional[Filter], tenant: Optional[str]) -> Optional[Filter]:
+    """добавить к фильтру условие на арендатора (tenant=None — фильтр без изменений)"""
+    if tenant is None:
+        return query_filter
+    condition = FieldCondition(key=TENANT_FIELD, match=MatchValue(value=tenant))
+    if query_filter is None:
+        return Filter(must=[condition])
+    return Filter(
+        must=[*(query_filter.must or []), condition],
+        should=query_filter.should,
+        must_not=query_filter.must_not
+    )
+
+
+def build_search_params(params: Optional[Dict[str, Any]]) -> Optional[SearchParams]:
+    """SearchParams Qdrant из словаря hnsw_ef/exact/rescore/oversampling (None — настройки коллекции)"""
+    if not params:
+        return None
+    quantization = None
+    if "rescore" in params or "oversampling" in params:
+        quantization = QuantizationSearchParams(
+            rescore=params.get("rescore"),
+            oversampling=params.get("oversampling")
+        )
+    return SearchParams(
+        hnsw_ef=params.get("hnsw_ef"),
+        exact=params.get("exact", False),
+        quantization=quantization
+    )
+
+
+def to_list(vector: Vector) -> List[float]:
+    """вектор в список float для PointStruct (для ndarray — одним вызовом tolist)"""
+    if isinstance(vector, np.ndarray):
+        return vector.tolist()
+    return vector
+
 
 class VectorClient:
-    def __init__(self, url: str, timeout: int = 30):
+    def __init__(self, url: str, timeout: int = 30, location: Optional[str] = None,
+                 prefer_grpc: bool = False, grpc_port: int = 6334, connections: int = 1,
+                 alias_ttl: float = 5.0):
         """
         Args:
             url: URL до Qdrant (http://host:port)
             timeout: в секундах
+            location: ":memory:" или путь для встроенного режима (тогда url не используется)
+            prefer_grpc: Использовать gRPC вместо REST
+            grpc_port: Порт gRPC
+            connections: Число клиентов (соединений), между которыми распределяются запросы
+            alias_ttl: Сколько секунд кешировать список алиасов
         """
-        self.client = QdrantClient(url=url, timeout=timeout)
-        logger.info(f"Qdrant client connected to {url}")
+        if location:
+            client = QdrantClient(location=location) if location == ":memory:" \
+                else QdrantClient(path=location)
+            self._clients = [client]
+            logger.info(f"Qdrant client running in local mode at {location}")
+        else:
+            self._clients = [
+                QdrantClient(
+                    url=url,
+                    timeout=timeout,
+                    prefer_grpc=prefer_grpc,
+                    grpc_port=grpc_port
+                )
+                for _ in range(max(1, connections))
+            ]
+            transport = f"gRPC (port {grpc_port})" if prefer_grpc else "REST"
+            logger.info(
+                f"Qdrant client connected to {url} via {transport}, "
+                f"{len(self._clients)} connection(s)"
+            )
+        self._client_cycle = itertools.cycle(self._clients)
+        self._client_lock = threading.Lock()
+        self.alias_ttl = alias_ttl
+        self._aliases: Dict[str, str] = {}
+        self._aliases_loaded_at: Optional[float] = None
+        self._vector_sizes: Dict[str, int] = {}
+        self._meta_lock = threading.Lock()
 
-    def create_collection(self, collection_name: str, vector_size: int = 1024):
-        """Создать коллекцию (если не существует)"""
+    @property
+    def client(self) -> QdrantClient:
+        """следующий клиент из пула (по кругу)"""
+        if len(self._clients) == 1:
+            return self._clients[0]
+        with self._client_lock:
+            return next(self._client_cycle)
+
+    @measure_stage("qdrant_create_collection", upstream="qdrant")
+    def create_collection(self, collection_name: str, vector_size: int = 1024,
+                          keyword_indexes: Sequence[str] = (), tenant_shard: bool = False):
+        """
+        Создать коллекцию (если не существует); keyword_indexes — поля payload для индекса.
+        tenant_shard: общая коллекция арендаторов — HNSW строится по арендаторам
+        (payload_m) вместо общего графа (m=0), индекс по полю арендатора
+        """
+        hnsw_config = None
+        if tenant_shard:
+            hnsw_config = HnswConfigDiff(payload_m=16, m=0)
+            keyword_indexes = (TENANT_FIELD, *keyword_indexes)
         self.client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+            hnsw_config=hnsw_config
         )
+        for field_name in keyword_indexes:
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD
+            )
         logger.info(f"Collection '{collection_name}' created")
         return True
 
-    def upsert_points(self, collection_name: str, vector: List[float],
-                      payload: Dict[str, Any]) -> Dict[str, Any]:
+    @measure_stage("qdrant_upsert", upstream="qdrant")
+    def upsert_points(self, collection_name: str, vector: Vector,
+                      payload: Dict[str, Any],
+                      point_id: Optional[Union[int, str]] = None) -> Dict[str, Any]:
         """
-        Добавить точку в коллекции
+        Добавить точку в коллекции (ID генерируется, если не задан)
         """
 
-        point_id = int(time.time() * 1000)
+        if point_id is None:
+            point_id = new_point_ids(1)[0]
         point = PointStruct(
             id=point_id,
-            vector=vector,
+            vector=to_list(vector),
             payload=payload
         )
 
@@ -52,8 +178,51 @@ class VectorClient:
 
         return {"point_id": point_id}
 
-    def search_points(self, collection_name: str, query_vector: List[float],
-                      limit: int = 5, score_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    @measure_stage("qdrant_upsert", upstream="qdrant")
+    def upsert_batch(self, collection_name: str, vectors: Union[np.ndarray, Sequence[Vector]],
+                     payloads: List[Dict[str, Any]],
+                     ids: Optional[List[Union[int, str]]] = None,
+                     wait: bool = True) -> Dict[str, Any]:
+        """
+        Добавить пачку точек одним запросом
+
+        Args:
+            collection_name: Имя коллекции
+            vectors: Векторы (двумерный ndarray или список векторов)
+            payloads: Payload для каждой точки
+            ids: ID точек; если не заданы — генерируются
+            wait: Ждать применения операции в Qdrant
+
+        Returns:
+            ID добавленных точек и ID операции
+        """
+        if len(vectors) != len(payloads):
+            raise ValueError(
+                f"Vectors count ({len(vectors)}) doesn't match payloads count ({len(payloads)})"
+            )
+        if ids is None:
+            ids = new_point_ids(len(payloads))
+
+        BATCH_SIZE.observe(len(payloads), stage="qdrant_upsert")
+        points = [
+            PointStruct(id=point_id, vector=to_list(vector), payload=payload)
+            for point_id, vector, payload in zip(ids, vectors, payloads)
+        ]
+        operation_info = self.client.upsert(
+            collection_name=collection_name,
+            points=points,
+            wait=wait
+        )
+
+        logger.info(f"Added {len(points)} points to collection '{collection_name}'")
+
+        return {"point_ids": list(ids), "operation_id": operation_info.operation_id}
+
+    @measure_stage("qdrant_search", upstream="qdrant")
+    def search_points(self, collection_name: str, query_vector: Vector,
+                      limit: int = 5, score_threshold: Optional[float] = None,
+                      tenant: Optional[str] = None,
+                      search_params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Поиск похожих векторов
 
@@ -62,6 +231,8 @@ class VectorClient:
             query_vector: Вектор запроса
             limit: Количество результатов
             score_threshold: Минимальный скор (0-1)
+            tenant: Искать только среди точек арендатора
+            search_params: Параметры поиска (hnsw_ef, exact, rescore, oversampling)
 
         Returns:
             Список найденных точек с payload и score
@@ -69,9 +240,11 @@ class VectorClient:
         search_result = self.client.search(
             collection_name=collection_name,
             query_vector=query_vector,
+            query_filter=scoped_filter(None, tenant),
+            search_params=build_search_params(search_params),
             limit=limit,
             score_threshold=score_threshold,
-            with_vectors=True
+            with_vectors=False
         )
 
         results = []
@@ -84,28 +257,69 @@ class VectorClient:
 
         return results
 
-    def search_by_metadata(self, collection_name: str,
-                           metadata_filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    @measure_stage("qdrant_search", upstream="qdrant")
+    def search_groups(self, collection_name: str, query_vector: Vector, group_by: str,
+                      limit: int = 5, group_size: int = 3,
+                      score_threshold: Optional[float] = None,
+                      tenant: Optional[str] = None,
+                      search_params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Поиск с группировкой по полю payload: лучшие группы (например, документы)
+        и в каждой — лучшие точки, одним запросом
+
+        Args:
+            collection_name: Имя коллекции
+            query_vector: Вектор запроса
+            group_by: Поле payload, по которому группируются точки
+            limit: Количество групп
+            group_size: Сколько точек возвращать в группе
+            score_threshold: Минимальный скор
+            tenant: Искать только среди точек арендатора
+            search_params: Параметры поиска, как в search_points
+
+        Returns:
+            Группы по убыванию лучшего скора: {"group_id", "score", "hits"}
+        """
+        result = self.client.search_groups(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            query_filter=scoped_filter(None, tenant),
+            search_params=build_search_params(search_params),
+            group_by=group_by,
+            limit=limit,
+            group_size=group_size,
+            score_threshold=score_threshold,
+            with_payload=True,
+            with_vectors=False
+        )
+        return [
+            {
+                "group_id": group.id,
+                "score": group.hits[0].score if group.hits else None,
+                "hits": [
+                    {"id": hit.id, "score": hit.score, "payload": hit.payload}
+                    for hit in group.hits
+                ],
+            }
+            for group in result.groups
+        ]
+
+    @measure_stage("qdrant_scroll", upstream="qdrant")
+    def search_by_metadata(self, collection_name: str, metadata_filters: Dict[str, Any],
+                           tenant: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Поиск точек по метаданным
         Args:
             collection_name: Имя коллекции
             metadata_filters: Словарь {поле: значение} для фильтрации
+            tenant: Искать только среди точек арендатора
         Returns:
             Список точек, соответствующих всем фильтрам
         """
         if not metadata_filters:
             return []
 
-        must_conditions = []
-        for key, value in metadata_filters.items():
-            condition = FieldCondition(
-                key=key,
-                match=MatchValue(value=str(value))
-            )
-            must_conditions.append(condition)
-
-        filter_condition = Filter(must=must_conditions)
+        filter_condition = scoped_filter(build_filter(metadata_filters), tenant)
 
         scroll_result = self.client.scroll(
             collection_name=collection_name,
@@ -122,16 +336,95 @@ class VectorClient:
 
         return results
 
-    def delete_point_by_id(self, collection_name: str, point_id: int):
+    @measure_stage("qdrant_scroll", upstream="qdrant")
+    def scroll_page(self, collection_name: str, offset: Optional[Union[int, str]] = None,
+                    limit: int = 256, with_payload: Union[bool, List[str]] = True,
+                    with_vectors: bool = False,
+                    tenant: Optional[str] = None) -> Tuple[List[Any], Optional[Union[int, str]]]:
+        """Одна страница точек коллекции и смещение следующей (None — страниц больше нет)"""
+        return self.client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scoped_filter(None, tenant),
+            limit=limit,
+            offset=offset,
+            with_payload=with_payload,
+            with_vectors=with_vectors
+        )
+
+    def scroll_points(self, collection_name: str, scroll_filter: Optional[Filter] = None,
+                      with_payload: Union[bool, List[str]] = True, with_vectors: bool = False,
+                      batch_size: int = 256, tenant: Optional[str] = None) -> Iterator[List[Any]]:
+        """
+        Постранично пройти по точкам коллекции
+
+        Args:
+            collection_name: Имя коллекции
+            scroll_filter: Фильтр Qdrant (опционально)
+            with_payload: Возвращать payload (или только перечисленные поля)
+            with_vectors: Возвращать векторы
+            batch_size: Размер страницы
+            tenant: Только точки арендатора
+
+        Returns:
+            Итератор по страницам точек (Record)
+        """
+        scroll_filter = scoped_filter(scroll_filter, tenant)
+        offset = None
+        while True:
+            with measure("qdrant_scroll"):
+                points, offset = self.client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=scroll_filter,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=with_payload,
+                    with_vectors=with_vectors
+                )
+            if points:
+                yield points
+            if offset is None:
+                return
+
+    @measure_stage("qdrant_delete", upstream="qdrant")
+    def delete_point_by_id(self, collection_name: str, point_id: int, tenant: Optional[str] = None):
         """Удалить конкретную точку по ID"""
         self.client.delete(
             collection_name=collection_name,
-            points_selector=[point_id]
+            points_selector=self._id_selector([point_id], tenant)
         )
 
+    @staticmethod
+    def _id_selector(point_ids: List[Union[int, str]], tenant: Optional[str]):
+        """селектор по ID; для арендатора — только его точки, чужие ID не затрагиваются"""
+        if tenant is None:
+            return point_ids
+        return FilterSelector(filter=scoped_filter(Filter(must=[HasIdCondition(has_id=point_ids)]), tenant))
+
+    @measure_stage("qdrant_retrieve", upstream="qdrant")
+    def retrieve_points(self, collection_name: str, point_ids: List[Union[int, str]],
+                        with_payload: bool = True) -> List[Any]:
+        """Точки по ID (отсутствующие пропускаются)"""
+        return self.client.retrieve(
+            collection_name=collection_name,
+            ids=point_ids,
+            with_payload=with_payload,
+            with_vectors=False
+        )
+
+    @measure_stage("qdrant_count", upstream="qdrant")
+    def count_points(self, collection_name: str, tenant: Optional[str] = None,
+                     point_ids: Optional[List[Union[int, str]]] = None) -> int:
+        """Точное число точек коллекции (или арендатора); с point_ids — сколько из них существует"""
+        count_filter = Filter(must=[HasIdCondition(has_id=point_ids)]) if point_ids is not None else None
+        return self.client.count(
+            collection_name=collection_name,
+            count_filter=scoped_filter(count_filter, tenant),
+            exact=True
+        ).count
+
+    @measure_stage("qdrant_collection_info", upstream="qdrant")
     def get_collection_info(self, collection_name: str) -> Dict[str, Any]:
         """Получить информацию о коллекции"""
-        print("db")
         detailed_collection = self.client.get_collection(collection_name)
         collection_info = {
             "id": collection_name,
@@ -141,22 +434,68 @@ class VectorClient:
         }
         return collection_info
 
-    def delete_points(self, collection_name: str, point_ids: List[int]) -> Dict[str, Any]:
-        """Удалить точки по ID"""
+    @measure_stage("qdrant_delete", upstream="qdrant")
+    def delete_points(self, collection_name: str, point_ids: List[Union[int, str]],
+                      wait: bool = True, tenant: Optional[str] = None) -> Dict[str, Any]:
+        """Удалить точки по ID; points_deleted — сколько из них существовало перед удалением"""
         try:
+            existing = self.count_points(collection_name, tenant, point_ids=point_ids)
             operation_info = self.client.delete(
                 collection_name=collection_name,
-                points_selector=point_ids
+                points_selector=self._id_selector(point_ids, tenant),
+                wait=wait
             )
             return {
                 "status": "success",
                 "operation_id": operation_info.operation_id,
-                "points_deleted": len(point_ids)
+                "points_deleted": existing
             }
         except Exception as e:
             logger.error(f"Error deleting points: {e}")
             raise
 
+    @measure_stage("qdrant_delete", upstream="qdrant")
+    def delete_by_filter(self, collection_name: str, metadata_filters: Dict[str, Any],
+                         wait: bool = True, tenant: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Удалить все точки, payload которых совпадает с metadata_filters, одной операцией.
+        Пустой фильтр запрещён — он совпал бы со всей коллекцией;
+        с tenant пустой фильтр удаляет все точки арендатора
+        """
+        if not metadata_filters and tenant is None:
+            raise ValueError("Refusing to delete by an empty filter")
+        operation_info = self.client.delete(
+            collection_name=collection_name,
+            points_selector=FilterSelector(filter=scoped_filter(build_filter(metadata_filters), tenant)),
+            wait=wait
+        )
+        logger.info(f"Deleted points matching {list(metadata_filters)} from '{collection_name}'")
+        return {
+            "status": "success",
+            "operation_id": operation_info.operation_id,
+        }
+
+    @measure_stage("qdrant_snapshot", upstream="qdrant")
+    def create_snapshot(self, collection_name: str) -> Dict[str, Any]:
+        """Создать нативный снапшот коллекции на сервере Qdrant"""
+        snapshot = self.client.create_snapshot(collection_name=collection_name, wait=True)
+        logger.info(f"Snapshot '{snapshot.name}' of collection '{collection_name}' created")
+        return {"name": snapshot.name, "size": snapshot.size, "creation_time": snapshot.creation_time}
+
+    @measure_stage("qdrant_snapshot", upstream="qdrant")
+    def recover_snapshot(self, collection_name: str, location: str) -> bool:
+        """
+        Восстановить коллекцию из снапшота
+        Args:
+            collection_name: Имя коллекции
+            location: URL снапшота или file:// путь на сервере Qdrant
+        """
+        self.client.recover_snapshot(collection_name=collection_name, location=location, wait=True)
+        with self._meta_lock:
+            self._vector_sizes.pop(collection_name, None)
+        logger.info(f"Collection '{collection_name}' recovered from snapshot {location}")
+        return True
+
     def test_connection(self) -> bool:
         """Проверить подключение к Qdrant"""
         try:
@@ -165,6 +504,7 @@ class VectorClient:
         except:
             return False
 
+    @measure_stage("qdrant_list_collections", upstream="qdrant")
     def get_collections(self) -> List[str]:
         """Получить список всех коллекций"""
         collections = self.client.get_collections()
@@ -174,6 +514,7 @@ class VectorClient:
 
         return result
 
+    @measure_stage("qdrant_delete_collection", upstream="qdrant")
     def delete_collection(self, collection_name: str) -> bool:
         """Удалить коллекцию"""
         collections = self.client.get_collections()
@@ -184,10 +525,71 @@ class VectorClient:
             return False
 
         self.client.delete_collection(collection_name)
+        with self._meta_lock:
+            self._vector_sizes.pop(collection_name, None)
         logger.info(f"Collection '{collection_name}' deleted")
         return True
 
+    @measure_stage("qdrant_list_collections", upstream="qdrant")
     def collection_exists(self, collection_name: str) -> bool:
-        """Проверить существование коллекции"""
-        collections = self.client.get_collections()
-        return any(c.name == collection_name for c in collections.collections)
+        """Проверить существование коллекции или алиаса"""
+        if self.client.collection_exists(collection_name):
+            return True
+        # алиас мог появиться в другом воркере — при промахе список перечитывается
+        return collection_name in self.get_aliases(refresh=True)
+
+    @measure_stage("qdrant_aliases", upstream="qdrant")
+    def get_aliases(self, refresh: bool = False) -> Dict[str, str]:
+        """Алиасы {алиас: коллекция}; кешируются на alias_ttl секунд"""
+        with self._meta_lock:
+            loaded_at = self._aliases_loaded_at
+            if not refresh and loaded_at is not None \
+                    and time.monotonic() - loaded_at < self.alias_ttl:
+                return self._aliases
+
+        response = self.client.get_aliases()
+        aliases = {alias.alias_name: alias.collection_name for alias in response.aliases}
+        with self._meta_lock:
+            self._aliases = aliases
+            self._aliases_loaded_at = time.monotonic()
+        return aliases
+
+    def resolve_collection(self, name: str) -> str:
+        """Физическое имя коллекции: цель алиаса или само имя"""
+        return self.get_aliases().get(name, name)
+
+    @measure_stage("qdrant_aliases", upstream="qdrant")
+    def switch_alias(self, alias_name: str, collection_name: str) -> None:
+        """
+        Направить алиас на коллекцию. Удаление старого и создание нового алиаса
+        выполняются одним запросом, Qdrant применяет их атомарно
+        """
+        operations = []
+        if alias_name in self.get_aliases(refresh=True):
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name)))
+        operations.append(CreateAliasOperation(
+            create_alias=CreateAlias(collection_name=collection_name, alias_name=alias_name)
+        ))
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        self.get_aliases(refresh=True)
+        logger.info(f"Alias '{alias_name}' now points to collection '{collection_name}'")
+
+    @measure_stage("qdrant_aliases", upstream="qdrant")
+    def delete_alias(self, alias_name: str) -> None:
+        """Удалить алиас (коллекция остаётся)"""
+        self.client.update_collection_aliases(change_aliases_operations=[
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name))
+        ])
+        self.get_aliases(refresh=True)
+        logger.info(f"Alias '{alias_name}' deleted")
+
+    def vector_size(self, collection_name: str) -> int:
+        """Размерность векторов коллекции по физическому имени (кешируется)"""
+        with self._meta_lock:
+            size = self._vector_sizes.get(collection_name)
+        if size is None:
+            with measure("qdrant_collection_info"):
+                size = self.client.get_collection(collection_name).config.params.vectors.size
+            with self._meta_lock:
+                self._vector_sizes[collection_name] = size
+        return size
@@ -0,0 +1,394 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+import orjson
+import requests
+
+from ...core.metrics import registry
+
+try:
+    import grpc
+except ImportError:  # gRPC нужен только при QDRANT_PREFER_GRPC
+    grpc = None
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_TOTAL = registry.counter(
+    "rag_write_behind_total",
+    "Buffered documents by outcome (accepted, flushed, failed, dead_letter)",
+    ("status",),
+)
+WRITE_BEHIND_PENDING = registry.gauge(
+    "rag_write_behind_pending",
+    "Documents accepted but not yet written to Qdrant",
+    (),
+)
+
+PointId = Union[int, str]
+# запись журнала: (seq, ID точки, текст, payload)
+Entry = Tuple[int, PointId, str, Dict[str, Any]]
+FlushHandler = Callable[[str, List[Entry]], None]
+
+# колонки, добавленные после первой версии журнала
+_PENDING_COLUMNS = {
+    "claimed_by": "TEXT",
+    "claimed_at": "REAL",
+    "next_attempt": "REAL NOT NULL DEFAULT 0",
+    "first_failed": "REAL",
+    "last_error": "TEXT",
+}
+
+
+_CONNECTION_ERRORS = (
+    ConnectionError, TimeoutError, socket.timeout,
+    requests.ConnectionError, requests.Timeout, httpx.TransportError,
+)
+
+
+def is_connection_error(error: Optional[BaseException]) -> bool:
+    """
+    сетевая ошибка или таймаут — по исключению и цепочке его причин (клиенты эмбеддингов
+    и Qdrant заворачивают исходные ошибки в свои); ответы сервисов, в том числе 4xx/5xx, — нет
+    """
+    while error is not None:
+        if isinstance(error, _CONNECTION_ERRORS):
+            return True
+        if grpc is not None and isinstance(error, grpc.RpcError) and callable(getattr(error, "code", None)) \
+                and error.code() in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class WriteBuffer:
+    """
+    Отложенная запись документов: принятые документы сначала попадают в журнал SQLite
+    (переживает падение процесса), а фоновый поток пачками по коллекциям эмбеддит их
+    и записывает в Qdrant — когда набралось batch_size документов или прошло max_delay секунд.
+
+    Журнал общий для воркеров узла: пачку перед записью захватывает один воркер (аренда
+    на lease секунд), после падения воркера аренда истекает и пачку дописывает другой;
+    повторная запись безопасна, так как ID точек назначены при приёме.
+
+    Неудачная пачка откладывается с растущей паузой, не мешая остальным коллекциям.
+    Сетевые ошибки и таймауты (is_transient) повторяются без ограничения; прочие — пока
+    не наберётся max_attempts попыток и не пройдёт retry_window секунд с первой ошибки,
+    затем документы переносятся в таблицу dead_letter
+    """
+
+    def __init__(self, path: str, handler: FlushHandler, batch_size: int = 64,
+                 max_delay: float = 0.2, max_attempts: int = 5, retry_window: float = 30.0,
+                 lease: float = 60.0, is_transient: Callable[[Exception], bool] = is_connection_error):
+        self.path = path
+        self.handler = handler
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.retry_window = retry_window
+        self.lease = lease
+        self.is_transient = is_transient
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._flushed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # принято этим процессом с последней записи: порог batch_size без COUNT(*) на каждый документ
+        self._appended = 0
+        self._appended_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT NOT NULL, point_id TEXT NOT NULL, "
+            "text TEXT NOT NULL, payload TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created REAL NOT NULL)"
+        )
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(pending)")}
+        for column, definition in _PENDING_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE pending ADD COLUMN {column} {definition}")
+        conn.execute("CREATE INDEX IF NOT EXISTS pending_collection ON pending (collection, seq)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            "seq INTEGER PRIMARY KEY, collection TEXT NOT NULL, point_id TEXT NOT NULL, "
+            "text TEXT NOT NULL, payload TEXT NOT NULL, attempts INTEGER NOT NULL, "
+            "error TEXT, created REAL NOT NULL, failed REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # подтверждённый документ не должен потеряться и при отключении питания
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        pending = self._update_pending()
+        if pending:
+            logger.info(f"Replaying {pending} buffered document(s) from {self.path}")
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """остановить поток, предварительно дописав журнал (не дольше timeout)"""
+        if self._thread is None:
+            return
+        if not self.flush(timeout=timeout):
+            logger.warning(f"{self.pending()} buffered document(s) left in {self.path}, "
+                           f"they will be written after restart")
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def append(self, collection_name: str, entries: List[Tuple[PointId, str, Dict[str, Any]]]) -> None:
+        """записать документы (ID точки, текст, payload) в журнал; после возврата они не потеряются"""
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT INTO pending (collection, point_id, text, payload, created) VALUES (?, ?, ?, ?, ?)",
+                [(collection_name, orjson.dumps(point_id).decode("utf-8"), text,
+                  orjson.dumps(payload).decode("utf-8"), now)
+                 for point_id, text, payload in entries]
+            )
+        WRITE_BEHIND_TOTAL.inc(len(entries), status="accepted")
+        WRITE_BEHIND_PENDING.inc(len(entries))
+        with self._appended_lock:
+            self._appended += len(entries)
+            full = self._appended >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def pending(self, collection_name: Optional[str] = None) -> int:
+        if collection_name is None:
+            row = self._connection().execute("SELECT COUNT(*) FROM pending").fetchone()
+        else:
+            row = self._connection().execute(
+                "SELECT COUNT(*) FROM pending WHERE collection = ?", (collection_name,)
+            ).fetchone()
+        return row[0]
+
+    def dead_letters(self, collection_name: Optional[str] = None) -> int:
+        """число документов, которые так и не удалось записать"""
+        if collection_name is None:
+            row = self._connection().execute("SELECT COUNT(*) FROM dead_letter").fetchone()
+        else:
+            row = self._connection().execute(
+                "SELECT COUNT(*) FROM dead_letter WHERE collection = ?", (collection_name,)
+            ).fetchone()
+        return row[0]
+
+    def retry_dead_letters(self, collection_name: Optional[str] = None) -> int:
+        """вернуть так и не записанные документы (всех коллекций или одной) в журнал"""
+        query = "FROM dead_letter" + (" WHERE collection = ?" if collection_name is not None else "")
+        params: Tuple[Any, ...] = (collection_name,) if collection_name is not None else ()
+        conn = self._connection()
+        with conn:
+            moved = conn.execute(
+                "INSERT INTO pending (seq, collection, point_id, text, payload, created) "
+                f"SELECT seq, collection, point_id, text, payload, created {query}", params
+            ).rowcount
+            conn.execute(f"DELETE {query}", params)
+        if moved:
+            WRITE_BEHIND_PENDING.inc(moved)
+            logger.info(f"Requeued {moved} dead-letter document(s)")
+            self._wakeup.set()
+        return moved
+
+    def flush(self, collection_name: Optional[str] = None, timeout: float = 30.0) -> bool:
+        """
+        Барьер: дождаться записи в Qdrant всех документов, принятых до вызова
+        (всех или одной коллекции). False — не успели за timeout
+        """
+        barrier = self._connection().execute("SELECT MAX(seq) FROM pending").fetchone()[0]
+        if barrier is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._waiting(barrier, collection_name):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._thread is None:
+                # поток не запущен (скрипты, тесты) — дописать в текущем потоке
+                if not self._flush_once():
+                    time.sleep(min(remaining, self.max_delay))
+                continue
+            self._wakeup.set()
+            with self._flushed:
+                self._flushed.wait(min(remaining, self.max_delay))
+        return True
+
+    def discard(self, collection_name: str) -> int:
+        """выбросить недописанные (и так и не записанные) документы удалённой коллекции"""
+        conn = self._connection()
+        with conn:
+            removed = conn.execute("DELETE FROM pending WHERE collection = ?", (collection_name,)).rowcount
+            conn.execute("DELETE FROM dead_letter WHERE collection = ?", (collection_name,))
+        if removed:
+            self._update_pending()
+            logger.info(f"Discarded {removed} buffered document(s) of '{collection_name}'")
+        return removed
+
+    def _waiting(self, barrier: int, collection_name: Optional[str]) -> bool:
+        query = "SELECT 1 FROM pending WHERE seq <= ?"
+        params: Tuple[Any, ...] = (barrier,)
+        if collection_name is not None:
+            query += " AND collection = ?"
+            params += (collection_name,)
+        return self._connection().execute(query + " LIMIT 1", params).fetchone() is not None
+
+    def _update_pending(self) -> int:
+        pending = self.pending()
+        WRITE_BEHIND_PENDING.set(pending)
+        return pending
+
+    def _run(self) -> None:
+        last_count = 0.0
+        while not self._stop.is_set():
+            self._wakeup.wait(self.max_delay)
+            self._wakeup.clear()
+            with self._appended_lock:
+                self._appended = 0
+            try:
+                # пока журнал полон, пишем пачку за пачкой без ожидания
+                while not self._stop.is_set() and self._flush_once() >= self.batch_size:
+                    pass
+                # журнал общий для воркеров: точное значение метрики — не чаще раза в секунду
+                if time.monotonic() - last_count >= 1.0:
+                    self._update_pending()
+                    last_count = time.monotonic()
+            except sqlite3.Error as e:
+                logger.warning(f"Write-behind log is unavailable: {e}")
+
+    def _claim(self) -> Tuple[Optional[str], List[Entry]]:
+        """захватить до batch_size самых старых готовых к записи документов одной коллекции"""
+        conn = self._connection()
+        now = time.time()
+        available = "next_attempt <= ? AND (claimed_by IS NULL OR claimed_at < ?)"
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            head = conn.execute(
+                f"SELECT collection FROM pending WHERE {available} ORDER BY seq LIMIT 1",
+                (now, now - self.lease)
+            ).fetchone()
+            if head is None:
+                conn.commit()
+                return None, []
+            rows = conn.execute(
+                f"SELECT seq, point_id, text, payload FROM pending WHERE collection = ? AND {available} "
+                f"ORDER BY seq LIMIT ?",
+                (head[0], now, now - self.lease, self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE pending SET claimed_by = ?, claimed_at = ? WHERE seq = ?",
+                [(self.owner, now, row[0]) for row in rows]
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return head[0], [
+            (seq, orjson.loads(point_id), text, orjson.loads(payload))
+            for seq, point_id, text, payload in rows
+        ]
+
+    def _flush_once(self) -> int:
+        """записать одну захваченную пачку; возвращает число записанных документов"""
+        collection_name, entries = self._claim()
+        if not entries:
+            return 0
+        try:
+            self.handler(collection_name, entries)
+        except Exception as e:
+            if len(entries) > 1 and not self.is_transient(e):
+                # один плохой документ не должен держать всю пачку: пишем по одному
+                logger.warning(f"Write-behind batch to '{collection_name}' failed ({e}), "
+                               f"retrying {len(entries)} document(s) one by one")
+                written = sum(self._flush_entries(collection_name, [entry]) for entry in entries)
+                self._notify()
+                return written
+            self._failed(collection_name, entries, e)
+            self._notify()
+            return 0
+        self._done(entries)
+        self._notify()
+        return len(entries)
+
+    def _flush_entries(self, collection_name: str, entries: List[Entry]) -> int:
+        try:
+            self.handler(collection_name, entries)
+        except Exception as e:
+            self._failed(collection_name, entries, e)
+            return 0
+        self._done(entries)
+        return len(entries)
+
+    def _done(self, entries: List[Entry]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.executemany("DELETE FROM pending WHERE seq = ?", [(entry[0],) for entry in entries])
+        WRITE_BEHIND_TOTAL.inc(len(entries), status="flushed")
+        WRITE_BEHIND_PENDING.dec(len(entries))
+
+    def _failed(self, collection_name: str, entries: List[Entry], error: Exception) -> None:
+        """отложить пачку с растущей паузой; исчерпавшие попытки документы — в dead_letter"""
+        transient = self.is_transient(error)
+        now = time.time()
+        seqs = [(entry[0],) for entry in entries]
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "UPDATE pending SET attempts = attempts + 1, claimed_by = NULL, claimed_at = NULL, "
+                "first_failed = COALESCE(first_failed, ?), last_error = ? WHERE seq = ?",
+                [(now, str(error), seq) for seq, in seqs]
+            )
+            attempts = conn.execute(
+                f"SELECT MAX(attempts), MIN(first_failed) FROM pending "
+                f"WHERE seq IN ({','.join('?' * len(seqs))})", [seq for seq, in seqs]
+            ).fetchone()
+            dead = 0
+            if not transient and attempts[0] >= self.max_attempts and now - attempts[1] >= self.retry_window:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO dead_letter "
+                    "(seq, collection, point_id, text, payload, attempts, error, created, failed) "
+                    "SELECT seq, collection, point_id, text, payload, attempts, last_error, created, ? "
+                    "FROM pending WHERE seq = ?",
+                    [(now, seq) for seq, in seqs]
+                )
+                conn.executemany("DELETE FROM pending WHERE seq = ?", seqs)
+                dead = len(seqs)
+            else:
+                delay = min(30.0, self.max_delay * 2 ** min(attempts[0], 16))
+                conn.executemany("UPDATE pending SET next_attempt = ? WHERE seq = ?",
+                                 [(now + delay, seq) for seq, in seqs])
+
+        WRITE_BEHIND_TOTAL.inc(len(entries), status="failed")
+        if dead:
+            logger.error(f"Moved {dead} buffered document(s) of '{collection_name}' to dead_letter "
+                         f"after {attempts[0]} failed attempts: {error}")
+            WRITE_BEHIND_TOTAL.inc(dead, status="dead_letter")
+            WRITE_BEHIND_PENDING.dec(dead)
+        else:
+            logger.warning(f"Write-behind flush of {len(entries)} document(s) to '{collection_name}' failed "
+                           f"(attempt {attempts[0]}{', will retry' if transient else ''}): {error}")
+
+    def _notify(self) -> None:
+        with self._flushed:
+            self._flushed.notify_all()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from src.app.core.admission import AdmissionController, PriorityClass
+from src.app.core.config import settings
+from src.app.core.function_executor import FunctionExecutor
+
+
+class FakeManager:
+    def __init__(self):
+        self.batches = []
+
+    def collection_exists(self, collection_name):
+        return True
+
+    def batch_add_documents(self, documents, metadatas=None, collection_name=None, ids=None):
+        self.batches.append(documents)
+        return {"count": len(documents)}
+
+
+class FakeContext:
+    job_id = "job"
+
+    def __init__(self, params):
+        self.params = params
+        self.checkpoint = {}
+
+    def progress(self, done, total=None, message=None):
+        pass
+
+    def save_checkpoint(self, checkpoint, done=None):
+        self.checkpoint = checkpoint
+
+    def check_cancelled(self):
+        pass
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "BATCH_QUEUE_TIMEOUT", 0.05)
+    # без __init__: клиенты Qdrant и эмбеддингов задаче не нужны
+    executor = FunctionExecutor.__new__(FunctionExecutor)
+    executor.admission = AdmissionController()
+    executor.custom_rag_manager = FakeManager()
+    return executor
+
+
+def test_batch_job_waits_for_batch_slot(executor):
+    context = FakeContext({"collection_name": "docs", "documents": ["a", "b", "c"], "batch_size": 2})
+    job = threading.Thread(target=executor._job_batch_add_documents, args=(context,))
+
+    # слот класса batch занят другой фоновой работой
+    with executor.admission.admit("migrate_collection", PriorityClass.BATCH):
+        job.start()
+        time.sleep(0.3)
+        assert executor.custom_rag_manager.batches == []
+        assert job.is_alive()
+
+    job.join(timeout=5)
+    assert not job.is_alive()
+    assert executor.custom_rag_manager.batches == [["a", "b"], ["c"]]
+    assert context.checkpoint == {"next_index": 3}
@@ -0,0 +1,69 @@
+import base64
+
+import numpy as np
+import orjson
+import pytest
+
+from src.app.core.cache import MemoryCache
+from src.app.services.custom_rag.embedding_client import EmbeddingClient
+from src.app.services.custom_rag.vector_client import VectorClient
+
+DIMENSION = 4
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.content = orjson.dumps(body)
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """сервис эмбеддингов: вектор из длины текста, в base64 или списком — как попросили"""
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        data = []
+        for index, text in enumerate(json["input"]):
+            vector = np.full(DIMENSION, float(len(text)), dtype="<f4")
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") \
+                if json.get("encoding_format") == "base64" else vector.tolist()
+            data.append({"index": index, "embedding": embedding})
+        return FakeResponse({"data": data})
+
+
+def make_embedder(encoding_format, cache=None):
+    embedder = EmbeddingClient("http://embeddings", encoding_format=encoding_format, cache=cache)
+    embedder.session = FakeSession()
+    return embedder
+
+
+@pytest.fixture
+def vector_db():
+    # встроенный Qdrant нормализует вектор запроса на месте
+    vector_db = VectorClient("", location=":memory:")
+    vector_db.create_collection("docs", vector_size=DIMENSION)
+    vectors = np.eye(DIMENSION, dtype=np.float32) + 1.0
+    vector_db.upsert_batch("docs", vectors, [{"text": f"doc {i}"} for i in range(DIMENSION)])
+    return vector_db
+
+
+def test_search_with_base64_embeddings(vector_db):
+    embedding = make_embedder("base64").get_embedding("query")
+
+    assert embedding.flags.writeable
+    assert len(vector_db.search_points("docs", embedding, limit=2)) == 2
+    assert vector_db.search_groups("docs", embedding, group_by="text", limit=2)
+
+
+@pytest.mark.parametrize("encoding_format", ["base64", "float"])
+def test_same_search_twice_with_cache(vector_db, encoding_format):
+    embedder = make_embedder(encoding_format, cache=MemoryCache("embeddings", 100))
+
+    for _ in range(2):
+        # второй раз вектор берётся из кеша
+        embedding = embedder.get_embedding("query")
+        assert embedding.flags.writeable
+        assert len(vector_db.search_points("docs", embedding, limit=2)) == 2
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from src.app.core.admission import AdmissionRejected
+from src.app.services.custom_rag.migration_log import MigrationLog
+
+
+@pytest.fixture
+def log(tmp_path):
+    return MigrationLog(str(tmp_path / "migrations.sqlite"))
+
+
+def test_changes_are_recorded_only_during_migration(log):
+    log.exit_write(log.enter_write("docs", timeout=1), "docs", ["a"])
+    assert log.last_change("docs") is None
+
+    log.begin("docs")
+    log.exit_write(log.enter_write("docs", timeout=1), "docs", ["a", 2])
+    log.exit_write(log.enter_write("docs", timeout=1), "docs", ["a"])
+    last_seq, point_ids = log.changes("docs", limit=10)
+    assert point_ids == ["a", 2]
+
+    # отметка, сделанная после чтения страницы, переживает её снятие
+    log.exit_write(log.enter_write("docs", timeout=1), "docs", ["b"])
+    log.remove_changes("docs", last_seq)
+    assert log.changes("docs", limit=10)[1] == ["b"]
+
+    log.end("docs")
+    assert log.last_change("docs") is None
+
+
+def test_fence_waits_for_started_writes_and_holds_new_ones(log):
+    write_id = log.enter_write("docs", timeout=1)
+    log.fence("docs", ttl=60)
+    assert not log.drain("docs", timeout=0.1)
+
+    # новая запись ждёт снятия барьера, а не проходит мимо него
+    entered = []
+    writer = threading.Thread(target=lambda: entered.append(log.enter_write("docs", timeout=5)))
+    writer.start()
+    log.exit_write(write_id, "docs", [])
+    assert log.drain("docs", timeout=1)
+    time.sleep(0.2)
+    assert not entered
+
+    log.lift("docs")
+    writer.join(timeout=5)
+    assert entered
+    log.fence("other", ttl=60)
+    with pytest.raises(AdmissionRejected):
+        log.enter_write("other", timeout=0.1)
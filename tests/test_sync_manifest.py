@@ -0,0 +1,33 @@
+import sqlite3
+
+from src.app.services.custom_rag.sync import SyncManifest
+
+
+def test_empty_manifest_is_built_once(tmp_path):
+    manifest = SyncManifest(str(tmp_path / "manifest.sqlite"))
+    assert not manifest.has_collection("docs")
+
+    # в коллекции нет чанков синхронизации — манифест пустой, но построенный
+    manifest.rebuild("docs", [])
+    assert manifest.has_collection("docs")
+    assert manifest.documents("docs") == {}
+
+    manifest.drop_collection("docs")
+    assert not manifest.has_collection("docs")
+
+
+def test_manifest_of_previous_version_counts_as_built(tmp_path):
+    path = str(tmp_path / "manifest.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE manifest (collection TEXT NOT NULL, doc_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, "
+        "point_id TEXT NOT NULL, content_hash TEXT NOT NULL, PRIMARY KEY (collection, doc_id, chunk_index))"
+    )
+    conn.execute("INSERT INTO manifest VALUES ('docs', 'a', 0, 'p', 'h')")
+    conn.commit()
+    conn.close()
+
+    manifest = SyncManifest(path)
+    assert manifest.has_collection("docs")
+    assert not manifest.has_collection("other")
+    assert manifest.documents("docs") == {"a": {0: ("p", "h")}}